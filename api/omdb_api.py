@@ -1,64 +1,355 @@
 import json
 import csv
 import os
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
+import random
+import threading
 from dotenv import load_dotenv
 import requests
+from requests.adapters import HTTPAdapter
 import time
+from api.response_cache import ResponseCache
+from api.rate_limiter import RateLimiter, QuotaExceededError
+from storage.movie_details import split_names, parse_runtime
 
 
 load_dotenv()
 API_KEY = os.getenv("API_KEY")
 HOST = "www.omdbapi.com"
+BASE_URL = f"http://{HOST}/"
 
+# Backoff between retries: random delay up to base * 2^(attempt - 1), capped
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 8
 
-def get_movie_data(title, max_retries=3, timeout=5):
+CACHE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "omdb_cache.db"))
+# OMDb errors that mean the title doesn't exist (cached), as opposed to e.g. a bad API key (not cached)
+NOT_FOUND_ERRORS = {"Movie not found!"}
+QUOTA_ERROR = "Request limit reached!"
+# HTTP status codes worth retrying: throttled or a temporary server problem
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Client-side throttle, the OMDb free tier allows 1,000 requests per day
+REQUESTS_PER_SECOND = float(os.getenv("OMDB_REQUESTS_PER_SECOND", "10"))
+DAILY_BUDGET = int(os.getenv("OMDB_DAILY_BUDGET", "1000"))
+QUOTA_STATE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "omdb_quota.json"))
+
+# Connection pool shared by all lookups, so keep-alive connections are reused
+POOL_SIZE = int(os.getenv("OMDB_POOL_SIZE", "10"))
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 5
+
+_session = None
+_session_lock = threading.Lock()
+_pool_size = POOL_SIZE
+_default_timeout = (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+# Requests retried since the program started, see retry_count()
+_retries = 0
+_retries_lock = threading.Lock()
+
+
+def configure_session(pool_size=POOL_SIZE, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT):
+    """
+    (Re)create the shared HTTP session.
+
+    The previous session isn't closed: other threads may still be sending requests
+    over it. Its pooled connections are closed once the last user drops it.
+
+    Args:
+        pool_size (int): Maximum number of keep-alive connections to OMDb.
+        connect_timeout (float): Seconds to wait for a connection.
+        read_timeout (float): Seconds to wait for a response.
+    """
+    global _session, _pool_size, _default_timeout
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    with _session_lock:
+        _session = session
+        _pool_size = pool_size
+        _default_timeout = (connect_timeout, read_timeout)
+
+
+def get_session():
+    """
+    Return the shared HTTP session, creating it on first use.
+    """
+    with _session_lock:
+        session, pool_size, timeout = _session, _pool_size, _default_timeout
+
+    if session is None:
+        configure_session(pool_size, *timeout)
+        with _session_lock:
+            session = _session
+    return session
+
+
+def get_response_cache():
+    """
+    Return the shared on-disk response cache, creating it on first use.
+    """
+    global _response_cache
+
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache(CACHE_PATH)
+        return _response_cache
+
+
+def set_response_cache(cache):
+    """
+    Replace the shared response cache, e.g. with one using a different TTL or size cap.
+    """
+    global _response_cache
+
+    with _response_cache_lock:
+        _response_cache = cache
+
+
+def get_rate_limiter():
+    """
+    Return the shared rate limiter, creating it on first use.
+    """
+    global _rate_limiter
+
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter(REQUESTS_PER_SECOND, daily_budget=DAILY_BUDGET,
+                                        state_path=QUOTA_STATE_PATH)
+        return _rate_limiter
+
+
+def set_rate_limiter(limiter):
+    """
+    Replace the shared rate limiter, e.g. with one using a different rate or daily budget.
+    """
+    global _rate_limiter
+
+    with _rate_limiter_lock:
+        _rate_limiter = limiter
+
+
+def quota_remaining():
+    """
+    Return how many OMDb requests are left in today's budget.
+    """
+    return get_rate_limiter().quota_remaining()
+
+
+def retry_count():
+    """
+    Return how many OMDb requests were retried since the program started.
+    """
+    return _retries
+
+
+def _retry(attempt):
+    """
+    Count a retry and wait before sending retry number <attempt>.
+    """
+    global _retries
+
+    with _retries_lock:
+        _retries += 1
+    time.sleep(_backoff_delay(attempt))
+
+
+def _backoff_delay(attempt):
+    """
+    Return the seconds to wait before retry number <attempt> (exponential backoff with full jitter).
+    Jitter keeps concurrent workers from retrying in lockstep.
+    """
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** (attempt - 1)))
+
+
+def get_movie_data(title, max_retries=3, timeout=None, session=None, base_url=BASE_URL, save_response=True,
+                   use_cache=True):
     """
     Fetch movie data from OMDb and save it to 'response.json'.
-    Retry if the request fails due to network issues.
+    Retry if the request fails due to network issues or OMDb is throttling.
     Return the movie data as a dictionary.
+    Answers from the on-disk response cache if the title was fetched recently.
+    Requests to OMDb wait for the shared rate limiter.
+
+    Args:
+        timeout (float): Seconds to wait for OMDb (defaults to the configured connect/read timeouts).
+        session (requests.Session): Session to send the request with (defaults to the shared one).
+        base_url (str): OMDb endpoint, e.g. a local stand-in server for testing.
+        save_response (bool): Write the response to 'data/response.json'.
+        use_cache (bool): Look up and store the response in the response cache.
 
     Raises:
+        QuotaExceededError: If the daily request budget is used up.
         ValueError: If movie not found or API returns an error.
     """
-    api_url = f"http://{HOST}/?apikey={API_KEY}&t={title}"
+    cache = get_response_cache() if use_cache else None
+
+    if cache is not None:
+        cached = cache.get_by_title(title)
+        if cached is not None:
+            movie_data, error = cached
+            if error is not None:
+                raise ValueError(error)
+            return movie_data
+
+    # Let requests encode the query, titles may contain '&', '#' or spaces
+    params = {"apikey": API_KEY, "t": title}
+    http = session or get_session()
+    timeout = timeout or _default_timeout
+    limiter = get_rate_limiter()
 
     # Retry logic
     for attempt in range(1, max_retries + 1):
+        limiter.acquire()
+
         try:
-            response = requests.get(api_url, timeout=timeout)
+            response = http.get(base_url, params=params, timeout=timeout)
 
             if response.status_code == 200:
                 movie_data = response.json()
 
                 if movie_data.get("Response") == "False":
                     # Get value of "Error" key from response.json, else return "Unknown Error!"
-                    raise ValueError(movie_data.get("Error", "Unknown Error"))
+                    error = movie_data.get("Error", "Unknown Error")
+                    if error == QUOTA_ERROR:
+                        limiter.exhaust()
+                        raise QuotaExceededError(error)
+                    if cache is not None and error in NOT_FOUND_ERRORS:
+                        cache.put_not_found(title, error)
+                    raise ValueError(error)
+
+                if cache is not None:
+                    cache.put(title, movie_data)
 
-                with open("data/response.json", "w", encoding="utf-8") as handle:
-                    json.dump(movie_data, handle, indent=4)
+                if save_response:
+                    with open("data/response.json", "w", encoding="utf-8") as handle:
+                        json.dump(movie_data, handle, indent=4)
 
                 return movie_data
 
-            else:
-                print(f"Error occurred: {response.status_code}")
-                # Retrying won't fix HTTP request errors (400s: e.g. Unauthorized, Forbidden, Not found)
-                break
+            if _is_quota_error(response):
+                # OMDb counts differently than we do, trust it and stop for today
+                limiter.exhaust()
+                raise QuotaExceededError(QUOTA_ERROR)
+
+            if response.status_code in RETRY_STATUS_CODES and attempt < max_retries:
+                print(f"Attempt {attempt} failed: HTTP {response.status_code}, retrying ...")
+                _retry(attempt)
+                continue
+
+            # Retrying won't fix other HTTP request errors (400s: e.g. Unauthorized, Forbidden, Not found)
+            raise ValueError(f"OMDb request failed with HTTP {response.status_code}.")
 
         except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
             print(f"Attempt {attempt} failed: {e}")
 
             if attempt < max_retries:
                 print("Retrying ...")
-                # wait 1 sec before retry
-                time.sleep(1)
+                _retry(attempt)
 
             else:
                 raise ValueError(f"Failed to fetch data from OMDb after {max_retries} attempts.")
 
         except requests.exceptions.RequestException as e:
-            print(f"An error occurred: {e}")
             # Unlikely to succeed on retry
-            break
+            raise ValueError(f"An error occurred: {e}")
+
+    raise ValueError(f"Failed to fetch data from OMDb after {max_retries} attempts.")
+
+
+def _is_quota_error(response):
+    """
+    Return True if <response> is OMDb telling us the API key's request limit is reached.
+    """
+    try:
+        return response.json().get("Error") == QUOTA_ERROR
+    except ValueError:
+        return False
 
 
+def get_movies_data(titles, max_workers=8, max_retries=3, timeout=None, base_url=BASE_URL, use_cache=True):
+    """
+    Fetch many titles from OMDb concurrently and yield results as they complete.
+
+    At most <max_workers> requests run at a time over the shared session, and
+    only a few titles per worker are read ahead from <titles>, so a huge
+    iterable (e.g. a file object) is streamed rather than loaded up front.
+    Requests are throttled by the shared rate limiter; once the daily quota
+    is used up, no further titles are read from <titles>.
+
+    Args:
+        titles (iterable): Movie titles to look up.
+        max_workers (int): Number of concurrent requests.
+
+    Yields:
+        tuple: (title, movie_data, error) - movie_data is None if error is set.
+    """
+    titles = iter(titles)
 
+    # Every worker needs its own keep-alive connection. Requests still running over the
+    # old, smaller session (e.g. from another thread) finish on it
+    with _session_lock:
+        pool_size, default_timeout = _pool_size, _default_timeout
+    if max_workers > pool_size:
+        configure_session(max_workers, *default_timeout)
+    session = get_session()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        def submit(batch_size):
+            for title in islice(titles, batch_size):
+                future = executor.submit(get_movie_data, title, max_retries, timeout, session, base_url,
+                                         False, use_cache)
+                pending[future] = title
+
+        pending = {}
+        submit(max_workers * 2)
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+
+            quota_exceeded = False
+
+            for future in done:
+                title = pending.pop(future)
+                # Only the lookup's own error is caught, not one thrown into this generator at the yield
+                try:
+                    result = title, future.result(), None
+                except QuotaExceededError as e:
+                    quota_exceeded = True
+                    result = title, None, e
+                except Exception as e:
+                    result = title, None, e
+                yield result
+
+            # Refill the queue with as many titles as just finished
+            if not quota_exceeded:
+                submit(len(done))
+
+
+def movie_info(movie_data):
+    """
+    Return the movie info dict to store for an OMDb response: year, rating, poster and
+    imdb_id as OMDb sends them, plus genres, directors, actors and languages as lists
+    of names and the runtime in minutes (see storage.movie_details).
+    """
+    return {
+        "year": movie_data["Year"],
+        "rating": movie_data["imdbRating"],
+        "poster": movie_data["Poster"],
+        "imdb_id": movie_data["imdbID"],
+        "genres": split_names(movie_data.get("Genre")),
+        "directors": split_names(movie_data.get("Director")),
+        "actors": split_names(movie_data.get("Actors")),
+        "languages": split_names(movie_data.get("Language")),
+        "runtime": parse_runtime(movie_data.get("Runtime"))
+    }
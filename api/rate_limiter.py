@@ -0,0 +1,209 @@
+from contextlib import contextmanager
+import datetime
+import json
+import os
+import threading
+import time
+from storage.file_lock import FileLock
+
+
+class QuotaExceededError(ValueError):
+    """
+    Raised when the daily OMDb request budget is used up.
+    Subclasses ValueError, so callers that handle OMDb errors already catch it.
+    """
+
+
+class RateLimiter:
+    """
+    Client-side throttle for OMDb requests.
+
+    A token bucket allows <rate> requests per second on average, with bursts
+    of up to <burst> requests. On top of that, a daily budget caps the number
+    of requests per UTC day, so a long bulk job can't get the API key blocked.
+    If <state_path> is given, the daily count is kept in that file and survives
+    restarts. Several processes can share it: every request re-reads the count
+    and writes it back under an exclusive lock on the file, so none are lost.
+    """
+
+    def __init__(self, rate=10.0, burst=None, daily_budget=1000, state_path=None):
+        """
+        Initialize the limiter with a full bucket.
+        """
+        self._rate = rate
+        self._burst = burst if burst is not None else max(1.0, rate)
+        self._daily_budget = daily_budget
+        self._state_path = state_path
+        self._file_lock = None if state_path is None else FileLock(state_path)
+
+        self._lock = threading.Lock()
+        self._tokens = self._burst
+        self._last_refill = time.monotonic()
+
+        self._day = self._today()
+        self._used_today = 0
+        if self._file_lock is not None:
+            with self._file_lock.shared():
+                self._load_state()
+
+
+    @staticmethod
+    def _today():
+        return datetime.datetime.now(datetime.timezone.utc).date().isoformat()
+
+
+    def _load_state(self):
+        """
+        Read today's request count from the state file, if there is one.
+        """
+        if self._state_path is None or not os.path.exists(self._state_path):
+            return
+
+        try:
+            with open(self._state_path, "r", encoding="utf-8") as handle:
+                state = json.load(handle)
+        except (OSError, json.JSONDecodeError):
+            return
+
+        if state.get("day") == self._day:
+            self._used_today = int(state.get("used", 0))
+
+
+    def _save_state(self):
+        """
+        Write today's request count to the state file, if there is one.
+        """
+        if self._state_path is None:
+            return
+
+        # Per process, in case the file lock isn't available (no fcntl)
+        tmp_path = f"{self._state_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump({"day": self._day, "used": self._used_today}, handle)
+        os.replace(tmp_path, self._state_path)
+
+
+    @contextmanager
+    def _synced_count(self):
+        """
+        Re-read today's count from the state file, hold the file lock while the caller
+        changes it and write it back. Without a state file only the own count is used.
+        Nothing is written if the caller raises. Must be called with the lock held.
+        """
+        if self._file_lock is None:
+            yield
+            return
+
+        with self._file_lock.exclusive():
+            self._load_state()
+            yield
+            self._save_state()
+
+
+    def _refill(self):
+        """
+        Add the tokens earned since the last refill and reset the daily count at midnight (UTC).
+        Must be called with the lock held.
+        """
+        now = time.monotonic()
+        self._tokens = min(self._burst, self._tokens + (now - self._last_refill) * self._rate)
+        self._last_refill = now
+
+        today = self._today()
+        if today != self._day:
+            self._day = today
+            self._used_today = 0
+
+
+    def acquire(self, block=True, timeout=None):
+        """
+        Take one request slot.
+
+        Args:
+            block (bool): Wait for a token if the bucket is empty.
+            timeout (float): Give up waiting after <timeout> seconds (None waits forever).
+
+        Returns:
+            bool: True if the request may be sent, False if no token was
+                  available in time (back-pressure: slow down).
+
+        Raises:
+            QuotaExceededError: If the daily budget is used up.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            with self._lock:
+                self._refill()
+
+                if self._tokens >= 1:
+                    # Other processes sharing the state file may have used up the budget
+                    with self._synced_count():
+                        self._check_budget()
+                        self._tokens -= 1
+                        self._used_today += 1
+                    return True
+
+                self._check_budget()
+
+                wait = (1 - self._tokens) / self._rate
+
+            if not block:
+                return False
+
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+
+            time.sleep(wait)
+
+
+    def _check_budget(self):
+        """
+        Raise QuotaExceededError if the daily budget is used up. Must be called with the lock held.
+        """
+        if self._used_today >= self._daily_budget:
+            raise QuotaExceededError(f"Daily OMDb quota of {self._daily_budget} requests used up.")
+
+
+    def exhaust(self):
+        """
+        Mark today's budget as used up, e.g. when OMDb itself reports the limit was reached.
+        """
+        with self._lock, self._synced_count():
+            self._used_today = self._daily_budget
+
+
+    def wait_time(self):
+        """
+        Return the seconds until the next token is available (0 if one is available now).
+        """
+        with self._lock:
+            self._refill()
+            return max(0.0, (1 - self._tokens) / self._rate)
+
+
+    def quota_remaining(self):
+        """
+        Return how many requests are left in today's budget.
+        """
+        with self._lock:
+            self._refill()
+            if self._file_lock is not None:
+                with self._file_lock.shared():
+                    self._load_state()
+            return max(0, self._daily_budget - self._used_today)
+
+
+    def stats(self):
+        """
+        Return the configured limits and today's usage.
+        """
+        return {
+            "rate": self._rate,
+            "daily_budget": self._daily_budget,
+            "used_today": self._daily_budget - self.quota_remaining(),
+            "quota_remaining": self.quota_remaining()
+        }
@@ -0,0 +1,206 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class ResponseCache:
+    """
+    On-disk cache of OMDb responses, stored in a small SQLite database.
+
+    Responses are keyed by normalized title, both the one asked for and the one
+    OMDb answered with, and can be looked up by imdbID too. Entries expire after
+    <ttl> seconds; "Movie not found!" answers are cached too, for <negative_ttl>
+    seconds, so unknown titles don't cost a request on every import. Once the
+    cache holds more than <max_entries> entries, the least recently used ones
+    are evicted.
+    """
+
+    DEFAULT_TTL = 7 * 24 * 60 * 60
+    DEFAULT_NEGATIVE_TTL = 24 * 60 * 60
+    DEFAULT_MAX_ENTRIES = 50_000
+    # Schema version, kept in SQLite's user_version; see _migrate()
+    VERSION = 1
+
+    def __init__(self, file_path, ttl=DEFAULT_TTL, negative_ttl=DEFAULT_NEGATIVE_TTL,
+                 max_entries=DEFAULT_MAX_ENTRIES):
+        """
+        Open (or create) the cache database at <file_path>.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+
+        self._ttl = ttl
+        self._negative_ttl = negative_ttl
+        self._max_entries = max_entries
+
+        # Bulk fetches use the cache from several threads
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(file_path, check_same_thread=False)
+        self._connection.executescript("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                movie_data TEXT,
+                error TEXT,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                imdb_id TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses (last_access);
+        """)
+        self._migrate()
+        self._connection.execute("CREATE INDEX IF NOT EXISTS idx_responses_imdb_id ON responses (imdb_id)")
+
+        self._size = self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+
+
+    def _migrate(self):
+        """
+        Bring a cache written by an earlier version up to VERSION, once.
+
+        Version 0 kept a second row per response under an "imdb:<id>" key. Those rows are
+        dropped and the imdbID goes into a column of the title rows instead.
+        """
+        version = self._connection.execute("PRAGMA user_version").fetchone()[0]
+        if version >= self.VERSION:
+            return
+
+        with self._connection:
+            columns = [row[1] for row in self._connection.execute("PRAGMA table_info(responses)")]
+            if "imdb_id" not in columns:
+                self._connection.execute("ALTER TABLE responses ADD COLUMN imdb_id TEXT")
+                self._connection.execute("DELETE FROM responses WHERE key LIKE 'imdb:%'")
+                self._connection.execute(
+                    "UPDATE responses SET imdb_id = lower(json_extract(movie_data, '$.imdbID')) "
+                    "WHERE movie_data IS NOT NULL"
+                )
+            self._connection.execute(f"PRAGMA user_version = {self.VERSION}")
+
+
+    @staticmethod
+    def _title_key(title):
+        """
+        Return the cache key for a title: case-insensitive, whitespace collapsed.
+        """
+        return "title:" + " ".join(title.casefold().split())
+
+
+    @staticmethod
+    def _imdb_id(imdb_id):
+        return imdb_id.strip().lower()
+
+
+    def _get(self, key=None, imdb_id=None):
+        """
+        Return (movie_data, error) for <key> (or the newest entry of <imdb_id>), or None on a miss.
+        """
+        now = time.time()
+
+        with self._lock:
+            if imdb_id is None:
+                row = self._connection.execute(
+                    "SELECT movie_data, error, expires_at, key FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+            else:
+                row = self._connection.execute(
+                    "SELECT movie_data, error, expires_at, key FROM responses WHERE imdb_id = ? "
+                    "ORDER BY expires_at DESC LIMIT 1", (imdb_id,)
+                ).fetchone()
+
+            if row is None or row[2] < now:
+                self.misses += 1
+                return None
+
+            with self._connection:
+                self._connection.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, row[3]))
+            self.hits += 1
+
+        movie_data, error, _, _ = row
+        return (json.loads(movie_data) if movie_data is not None else None), error
+
+
+    def get_by_title(self, title):
+        """
+        Look up a cached response by title.
+
+        Returns:
+            tuple: (movie_data, error) - movie_data is None for a cached "not found".
+            None: If the title isn't cached or its entry expired.
+        """
+        return self._get(self._title_key(title))
+
+
+    def get_by_imdb_id(self, imdb_id):
+        """
+        Look up a cached response by imdbID, e.g. "tt0113277".
+
+        Returns:
+            dict: The movie data, or None if it isn't cached or expired.
+        """
+        entry = self._get(imdb_id=self._imdb_id(imdb_id))
+        return entry[0] if entry is not None else None
+
+
+    def _put(self, rows):
+        """
+        Insert or replace (key, movie_data, error, expires_at, imdb_id) rows and evict if over capacity.
+        """
+        now = time.time()
+
+        with self._lock, self._connection:
+            for key, movie_data, error, expires_at, imdb_id in rows:
+                exists = self._connection.execute("SELECT 1 FROM responses WHERE key = ?", (key,)).fetchone()
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO responses (key, movie_data, error, expires_at, last_access, imdb_id) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, movie_data, error, expires_at, now, imdb_id)
+                )
+                if exists is None:
+                    self._size += 1
+
+            if self._size > self._max_entries:
+                # Evict down to 90% of the cap, so eviction doesn't run on every insert
+                excess = self._size - int(self._max_entries * 0.9)
+                cursor = self._connection.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY last_access LIMIT ?)", (excess,)
+                )
+                self._size -= cursor.rowcount
+
+
+    def put(self, title, movie_data):
+        """
+        Cache a successful response under the requested title and its OMDb title,
+        findable by its imdbID as well.
+        """
+        payload = json.dumps(movie_data)
+        expires_at = time.time() + self._ttl
+        imdb_id = self._imdb_id(movie_data["imdbID"]) if movie_data.get("imdbID") else None
+
+        keys = {self._title_key(title), self._title_key(movie_data.get("Title", title))}
+        self._put([(key, payload, None, expires_at, imdb_id) for key in keys])
+
+
+    def put_not_found(self, title, error):
+        """
+        Cache a "not found" answer for <title> (negative caching).
+        """
+        self._put([(self._title_key(title), None, error, time.time() + self._negative_ttl, None)])
+
+
+    def stats(self):
+        """
+        Return hit/miss counters and the number of cached entries.
+        """
+        return {"hits": self.hits, "misses": self.misses, "entries": self._size}
+
+
+    def clear(self):
+        """
+        Remove all cached responses.
+        """
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM responses")
+            self._size = 0
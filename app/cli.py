@@ -0,0 +1,495 @@
+"""
+Non-interactive commands for scripts, pipelines and cron jobs.
+
+Every command runs headless against one storage and writes JSON to stdout:
+commands working on a list of titles (add, import, delete, search) print one
+JSON object per title, in the order of the titles, followed by a
+{"summary": ...} line; stats and build-site print a single object. Anything
+else that gets printed on the way (retries, storage errors) goes to stderr,
+so stdout stays parseable.
+
+The filter command prints one JSON object per movie matching a genre,
+director, actor, language, lowest rating and/or longest runtime, best rated
+first, followed by a {"summary": ...} line.
+
+The enrich command works through a large file of titles and can be resumed:
+it prints {"progress": ...} lines as it goes and saves a checkpoint after
+every batch, see app/enrich.py.
+
+The serve command keeps running: it prints {"serving": url, "movies": count}
+and answers HTTP/JSON queries until interrupted, see app/server.py.
+
+Titles are read as a stream, from the command line, a file or stdin ('-'),
+and written to storage in batches, so a large import is a single process
+with a handful of storage writes instead of one menu round-trip per title.
+"""
+
+from collections import deque
+from contextlib import redirect_stdout
+import csv
+from itertools import islice
+import json
+import os
+import sys
+import time
+import api.omdb_api
+from app.enrich import enrich, BATCH_SIZE as ENRICH_BATCH_SIZE, PROGRESS_INTERVAL
+from app.posters import cache_posters
+from app.search_index import TitleSearchIndex
+from app.website import build_paged_site, build_site, PAGE_SIZE as SITE_PAGE_SIZE
+from storage.movie_details import format_details
+from storage.storage_csv import FIELDNAMES
+
+
+# Movies written to storage at once by add, import and delete
+BATCH_SIZE = 1000
+# Concurrent OMDb lookups of add and import
+WORKERS = 8
+EXPORT_FORMATS = ("ndjson", "json", "csv")
+# File extensions of the export formats
+EXPORT_EXTENSIONS = {".ndjson": "ndjson", ".jsonl": "ndjson", ".json": "json", ".csv": "csv"}
+
+
+def _emit(out, record):
+    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def _read_titles(titles):
+    """
+    Yield the non-empty, stripped lines of <titles>.
+    """
+    for line in titles:
+        line = line.strip()
+        if line:
+            yield line
+
+
+def _open_titles(sources):
+    """
+    Yield titles from the command line: the titles themselves, or the lines of
+    a file given as '@<path>', or stdin for '-' or no titles at all.
+    """
+    if not sources:
+        sources = ["-"]
+
+    for source in sources:
+        if source == "-":
+            yield from _read_titles(sys.stdin)
+        elif source.startswith("@"):
+            with open(source[1:], "r", encoding="utf-8") as handle:
+                yield from _read_titles(handle)
+        else:
+            yield source.strip()
+
+
+def _batches(items, size):
+    """
+    Yield lists of up to <size> items from <items>.
+    """
+    items = iter(items)
+    while True:
+        batch = list(islice(items, size))
+        if not batch:
+            return
+        yield batch
+
+
+def command_add(storage, titles, out, batch_size=BATCH_SIZE, workers=WORKERS, base_url=api.omdb_api.BASE_URL,
+                use_cache=True):
+    """
+    Fetch <titles> from OMDb and add the movies to the storage.
+
+    Titles already stored are skipped without a lookup. Lookups run concurrently, and
+    the fetched movies are added <batch_size> at a time.
+
+    Prints one line per title: {"query", "status": "added" | "exists" | "error", "title" or "error"},
+    in the order of <titles>. A line that is ready before the lines of the titles in front
+    of it (a faster lookup, or a movie waiting for its batch to be added) is held back until then.
+
+    Args:
+        base_url (str): OMDb endpoint, e.g. a local stand-in server for testing.
+        use_cache (bool): Look up and store the responses in the OMDb response cache.
+
+    Returns:
+        dict: Summary with the number of titles added, already stored and failed.
+    """
+    # Titles are checked against one snapshot, not with a storage lookup per title
+    existing = {title for title, _ in storage.iter_movies()}
+    summary = {"added": 0, "exists": 0, "failed": 0}
+    # query -> positions in <titles> of its running lookups (a title may be given twice)
+    positions = {}
+    # position -> line held back, and the position of the next line to print
+    held = {}
+    next_position = 0
+
+    def report(position, record):
+        nonlocal next_position
+        held[position] = record
+        while next_position in held:
+            _emit(out, held.pop(next_position))
+            next_position += 1
+
+    def new_titles():
+        for position, query in enumerate(titles):
+            if query in existing:
+                summary["exists"] += 1
+                report(position, {"query": query, "status": "exists", "title": query})
+            else:
+                positions.setdefault(query, deque()).append(position)
+                yield query
+
+    def commit(batch):
+        added = set(storage.add_movies({title: info for _, _, title, info in batch}))
+        # Titles not added were stored by another process since the snapshot was taken
+        for position, query, title, _ in batch:
+            status = "added" if title in added else "exists"
+            summary[status] += 1
+            report(position, {"query": query, "status": status, "title": title})
+
+    batch = []
+    batch_titles = set()
+    for query, movie_data, error in api.omdb_api.get_movies_data(new_titles(), max_workers=workers,
+                                                                     base_url=base_url, use_cache=use_cache):
+        position = positions[query].popleft()
+        if not positions[query]:
+            del positions[query]
+
+        if error is not None:
+            summary["failed"] += 1
+            report(position, {"query": query, "status": "error", "error": str(error)})
+            continue
+
+        title = movie_data["Title"]
+        # OMDb's title may differ from the query and be stored already
+        if title in existing or title in batch_titles:
+            summary["exists"] += 1
+            report(position, {"query": query, "status": "exists", "title": title})
+            continue
+
+        batch.append((position, query, title, api.omdb_api.movie_info(movie_data)))
+        batch_titles.add(title)
+
+        if len(batch) >= batch_size:
+            commit(batch)
+            existing.update(batch_titles)
+            batch, batch_titles = [], set()
+
+    if batch:
+        commit(batch)
+
+    summary["omdb_requests_left"] = api.omdb_api.quota_remaining()
+    return summary
+
+
+def command_delete(storage, titles, out, batch_size=BATCH_SIZE):
+    """
+    Delete the movies with <titles>, <batch_size> at a time.
+
+    Prints one line per title: {"title", "status": "deleted" | "missing"}.
+
+    Returns:
+        dict: Summary with the number of movies deleted and titles not found.
+    """
+    existing = {title for title, _ in storage.iter_movies()}
+    summary = {"deleted": 0, "missing": 0}
+
+    for batch in _batches(titles, batch_size):
+        found = [title for title in dict.fromkeys(batch) if title in existing]
+        summary["deleted"] += storage.delete_movies(found)
+        existing.difference_update(found)
+
+        found = set(found)
+        for title in batch:
+            if title in found:
+                found.discard(title)
+                _emit(out, {"title": title, "status": "deleted"})
+            else:
+                summary["missing"] += 1
+                _emit(out, {"title": title, "status": "missing"})
+
+    return summary
+
+
+def command_search(storage, queries, out, limit=5):
+    """
+    Fuzzy-search every query against the stored titles.
+
+    Prints one line per query: {"query", "matches": [{"title", "score", "year", "rating"}, ...]}, best first.
+
+    Returns:
+        dict: Summary with the number of queries and of queries without a match.
+    """
+    index = TitleSearchIndex(title for title, _ in storage.iter_movies())
+    summary = {"queries": 0, "unmatched": 0}
+
+    for query in queries:
+        matches = []
+        for title, score in index.search(query, limit=limit):
+            info = storage.get_movie(title)
+            matches.append({"title": title, "score": round(score, 1), "year": info["year"], "rating": info["rating"]})
+
+        summary["queries"] += 1
+        summary["unmatched"] += not matches
+        _emit(out, {"query": query, "matches": matches})
+
+    return summary
+
+
+def command_filter(storage, filters, out, limit=None):
+    """
+    Print the movies matching all <filters> (see IStorage.movies_by_details()), best rated first.
+
+    Prints one line per movie: {"title", "year", "rating", ...}.
+
+    Returns:
+        dict: Summary with the number of movies printed.
+    """
+    movies = storage.movies_by_details(**filters, limit=limit)
+    for title, info in movies:
+        _emit(out, {"title": title, **info})
+
+    return {"movies": len(movies)}
+
+
+def command_stats(storage):
+    """
+    Return rating statistics of the whole collection, computed over the storage's columnar movie table.
+    """
+    table = storage.movie_table()
+    return {"movies": len(table), **table.summary()}
+
+
+def command_build_site(storage, paged=False, page_size=SITE_PAGE_SIZE, shard_by=None, local_posters=False,
+                       full=False):
+    """
+    Write the website, like menu entries 9 (single page) and 12 (paged site).
+
+    Returns:
+        dict: The build_site() result, or pages, cards and bytes of a paged site;
+              with poster counts if <local_posters>.
+    """
+    result = {}
+    posters = None
+    if local_posters:
+        posters, result["posters"] = cache_posters(info["poster"] for _, info in storage.iter_movies())
+
+    if not paged:
+        result.update(build_site(storage.iter_movies(), incremental=not full, posters=posters))
+        return result
+
+    pages = build_paged_site(storage.iter_movies(), page_size=page_size, shard_by=shard_by, posters=posters)
+    result.update({"pages": len(pages), "cards": sum(page["cards"] for page in pages),
+                   "bytes_written": sum(page["bytes"] for page in pages)})
+    return result
+
+
+def command_serve(storage, host, port, out):
+    """
+    Serve the collection over HTTP until interrupted (Ctrl+C).
+    Prints {"serving": url, "movies": count} once the server is listening.
+
+    Args:
+        host (str): Address to listen on (defaults to app.server.HOST).
+        port (int): Port to listen on, 0 for any free one (defaults to app.server.PORT).
+    """
+    # Only the serve command needs the HTTP server, the other commands don't load it
+    from app.server import HOST, PORT, MovieServer
+
+    server = MovieServer(storage, HOST if host is None else host, PORT if port is None else port)
+    host, port = server.server_address[:2]
+    _emit(out, {"serving": f"http://{host}:{port}/", "movies": server.service.stats()["movies"]})
+    out.flush()
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def command_export(storage, handle, export_format):
+    """
+    Write all movies to <handle>, one at a time.
+
+    Args:
+        export_format (str): "ndjson" (one {"title", ...} object per line, as read by the
+                             .ndjson storage), "json" ({title: info}, as read by the .json
+                             storage) or "csv" (as read by the .csv storage).
+
+    Returns:
+        int: The number of movies written.
+    """
+    count = 0
+
+    if export_format == "csv":
+        writer = csv.DictWriter(handle, fieldnames=FIELDNAMES, extrasaction="ignore")
+        writer.writeheader()
+        for title, info in storage.iter_movies():
+            writer.writerow({"title": title, "notes": "", **info, **format_details(info)})
+            count += 1
+
+    elif export_format == "json":
+        handle.write("{")
+        for title, info in storage.iter_movies():
+            handle.write(",\n" if count else "\n")
+            handle.write(f"    {json.dumps(title, ensure_ascii=False)}: {json.dumps(info, ensure_ascii=False)}")
+            count += 1
+        handle.write("\n}\n")
+
+    else:
+        for title, info in storage.iter_movies():
+            handle.write(json.dumps({"title": title, **info}, ensure_ascii=False) + "\n")
+            count += 1
+
+    return count
+
+
+def add_command_parsers(parser):
+    """
+    Add the subcommands to the app's argument parser.
+    """
+    subparsers = parser.add_subparsers(dest="command", metavar="COMMAND",
+                                       help="Run one command without the menu and print JSON (see below).")
+
+    titles_help = "Titles, '@FILE' for the lines of a file, '-' (default) for the lines of stdin."
+
+    for name, help_text in (("add", "Fetch titles from OMDb and add them."),
+                            ("import", "Same as add, for files: one title per line.")):
+        command = subparsers.add_parser(name, help=help_text)
+        if name == "add":
+            command.add_argument("titles", nargs="*", help=titles_help)
+        else:
+            command.add_argument("files", nargs="*", help="Files with one title per line, '-' (default) for stdin.")
+        command.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                             help=f"Movies written to storage at once (default {BATCH_SIZE}).")
+        command.add_argument("--workers", type=int, default=WORKERS,
+                             help=f"Concurrent OMDb lookups (default {WORKERS}).")
+
+    command = subparsers.add_parser("enrich", help="Like import, for large files: resumable, with progress lines.")
+    command.add_argument("file", help="File with one title per line.")
+    command.add_argument("--checkpoint", help="Checkpoint file (default: FILE.checkpoint).")
+    command.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start from the top.")
+    command.add_argument("--batch-size", type=int, default=ENRICH_BATCH_SIZE,
+                         help=f"Movies written to storage, and checkpointed, at once (default {ENRICH_BATCH_SIZE}).")
+    command.add_argument("--workers", type=int, default=WORKERS,
+                         help=f"Concurrent OMDb lookups (default {WORKERS}).")
+    command.add_argument("--progress-interval", type=float, default=PROGRESS_INTERVAL,
+                         help=f"Seconds between progress lines (default {PROGRESS_INTERVAL:g}).")
+
+    command = subparsers.add_parser("delete", help="Delete movies by exact title.")
+    command.add_argument("titles", nargs="*", help=titles_help)
+    command.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                         help=f"Movies deleted from storage at once (default {BATCH_SIZE}).")
+
+    command = subparsers.add_parser("search", help="Fuzzy-search stored titles.")
+    command.add_argument("queries", nargs="*", help=titles_help)
+    command.add_argument("--limit", type=int, default=5, help="Matches per query (default 5).")
+
+    command = subparsers.add_parser("filter", help="List movies by genre, director, actor, language, rating, runtime.")
+    command.add_argument("--genre", help="Genre the movies must have, e.g. Drama.")
+    command.add_argument("--director", help="One of the directors, e.g. 'Paul Thomas Anderson'.")
+    command.add_argument("--actor", help="One of the actors.")
+    command.add_argument("--language", help="One of the languages.")
+    command.add_argument("--min-rating", type=float, help="Lowest rating, inclusive.")
+    command.add_argument("--max-runtime", type=int, help="Longest runtime in minutes, inclusive.")
+    command.add_argument("--limit", type=int, help="Print at most this many movies (default all).")
+
+    subparsers.add_parser("stats", help="Print rating statistics.")
+
+    command = subparsers.add_parser("build-site", help="Generate the website.")
+    command.add_argument("--paged", action="store_true", help="Write a paged site instead of a single page.")
+    command.add_argument("--page-size", type=int, default=SITE_PAGE_SIZE,
+                         help=f"Movies per page of a paged site (default {SITE_PAGE_SIZE}).")
+    command.add_argument("--shard-by", choices=("year", "letter"),
+                         help="Also write pages per release year or first letter (paged site only).")
+    command.add_argument("--full", action="store_true", help="Rebuild the whole page instead of only changed cards.")
+
+    command = subparsers.add_parser("serve", help="Answer HTTP/JSON queries until interrupted (see app/server.py).")
+    command.add_argument("--host", help="Address to listen on (default 127.0.0.1).")
+    command.add_argument("--port", type=int, help="Port to listen on, 0 for any free one (default 8000).")
+
+    command = subparsers.add_parser("export", help="Write all movies to a file or stdout.")
+    command.add_argument("output", nargs="?", default="-", help="File to write, '-' (default) for stdout.")
+    command.add_argument("--format", choices=EXPORT_FORMATS,
+                         help="Output format (default: from the file extension, else ndjson).")
+
+
+def run_command(storage, args):
+    """
+    Run the subcommand in <args> and print its JSON output.
+
+    Returns:
+        int: Exit status: 0 on success, 1 if any title failed.
+    """
+    try:
+        return _run_command(storage, args, sys.stdout)
+    except BrokenPipeError:
+        # The reader went away (e.g. "| head"), don't complain about stdout on exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+
+
+def _run_command(storage, args, out):
+    # Progress and error messages of the storage and OMDb client must not end up in the JSON output
+    with redirect_stdout(sys.stderr):
+        start = time.perf_counter()
+
+        if args.command in ("add", "import"):
+            sources = args.titles if args.command == "add" else [
+                source if source == "-" else "@" + source for source in args.files]
+            summary = command_add(storage, _open_titles(sources), out, args.batch_size, args.workers)
+            failed = summary["failed"]
+
+        elif args.command == "enrich":
+            summary = enrich(storage, args.file, out, args.checkpoint, args.restart, args.batch_size, args.workers,
+                             args.progress_interval)
+            # Stopped early (quota, Ctrl+C) counts as failed: run it again to continue
+            failed = summary["failed"] or not summary["complete"]
+
+        elif args.command == "delete":
+            summary = command_delete(storage, _open_titles(args.titles), out, args.batch_size)
+            failed = 0
+
+        elif args.command == "search":
+            summary = command_search(storage, _open_titles(args.queries), out, args.limit)
+            failed = 0
+
+        elif args.command == "filter":
+            filters = {"genre": args.genre, "director": args.director, "actor": args.actor,
+                       "language": args.language, "min_rating": args.min_rating, "max_runtime": args.max_runtime}
+            summary = command_filter(storage, filters, out, args.limit)
+            failed = 0
+
+        elif args.command == "stats":
+            _emit(out, command_stats(storage))
+            return 0
+
+        elif args.command == "serve":
+            command_serve(storage, args.host, args.port, out)
+            return 0
+
+        elif args.command == "build-site":
+            _emit(out, command_build_site(storage, args.paged, args.page_size, args.shard_by,
+                                          args.local_posters, args.full))
+            return 0
+
+        else:
+            export_format = args.format
+            if export_format is None:
+                extension = os.path.splitext(args.output)[1].lower()
+                export_format = EXPORT_EXTENSIONS.get(extension, "ndjson")
+
+            if args.output == "-":
+                command_export(storage, out, export_format)
+                return 0
+
+            with open(args.output, "w", encoding="utf-8", newline="") as handle:
+                count = command_export(storage, handle, export_format)
+            _emit(out, {"summary": {"exported": count, "output": args.output, "format": export_format}})
+            return 0
+
+        summary["seconds"] = round(time.perf_counter() - start, 3)
+        _emit(out, {"summary": summary})
+
+    return 1 if failed else 0
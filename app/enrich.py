@@ -0,0 +1,252 @@
+"""
+Bulk enrichment: a file of titles -> OMDb -> storage, resumable after an interruption.
+
+The titles file is read line by line and streamed through concurrent OMDb
+lookups (api.omdb_api.get_movies_data). Titles already in storage, or seen
+earlier in the same run, are skipped without a lookup; fetched movies are
+added to storage in batches.
+
+After every batch, the progress is saved to a checkpoint file next to the
+titles file ('<titles file>.checkpoint'): the byte offset up to which every
+line is finished (stored, skipped or failed) and the counts so far. Lookups
+finish out of order, so a few lines past that offset may be done already;
+a resumed job looks them up again and skips them as stored. Running the same
+job again continues from the checkpoint, so a job of 100k titles survives
+Ctrl+C, a crash or the daily OMDb quota running out.
+"""
+
+import json
+import os
+import time
+import api.omdb_api
+from api.rate_limiter import QuotaExceededError
+from storage.file_lock import replace_file
+
+
+# Movies written to storage at once, a checkpoint is saved after each batch
+BATCH_SIZE = 500
+# Concurrent OMDb lookups
+WORKERS = 8
+# Seconds between two progress lines
+PROGRESS_INTERVAL = 5.0
+CHECKPOINT_SUFFIX = ".checkpoint"
+CHECKPOINT_VERSION = 1
+
+
+def _emit(out, record):
+    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+class _Watermark:
+    """
+    Track which lines of the titles file are finished, in any order, and the byte
+    offset up to which all of them are. That offset is where a resumed job starts.
+
+    The outcome of a line is only added to <counts> once the offset moves past it,
+    so the counts saved with the offset are those of the lines before it, and lines
+    done again by a resumed job aren't counted twice.
+    """
+
+    def __init__(self, offset, counts):
+        self.offset = offset
+        self._counts = counts
+        # Number of the first unfinished line, the end offsets of lines from there on
+        # and the outcomes of those already finished
+        self._next = 0
+        self._ends = {}
+        self._finished = {}
+
+
+    def start(self, number, end):
+        """
+        Register line <number>, which ends at byte offset <end>.
+        """
+        self._ends[number] = end
+
+
+    def finish(self, number, outcome=None):
+        """
+        Mark line <number> as finished with <outcome> ("added", "exists", "failed" or None
+        for a blank line) and move the offset past all lines finished in a row.
+        """
+        self._finished[number] = outcome
+
+        while self._next in self._finished:
+            outcome = self._finished.pop(self._next)
+            if outcome is not None:
+                self._counts["titles"] += 1
+                self._counts[outcome] += 1
+            self.offset = self._ends.pop(self._next)
+            self._next += 1
+
+
+def _read_lines(path, offset):
+    """
+    Yield (stripped line, byte offset of its end) for the lines of <path> from <offset> on.
+    """
+    with open(path, "rb") as handle:
+        handle.seek(offset)
+        for line in handle:
+            offset += len(line)
+            yield line.decode("utf-8").strip(), offset
+
+
+def load_checkpoint(path):
+    """
+    Return the state saved in the checkpoint file at <path>, or None if there is none.
+
+    Raises:
+        ValueError: If the file isn't a checkpoint of a supported version.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as handle:
+            state = json.load(handle)
+    except FileNotFoundError:
+        return None
+    except json.JSONDecodeError:
+        raise ValueError(f"{path} is not an enrichment checkpoint.")
+
+    if not isinstance(state, dict) or state.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"{path} is not an enrichment checkpoint (version {CHECKPOINT_VERSION}).")
+    return state
+
+
+def _save_checkpoint(path, state):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as handle:
+        json.dump(state, handle)
+    replace_file(tmp_path, path)
+
+
+def enrich(storage, titles_path, out, checkpoint_path=None, restart=False, batch_size=BATCH_SIZE,
+           workers=WORKERS, progress_interval=PROGRESS_INTERVAL, base_url=api.omdb_api.BASE_URL, use_cache=True):
+    """
+    Fetch the titles in <titles_path> (one per line) from OMDb and add the movies to the storage,
+    continuing from the checkpoint of an earlier run if there is one.
+
+    Prints a line per failed title: {"query", "status": "error", "error"}, and every
+    <progress_interval> seconds a {"progress": ...} line with the counts so far and the
+    throughput of this run.
+
+    Args:
+        checkpoint_path (str): Checkpoint file (defaults to '<titles_path>.checkpoint').
+        restart (bool): Ignore an existing checkpoint and start from the first line.
+        base_url (str): OMDb endpoint, e.g. a local stand-in server for testing.
+        use_cache (bool): Look up and store the responses in the OMDb response cache.
+
+    Returns:
+        dict: Summary with the counts (of all runs of this job), the titles per second of
+              this run, whether the whole file is done and why the run stopped early, if it did.
+
+    Raises:
+        ValueError: If the checkpoint belongs to another titles file.
+    """
+    titles_path = os.path.abspath(titles_path)
+    checkpoint_path = checkpoint_path or titles_path + CHECKPOINT_SUFFIX
+    state = None if restart else load_checkpoint(checkpoint_path)
+
+    if state is not None and state["titles"] != titles_path:
+        raise ValueError(f"{checkpoint_path} is the checkpoint of {state['titles']}, not of {titles_path}.")
+
+    counts = state["counts"] if state else {"titles": 0, "added": 0, "exists": 0, "failed": 0, "retries": 0}
+    watermark = _Watermark(state["offset"] if state else 0, counts)
+    start = time.perf_counter()
+    # Retries and titles of earlier runs, this run's are counted on top
+    retries_before, retries_total = api.omdb_api.retry_count(), counts["retries"]
+    run_titles = counts["titles"]
+    stopped = None
+
+    # Query -> line number of the lookups in flight, and the movies and line numbers of the next batch
+    pending = {}
+    batch = {}
+    batch_lines = []
+    # Queries looked up in this run
+    seen = set()
+
+    def count_retries():
+        counts["retries"] = retries_total + api.omdb_api.retry_count() - retries_before
+
+    def progress():
+        count_retries()
+        elapsed = time.perf_counter() - start
+        rate = (counts["titles"] - run_titles) / elapsed if elapsed else 0.0
+        return {**counts, "titles_per_second": round(rate, 1), "seconds": round(elapsed, 3),
+                "offset": watermark.offset}
+
+    def checkpoint():
+        count_retries()
+        _save_checkpoint(checkpoint_path, {"version": CHECKPOINT_VERSION, "titles": titles_path,
+                                           "offset": watermark.offset, "counts": counts})
+
+    def commit():
+        # Taken out first: if writing fails, the finally below mustn't write the same batch again.
+        # Its lines stay unfinished, so a resumed job looks them up again
+        movies, lines = dict(batch), list(batch_lines)
+        batch.clear()
+        batch_lines.clear()
+
+        added = set(storage.add_movies(movies))
+        # Any not added were stored by another process since they were checked
+        for title, number in zip(movies, lines):
+            watermark.finish(number, "added" if title in added else "exists")
+        checkpoint()
+
+    def queries():
+        for number, (query, end) in enumerate(_read_lines(titles_path, watermark.offset)):
+            watermark.start(number, end)
+
+            if not query:
+                watermark.finish(number)
+            elif query in seen or query in batch or storage.movie_exist(query):
+                watermark.finish(number, "exists")
+            else:
+                seen.add(query)
+                pending[query] = number
+                yield query
+
+    next_progress = start + progress_interval
+
+    try:
+        for query, movie_data, error in api.omdb_api.get_movies_data(queries(), max_workers=workers,
+                                                                     base_url=base_url, use_cache=use_cache):
+            number = pending.pop(query)
+
+            if isinstance(error, QuotaExceededError):
+                # Left unfinished, a resumed job looks it up again
+                stopped = "quota"
+
+            elif error is not None:
+                _emit(out, {"query": query, "status": "error", "error": str(error)})
+                watermark.finish(number, "failed")
+
+            elif movie_data["Title"] in batch or storage.movie_exist(movie_data["Title"]):
+                # OMDb's title may differ from the query and be stored already
+                watermark.finish(number, "exists")
+
+            else:
+                batch[movie_data["Title"]] = api.omdb_api.movie_info(movie_data)
+                batch_lines.append(number)
+
+                if len(batch) >= batch_size:
+                    commit()
+
+            if time.perf_counter() >= next_progress:
+                _emit(out, {"progress": progress()})
+                out.flush()
+                next_progress += progress_interval
+
+    except KeyboardInterrupt:
+        stopped = "interrupted"
+
+    finally:
+        # Whatever was fetched is kept, also when stopped by an exception
+        if batch:
+            commit()
+        else:
+            checkpoint()
+
+    summary = progress()
+    summary["complete"] = watermark.offset == os.path.getsize(titles_path)
+    if stopped is not None:
+        summary["stopped"] = stopped
+    return summary
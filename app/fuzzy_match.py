@@ -0,0 +1,107 @@
+"""
+Fuzzy title matching on rapidfuzz.
+
+All fuzzy matching in the app goes through this module. Scores use the same
+WRatio scorer and 0-100 scale as fuzzywuzzy's process.extract, but a query is
+scored against the whole title list in one call to compiled code, and
+large collections can be spread across CPU cores.
+"""
+
+from rapidfuzz import fuzz, process, utils
+import numpy as np
+
+
+# Matches scoring below this are not shown to the user
+SCORE_THRESHOLD = 70
+# Above this many titles, a single query is scored on all CPU cores
+PARALLEL_MIN_TITLES = 50_000
+# Rough cap on the size of one block of the score matrix (bytes), see match_many()
+MAX_BLOCK_BYTES = 64 * 1024 * 1024
+
+
+def score_matrix(queries, titles, workers=1):
+    """
+    Score every query against every title.
+
+    Args:
+        queries (list): Query strings.
+        titles (list): Movie titles.
+        workers (int): Number of CPU cores to use, -1 for all of them.
+
+    Returns:
+        numpy.ndarray: uint8 matrix of shape (len(queries), len(titles)) with scores 0-100.
+    """
+    return process.cdist(queries, titles, scorer=fuzz.WRatio, processor=utils.default_process,
+                         dtype=np.uint8, workers=workers)
+
+
+def extract(query, titles, limit=5, threshold=SCORE_THRESHOLD):
+    """
+    Return the best matches for <query> among <titles>.
+
+    Args:
+        query (str): What the user typed.
+        titles (list): Movie titles to match against.
+        limit (int): Maximum number of matches.
+        threshold (int): Minimum score of a match.
+
+    Returns:
+        list: Up to <limit> (title, score) tuples, best first.
+    """
+    if not titles:
+        return []
+
+    if len(titles) < PARALLEL_MIN_TITLES:
+        matches = process.extract(query, titles, scorer=fuzz.WRatio, processor=utils.default_process,
+                                  limit=limit, score_cutoff=threshold)
+        return [(title, round(score)) for title, score, _ in matches]
+
+    scores = score_matrix([query], titles, workers=-1)[0]
+    return _best_of_row(scores, titles, limit, threshold)
+
+
+def _best_of_row(scores, titles, limit, threshold):
+    """
+    Return the <limit> best (title, score) tuples of one score matrix row, best first.
+    """
+    if limit < len(scores):
+        # Partial sort: only the <limit> best columns are ordered
+        best = np.argpartition(scores, -limit)[-limit:]
+    else:
+        best = np.arange(len(scores))
+
+    best = best[np.argsort(scores[best], kind="stable")[::-1]]
+    return [(titles[i], int(scores[i])) for i in best if scores[i] >= threshold]
+
+
+def match_many(queries, titles, limit=1, threshold=SCORE_THRESHOLD, workers=-1):
+    """
+    Resolve many query strings against the catalog at once, e.g. to reconcile an imported list.
+
+    The score matrix is computed in blocks of queries, so memory stays bounded
+    even for thousands of queries against a large catalog.
+
+    Args:
+        queries (list): Query strings.
+        titles (list): Movie titles to match against.
+        limit (int): Maximum number of matches per query.
+        threshold (int): Minimum score of a match.
+        workers (int): Number of CPU cores to use, -1 for all of them.
+
+    Yields:
+        tuple: (query, matches) with matches as a list of (title, score) tuples, best first.
+    """
+    queries = list(queries)
+    if not titles:
+        for query in queries:
+            yield query, []
+        return
+
+    block_size = max(1, MAX_BLOCK_BYTES // len(titles))
+
+    for start in range(0, len(queries), block_size):
+        block = queries[start:start + block_size]
+        scores = score_matrix(block, titles, workers=workers)
+
+        for query, row in zip(block, scores):
+            yield query, _best_of_row(row, titles, limit, threshold)
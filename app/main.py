@@ -1,22 +1,40 @@
 """
 Main entry point for the Movie App.
 
-This script takes a .json or .csv filename as a command-line argument,
+This script takes a .json, .ndjson/.jsonl, .csv, .db/.sqlite or .mvdb filename as a command-line argument,
 determines the file type, initializes the appropriate storage class,
 and launches the MovieApp.
 
+With --reconcile, no menu is shown: each line of the given file (or stdin for '-')
+is fuzzy-matched against the stored titles and printed as one JSON object per line.
+
+With a command (add, import, enrich, delete, search, filter, stats, build-site, export, serve), no menu
+is shown either: the command runs headless and prints JSON, see app/cli.py.
+
 Usage:
-    python3 -m app.main <filename.json|filename.csv>
+    python3 -m app.main <filename.json|filename.ndjson|filename.csv|filename.db|filename.mvdb>
+                        [--journal] [--compact] [--streaming] [--local-posters] [--reconcile <file|->]
+                        [<command> [<args>]]
 
 Example:
     python3 -m app.main movies.json
+    python3 -m app.main movies.json --reconcile watchlist.txt
+    python3 -m app.main movies.json import titles.txt
+    python3 -m app.main movies.json enrich backlog.txt
+    python3 -m app.main movies.db filter --director "Paul Thomas Anderson" --genre Drama --min-rating 8
+    cat titles.txt | python3 -m app.main movies.db delete
 """
 
+import json
 import os.path
 import sys
+from app.cli import add_command_parsers, run_command
+from app.fuzzy_match import match_many
 from app.movie_app import MovieApp
-from storage.storage_json import StorageJson
+from storage.storage_json import StorageJson, NDJSON_EXTENSIONS
 from storage.storage_csv import StorageCsv
+from storage.storage_sqlite import StorageSqlite
+from storage.storage_binary import StorageBinary
 import argparse
 
 
@@ -24,11 +42,36 @@ import argparse
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
 
 
+def reconcile(storage, queries_file):
+    """
+    Print the best stored title for every query line in <queries_file>, as JSON lines.
+    """
+    titles = [title for title, _ in storage.iter_movies()]
+    queries = [line.strip() for line in queries_file if line.strip()]
+
+    for query, matches in match_many(queries, titles):
+        match, score = matches[0] if matches else (None, None)
+        print(json.dumps({"query": query, "match": match, "score": score}, ensure_ascii=False))
+
+
 if __name__ == "__main__":
     # Set up the argument parser
-    parser = argparse.ArgumentParser(description="A Movie App for managing movie data stored in .json or .csv files.")
-    parser.add_argument("filename", help="Path to the .json or .csv file where movie data is stored."
-         "Use .json for structured data or .csv for spreadsheet-style data.")
+    parser = argparse.ArgumentParser(description="A Movie App for managing movie data stored in .json, .csv, SQLite "
+                                                 "or binary snapshot files.")
+    parser.add_argument("filename", help="Path to the .json, .ndjson, .csv, .db/.sqlite or .mvdb file where movie data is stored. "
+         "Use .json for structured data, .csv for spreadsheet-style data, .db for large collections "
+         "or .mvdb for fast startup.")
+    parser.add_argument("--journal", action="store_true",
+                        help="Append changes to a log next to the data file instead of rewriting the whole file.")
+    parser.add_argument("--compact", action="store_true",
+                        help="Write a .json file without indentation (smaller and faster to write).")
+    parser.add_argument("--streaming", action="store_true",
+                        help="Read and rewrite a .csv file row by row instead of keeping it in memory.")
+    parser.add_argument("--local-posters", action="store_true",
+                        help="Download posters into static/posters and serve them (and thumbnails) from the website.")
+    parser.add_argument("--reconcile", metavar="FILE",
+                        help="Match each line of FILE ('-' for stdin) against the stored titles and exit.")
+    add_command_parsers(parser)
 
     # Parse arguments
     args = parser.parse_args()
@@ -37,16 +80,37 @@ if __name__ == "__main__":
     # Split filename into 2 parts, <name> and <ext> (extension)
     name, ext = os.path.splitext(filename)
 
-    if ext == ".json":
+    if ext == ".json" or ext in NDJSON_EXTENSIONS:
         # Initialize storage objects, pass <filename> to <__init__>, create file path
-        storage = StorageJson(filename)
+        storage = StorageJson(filename, journal=args.journal, indent=None if args.compact else 4)
 
     elif ext == ".csv":
-        storage = StorageCsv(filename)
+        if args.journal and args.streaming:
+            print("--journal and --streaming can't be combined.")
+            sys.exit(1)
+        storage = StorageCsv(filename, journal=args.journal, streaming=args.streaming)
+
+    elif ext in (".db", ".sqlite"):
+        storage = StorageSqlite(filename)
+
+    elif ext == ".mvdb":
+        storage = StorageBinary(filename)
 
     else:
-        print("Unsupported file type. Please use a .json or .csv file.")
+        print("Unsupported file type. Please use a .json, .ndjson, .jsonl, .csv, .db, .sqlite or .mvdb file.")
+        sys.exit(1)
+
+    if args.reconcile:
+        if args.reconcile == "-":
+            reconcile(storage, sys.stdin)
+        else:
+            with open(args.reconcile, "r", encoding="utf-8") as handle:
+                reconcile(storage, handle)
+        sys.exit(0)
+
+    if args.command:
+        sys.exit(run_command(storage, args))
 
     # Initialize the app with storage objects
-    movie_app = MovieApp(storage)
+    movie_app = MovieApp(storage, local_posters=args.local_posters)
     movie_app.run()
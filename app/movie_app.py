@@ -1,14 +1,198 @@
+from itertools import islice
 import random
-from fuzzywuzzy import process
 import api.omdb_api
+from app.movie_stats import RatingStats
+from app.posters import cache_posters
+from app.search_index import TitleSearchIndex
+from app.sorted_index import SortedIndex, rating_key, year_key
+from app.website import build_paged_site, build_site, PAGE_SIZE as SITE_PAGE_SIZE
+from storage.movie_details import FacetIndex, pick_details
+from storage.movie_table import PERCENTILES
+
+
+# Number of movies printed before asking whether to show more
+PAGE_SIZE = 20
 
 
 class MovieApp:
-    def __init__(self, data_storage):
+    def __init__(self, data_storage, local_posters=False):
         """
         Initialize the MovieApp with a given storage.
+
+        Args:
+            data_storage (IStorage): Where the movies are stored.
+            local_posters (bool): Download posters into a local cache and serve them from
+                                  the generated website, instead of linking the remote images.
         """
         self._data_storage = data_storage
+        self._local_posters = local_posters
+
+        # Fuzzy title search index, rating statistics, sorted rating (best first) and year indexes,
+        # genre/director/actor/language index and the storage revision they were synced at
+        self._search_index = TitleSearchIndex()
+        self._stats = RatingStats()
+        self._rating_index = SortedIndex(rating_key, descending=True)
+        self._year_index = SortedIndex(year_key)
+        self._facet_index = FacetIndex()
+        self._indexed_revision = None
+
+
+    def _refresh_indexes(self, movies=None):
+        """
+        Bring the search index, statistics and sorted indexes up to date with the storage.
+        Nothing is reloaded if the storage revision didn't change since the last refresh.
+
+        Args:
+            movies (dict): All movies, if the caller already loaded them.
+        """
+        revision = self._data_storage.revision()
+        if revision is not None and revision == self._indexed_revision:
+            return
+
+        if movies is None:
+            # Only year, rating and the details are indexed; don't hold on to the rest of every record
+            movies = {title: {"year": info["year"], "rating": info["rating"], **pick_details(info)}
+                      for title, info in self._data_storage.iter_movies()}
+
+        # Only titles added or removed since the last sync are (re)indexed
+        self._search_index.sync(movies.keys())
+        self._stats.rebuild(movies)
+        self._rating_index.rebuild(movies)
+        self._year_index.rebuild(movies)
+        self._facet_index.rebuild(movies)
+        self._indexed_revision = revision
+
+
+    def _movie_changed(self, revision_before, title, info):
+        """
+        Apply a change this app just made to the storage to the search index, statistics and sorted indexes,
+        instead of rebuilding them on the next refresh.
+
+        Args:
+            revision_before: Storage revision read right before the change.
+            title (str): The changed movie.
+            info (dict): Its new info, or None if it was deleted.
+        """
+        self._movies_changed(revision_before, {title: info})
+
+
+    def _movies_changed(self, revision_before, changes):
+        """
+        Apply a batch of changes this app just made to the storage to the indexes, see _movie_changed().
+
+        Args:
+            revision_before: Storage revision read right before the batch was written.
+            changes (dict): Changed titles mapped to their new info, or None if deleted.
+        """
+        revision_after = self._data_storage.revision()
+
+        # Indexes were out of date anyway, or the storage didn't change: leave it to the next refresh
+        if revision_before is None or revision_before != self._indexed_revision \
+                or revision_after == revision_before:
+            return
+
+        for title, info in changes.items():
+            if info is None:
+                self._search_index.remove(title)
+                self._stats.remove(title)
+                self._rating_index.remove(title)
+                self._year_index.remove(title)
+                self._facet_index.remove(title)
+            else:
+                self._search_index.add(title)
+                self._stats.add(title, info)
+                self._rating_index.add(title, info)
+                self._year_index.add(title, info)
+                self._facet_index.add(title, info)
+
+        self._indexed_revision = revision_after
+
+
+    def _prompt_for_matches(self):
+        """
+        Prompt user for part of a movie title until it fuzzy-matches stored movies.
+        Call _refresh_indexes() first, so the search index is up to date.
+
+        Returns:
+            list: Up to 5 (title, score) tuples, best first, or None if the user cancelled.
+        """
+        while True:
+            user_input = input("Enter part of the movie title (or 'q' to cancel): ").casefold().strip()
+
+            if user_input.lower() == "q":
+                print("Action cancelled.")
+                return None
+
+            # check for empty string
+            if not user_input:
+                print("Invalid input! Title cannot be empty.")
+                continue
+
+            # fuzzy search over the titles picked by the trigram index, scores below 70 are dropped
+            matches = self._search_index.search(user_input, limit=5)
+
+            if matches:
+                return matches
+
+            print(f"No matches found, try again ...")
+
+
+    @staticmethod
+    def _print_paged(lines):
+        """
+        Print <lines> (any iterable, consumed lazily) PAGE_SIZE at a time,
+        asking before each further page.
+        """
+        lines = iter(lines)
+        page = list(islice(lines, PAGE_SIZE))
+
+        while page:
+            for line in page:
+                print(line)
+
+            page = list(islice(lines, PAGE_SIZE))
+            if page and input("Press enter for more (or 'q' to stop): ").strip().lower() == "q":
+                return
+
+
+    @staticmethod
+    def _in_range(value, low, high):
+        """
+        Return True if low <= value <= high. None bounds are open; without any bound, anything matches.
+        """
+        if low is None and high is None:
+            return True
+        return value is not None and (low is None or value >= low) and (high is None or value <= high)
+
+
+    @staticmethod
+    def _prompt_for_bound(prompt, minimum, maximum):
+        """
+        Prompt user for an optional number between <minimum> and <maximum>.
+
+        Returns:
+            float: The number, None if the user left it empty, or "q" if the user cancelled.
+        """
+        while True:
+            user_input = input(f"{prompt} (empty for any, 'q' to cancel): ").strip()
+
+            if user_input.lower() == "q":
+                print("Action cancelled.")
+                return "q"
+
+            if not user_input:
+                return None
+
+            try:
+                bound = float(user_input.replace(",", "."))
+            except ValueError:
+                print(f"Invalid input! Please enter a number between {minimum} and {maximum}.")
+                continue
+
+            if not minimum <= bound <= maximum:
+                print(f"Invalid input! Please enter a number between {minimum} and {maximum}.")
+                continue
+            return bound
 
 
     def _command_list_movies(self):
@@ -16,11 +200,12 @@ class MovieApp:
         List all movies stored in the app
         with their title, year, and rating.
         """
-        movies = self._data_storage.list_movies()
-        print(f"{len(movies)} movies in total:")
-        for title, info in movies.items():
+        count = 0
+        for title, info in self._data_storage.iter_movies():
             notes = info.get("notes", "")
             print(f"{title} ({info['year']}): {info['rating']} | Notes: {notes}")
+            count += 1
+        print(f"{count} movies in total.")
 
 
     def _command_add_movie(self):
@@ -57,50 +242,75 @@ class MovieApp:
                 print(f"An unexpected error occurred: {e}")
                 continue
 
-        self._data_storage.add_movie(
-            movie_data["Title"],
-            movie_data["Year"],
-            movie_data["imdbRating"],
-            movie_data["Poster"],
-            movie_data["imdbID"]
-        )
+        # Keeps the genres, directors, actors, languages and runtime as well
+        info = api.omdb_api.movie_info(movie_data)
+        revision = self._data_storage.revision()
+        if not self._data_storage.add_movies({movie_data["Title"]: info}):
+            print(f"Movie {movie_data['Title']} already exists in database.")
+            return
+
+        self._movie_changed(revision, movie_data["Title"], info)
         print(f"Movie {user_input} successfully added")
 
 
-    def _command_delete_movie(self):
+    def _command_import_movies(self):
         """
-        Prompt user to enter a movie title
-        to delete from storage.
+        Prompt user for a text file with one movie title per line,
+        fetch the titles from OMDb concurrently and add them all to the storage in one batch.
         """
-        movies = self._data_storage.list_movies()
-
         while True:
-            user_input = input("Enter part of the movie title (or 'q' to cancel): ").casefold().strip()
+            file_path = input("Enter path to a file with one title per line (or 'q' to cancel): ").strip()
 
-            if user_input.lower() == "q":
+            if file_path.lower() == "q":
                 print("Action cancelled.")
                 return
 
-            # check for empty string
-            if not user_input.strip():
-                print("Invalid input! Title cannot be empty.")
+            try:
+                with open(file_path, "r", encoding="utf-8") as handle:
+                    titles = [line.strip() for line in handle if line.strip()]
+                break
+
+            except OSError as e:
+                print(f"Could not read file: {e}")
                 continue
 
-            # fuzzymatch module: using process.extract() to get best matches
-            best_matches = process.extract(user_input, movies.keys(), limit=5)
+        titles_to_fetch = []
+        for title in titles:
+            if self._data_storage.movie_exist(title):
+                print(f"Movie {title} already exists in database.")
+            else:
+                titles_to_fetch.append(title)
 
-            # manually filter matches based on score threshold
-            filtered_matches = [(movie, score) for movie, score in best_matches if score >= 70]
-            sorted_filtered_matches = sorted(filtered_matches, key=lambda item: item[1], reverse=True)
+        new_movies = {}
+        # Titles are fetched concurrently, results come back in completion order
+        for title, movie_data, error in api.omdb_api.get_movies_data(titles_to_fetch):
+            if error is not None:
+                print(f"{title}: {str(error)}")
+                continue
 
-            if sorted_filtered_matches:
-                for i in range(len(sorted_filtered_matches)):
-                    print(f"{i + 1}. {sorted_filtered_matches[i][0]}")
-                break
+            new_movies[movie_data["Title"]] = api.omdb_api.movie_info(movie_data)
+
+        added = self._data_storage.add_movies(new_movies)
+        print(f"{len(added)} of {len(titles)} movies successfully imported")
+
+        cache_stats = api.omdb_api.get_response_cache().stats()
+        print(f"OMDb response cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+        print(f"OMDb requests left today: {api.omdb_api.quota_remaining()}")
 
-            else:
-                print(f"No matches found, try again ...")
-                continue
+
+    def _command_delete_movie(self):
+        """
+        Prompt user to enter a movie title
+        to delete from storage.
+        """
+        self._refresh_indexes()
+
+        matches = self._prompt_for_matches()
+        if matches is None:
+            return
+
+        for i in range(len(matches)):
+            print(f"{i + 1}. {matches[i][0]}")
 
         while True:
             user_choice = input("\nEnter the number for the movie to delete (or 'q' to cancel): ").strip()
@@ -119,48 +329,29 @@ class MovieApp:
                 continue
 
             else:
-                movie_to_delete = sorted_filtered_matches[int(user_choice) - 1][0]
+                movie_to_delete = matches[int(user_choice) - 1][0]
                 break
 
+        revision = self._data_storage.revision()
         self._data_storage.delete_movie(movie_to_delete)
+        self._movie_changed(revision, movie_to_delete, None)
 
 
     def _command_update_movie(self):
         """
         Prompt user to update the rating of an existing movie.
         """
-        movies = self._data_storage.list_movies()
+        self._refresh_indexes()
         movie_to_update = ""
         new_rating = ""
         movies_notes = ""
 
-        while True:
-            user_input = input("Enter part of the movie title (or 'q' to cancel): ").casefold().strip()
+        matches = self._prompt_for_matches()
+        if matches is None:
+            return
 
-            if user_input.lower() == "q":
-                print("Action cancelled.")
-                return
-
-            # check for empty string
-            if not user_input.strip():
-                print("Invalid input! Title cannot be empty.")
-                continue
-
-            # fuzzymatch module: using process.extract() to get best matches
-            best_matches = process.extract(user_input, movies.keys(), limit=5)
-
-            # manually filter matches based on score threshold
-            filtered_matches = [(movie, score) for movie, score in best_matches if score >= 70]
-            sorted_filtered_matches = sorted(filtered_matches, key=lambda item: item[1], reverse=True)
-
-            if sorted_filtered_matches:
-                for i in range(len(sorted_filtered_matches)):
-                    print(f"{i + 1}. {sorted_filtered_matches[i][0]}")
-                break
-
-            else:
-                print(f"No matches found, try again ...")
-                continue
+        for i in range(len(matches)):
+            print(f"{i + 1}. {matches[i][0]}")
 
         while True:
             user_choice = input("\nEnter the number for the movie to update (or 'q' to cancel): ").strip()
@@ -179,10 +370,12 @@ class MovieApp:
                 continue
 
             else:
-                movie_to_update = sorted_filtered_matches[int(user_choice) - 1][0]
+                movie_to_update = matches[int(user_choice) - 1][0]
                 print(f"You can update the rating for '{movie_to_update}' ...")
                 break
 
+        movie_info = self._data_storage.get_movie(movie_to_update)
+
         while True:
             try:
                 rating = input("\nEnter a new rating between 0 and 10 ('q' to cancel, 'c' to continue): ").strip()
@@ -192,7 +385,7 @@ class MovieApp:
                     return
 
                 if rating.lower() == "c":
-                    new_rating = movies[movie_to_update]["rating"]
+                    new_rating = movie_info["rating"]
                     break
 
                 new_rating = float(rating.replace(",", "."))
@@ -217,49 +410,60 @@ class MovieApp:
                 continue
             break
 
+        revision = self._data_storage.revision()
         self._data_storage.update_movie(movie_to_update, new_rating, movies_notes)
+        self._movie_changed(revision, movie_to_update, {**movie_info, "rating": new_rating})
         print(f"Movie {movie_to_update} successfully updated!")
 
 
     def _command_movie_stats(self):
         """
         Display statistics for all movies,
-        including average, median, best,
-        and worst ratings.
+        including average, median, percentiles,
+        best and worst ratings, ratings per decade,
+        a rating histogram and ratings per year.
         """
-        movies = self._data_storage.list_movies()
+        self._refresh_indexes()
+        stats = self._stats
 
-        sorted_ratings = sorted(float(info["rating"]) for info in movies.values())
+        if stats.count == 0:
+            print("No rated movies in the database yet.")
+            return
 
-        average_rating = sum(sorted_ratings) / len(sorted_ratings)
-        print(f"Average rating: {round(average_rating, 2)}")
+        print(f"Average rating: {round(stats.average(), 2)}")
+        print(f"Median rating: {round(stats.median(), 2)}")
+        print("Percentiles: " + ", ".join(f"{percent}th {stats.percentile(percent)}" for percent in PERCENTILES))
 
-        ratings_count = len(sorted_ratings)
-        mid_index = ratings_count // 2
-
-        if ratings_count % 2 == 0:
-            median_rating = (sorted_ratings[mid_index - 1] + sorted_ratings[mid_index]) / 2
-        else:
-            median_rating = sorted_ratings[mid_index]
-
-        print(f"Median rating: {round(median_rating, 2)}")
-
-        highest_rating = max(float(info["rating"]) for info in movies.values())
-        highest_rated_movies = [title for title, info in movies.items() if float(info["rating"]) == highest_rating]
+        highest_rating, highest_rated_movies = stats.best()
 
         if len(highest_rated_movies) == 1:
             print(f"Highest rated movie: {highest_rated_movies[0]} (Rating: {highest_rating})")
         else:
             print(f"Highest rated movies: {', '.join(highest_rated_movies)} (Rating: {highest_rating})")
 
-        lowest_rating = min(float(info["rating"]) for info in movies.values())
-        lowest_rated_movies = [title for title, info in movies.items() if float(info["rating"]) == lowest_rating]
+        lowest_rating, lowest_rated_movies = stats.worst()
 
         if len(lowest_rated_movies) == 1:
             print(f"Lowest rated movie: {lowest_rated_movies[0]} (Rating: {lowest_rating})")
         else:
             print(f"Lowest rated movies: {'; '.join(lowest_rated_movies)} (Rating: {lowest_rating})")
 
+        print("\nRatings per decade:")
+        for decade, (count, average) in stats.by_decade().items():
+            print(f"{decade}s: {count} movies, average {round(average, 2)}")
+
+        print("\nRating histogram:")
+        histogram = stats.histogram()
+        largest_bucket = max(histogram.values())
+        for bucket, count in histogram.items():
+            # Scale the bars to at most 40 characters
+            bar = "#" * round(40 * count / largest_bucket)
+            print(f"{bucket}-{bucket + 1}: {bar} {count}")
+
+        print("\nRatings per year:")
+        self._print_paged(f"{year}: {count} movies, average {round(average, 2)}"
+                          for year, (count, average) in stats.by_year().items())
+
 
     def _command_get_random_movie(self):
         """
@@ -277,84 +481,167 @@ class MovieApp:
         Search for movies based on a partial
         name using fuzzy string matching.
         """
-        movies = self._data_storage.list_movies()
+        self._refresh_indexes()
 
-        while True:
-            title = input("Enter part of the movie title (or 'q' to cancel): \n").casefold()
+        matches = self._prompt_for_matches()
+        if matches is None:
+            return
 
-            if title.lower() == "q":
-                print("Action cancelled.")
+        for movie, score in matches:
+            info = self._data_storage.get_movie(movie)
+            print(f"{movie} ({info['year']}): {info['rating']}")
+
+
+    def _command_sort_movies_desc(self):
+        """
+        Display all movies by their rating in descending order, a page at a time.
+        """
+        self._refresh_indexes()
+
+        self._print_paged(f"{title}: {rating}" for title, rating in self._rating_index.scan())
+
+        unrated = len(self._search_index) - len(self._rating_index)
+        if unrated:
+            print(f"({unrated} movies without a rating are not listed)")
+
+
+    def _command_filter_movies(self):
+        """
+        Prompt user for a year range and a rating range and
+        display the matching movies, a page at a time.
+        """
+        bounds = []
+        for prompt, minimum, maximum in (("From year", 1800, 2200), ("To year", 1800, 2200),
+                                         ("Minimum rating", 0, 10), ("Maximum rating", 0, 10)):
+            bound = self._prompt_for_bound(prompt, minimum, maximum)
+            if bound == "q":
                 return
+            bounds.append(bound)
 
-            # check for empty string
-            if not title.strip():
-                print("Invalid input! Title cannot be empty.")
-                continue
+        year_from, year_to, min_rating, max_rating = bounds
+        self._refresh_indexes()
 
-            # fuzzymatch module: using process.extract() to get best matches
-            best_matches = process.extract(title, movies.keys(), limit=5)
+        # Walk whichever index has fewer movies in range and check the other value per movie.
+        # Unrated movies aren't in the rating index, so it's only walked when filtering on rating.
+        if min_rating is None and max_rating is None:
+            use_rating_index = year_from is None and year_to is None
+        elif year_from is None and year_to is None:
+            use_rating_index = True
+        else:
+            use_rating_index = (self._rating_index.count(min_rating, max_rating)
+                                <= self._year_index.count(year_from, year_to))
 
-            # manually filter matches based on score threshold
-            filtered_matches = [(movie, score) for movie, score in best_matches if score >= 70]
-            sorted_filtered_matches = sorted(filtered_matches, key=lambda item: item[1], reverse=True)
+        if use_rating_index:
+            print("Matching movies, best rated first:")
+            matches = ((title, self._year_index.value_of(title), rating)
+                       for title, rating in self._rating_index.scan(min_rating, max_rating))
+        else:
+            print("Matching movies, oldest first:")
+            matches = ((title, year, self._rating_index.value_of(title))
+                       for title, year in self._year_index.scan(year_from, year_to))
 
-            if sorted_filtered_matches:
-                for movie, score in sorted_filtered_matches:
-                    print(f"{movie} ({movies[movie]['year']}): {movies[movie]['rating']}")
-                break
+        self._print_paged(f"{title} ({year}): {rating}" for title, year, rating in matches
+                          if self._in_range(year, year_from, year_to)
+                          and self._in_range(rating, min_rating, max_rating))
 
-            else:
-                print(f"No matches found, try again ...")
-                continue
 
+    def _command_filter_by_details(self):
+        """
+        Prompt user for a genre, director and/or actor and a minimum rating and
+        display the matching movies, best rated first, a page at a time.
+        """
+        filters = {}
+        for prompt, parameter in (("Genre", "genre"), ("Director", "director"), ("Actor", "actor")):
+            user_input = input(f"{prompt} (empty for any, 'q' to cancel): ").strip()
 
-    def _command_sort_movies_desc(self):
+            if user_input.lower() == "q":
+                print("Action cancelled.")
+                return
+            if user_input:
+                filters[parameter] = user_input
+
+        min_rating = self._prompt_for_bound("Minimum rating", 0, 10)
+        if min_rating == "q":
+            return
+
+        self._refresh_indexes()
+        titles = self._facet_index.query(min_rating=min_rating, **filters)
+
+        if not titles:
+            print("No matching movies. Movies added before genres, directors and actors were kept don't have them.")
+            return
+
+        print(f"{len(titles)} matching movies, best rated first:")
+        self._print_paged(f"{title} ({self._year_index.value_of(title)}): {self._rating_index.value_of(title)}"
+                          for title in titles)
+
+
+    def _cached_posters(self):
         """
-        Sort and display all movies by their rating in descending order.
+        Bring the local poster cache up to date, if enabled.
+
+        Returns:
+            dict: {poster URL: {"src", "srcset"}} for the website, None if local posters are off.
         """
-        movies = self._data_storage.list_movies()
+        if not self._local_posters:
+            return None
 
-        sorted_movie_list = sorted(movies.items(), key=lambda item: float(item[1]["rating"]), reverse=True)
-        for movie in sorted_movie_list:
-            print(f"{movie[0]}: {movie[1]['rating']}")
+        posters, stats = cache_posters(info["poster"] for _, info in self._data_storage.iter_movies())
+        print(f"Posters: {stats['downloaded']} downloaded, {stats['cached']} already cached, "
+              f"{stats['failed']} failed.")
+        return posters
 
 
     def _generate_website(self):
         """
         Generate a website displaying the movie database.
+        Only the movie cards that changed since the last build are written.
         """
-        # Read the HTML template from a file
-        with open("static/index_template.html", "r", encoding="utf-8") as handle:
-            html_template = handle.read()
+        result = build_site(self._data_storage.iter_movies(), posters=self._cached_posters())
 
-        movies = self._data_storage.list_movies()
-        movie_items = []
+        if result["full"]:
+            print(f"Website was generated successfully ({result['cards']} movies).")
+        else:
+            print(f"Website was updated successfully ({result['written']} of {result['cards']} movies changed).")
+
+
+    def _generate_paged_website(self):
+        """
+        Generate the website as pages of a fixed number of movies,
+        optionally with extra pages per release year or first letter.
+        """
+        while True:
+            user_input = input(f"Movies per page (empty for {SITE_PAGE_SIZE}, 'q' to cancel): ").strip()
+
+            if user_input.lower() == "q":
+                print("Action cancelled.")
+                return
 
-        for title, info in movies.items():
-            note = info.get("notes", "")
-            imdb_id = info.get("imdb_id")
-            imdb_url = f"https://www.imdb.com/title/{imdb_id}"
-            movie_items.append(f"""
-        <li>
-            <div class="movie">
-                <a href="{imdb_url}" target="_blank">
-                    <img class="movie-poster" src="{info["poster"]}" title="{note}">
-                </a>
-                <div class="movie-title">{title}</div>
-                <div class="movie-year">{info["year"]}</div>
-                <div class="movie-rating">{info["rating"]}</div>
-            </div>
-        </li>""")
+            if not user_input:
+                page_size = SITE_PAGE_SIZE
+                break
 
-        movie_grid = "\n".join(movie_items)
+            if not user_input.isdigit() or int(user_input) == 0:
+                print("Invalid input! Please enter a positive number.")
+                continue
 
-        full_html = html_template.replace("__TEMPLATE_TITLE__", "I LOVE CINEMA")
-        full_html = full_html.replace("__TEMPLATE_MOVIE_GRID__", movie_grid)
+            page_size = int(user_input)
+            break
+
+        while True:
+            user_input = input("Extra pages per 'year', per 'letter' or none (empty): ").strip().lower()
+
+            if user_input in ("", "year", "letter"):
+                shard_by = user_input or None
+                break
 
-        with open("static/index.html", "w", encoding="utf-8") as handle:
-            handle.write(full_html)
+            print("Invalid input! Please enter 'year', 'letter' or nothing.")
 
-        print("Website was generated successfully.")
+        pages = build_paged_site(self._data_storage.iter_movies(), page_size=page_size, shard_by=shard_by,
+                                 posters=self._cached_posters())
+        total_size = sum(page["bytes"] for page in pages)
+        print(f"Website was generated successfully: {len(pages)} pages, {round(total_size / 1024)} KiB in total, "
+              f"starting at {pages[0]['path']}.")
 
 
     def run(self):
@@ -373,6 +660,10 @@ class MovieApp:
         7. Search Movie
         8. Movies Sorted by rating
         9. Generate Website
+        10. Import Movies from File
+        11. Filter Movies by Year and Rating
+        12. Generate Paged Website
+        13. Filter Movies by Genre, Director or Actor
         """
 
         user_choices = {
@@ -384,13 +675,17 @@ class MovieApp:
             "6": self._command_get_random_movie,
             "7": self._command_search_movie,
             "8": self._command_sort_movies_desc,
-            "9": self._generate_website
+            "9": self._generate_website,
+            "10": self._command_import_movies,
+            "11": self._command_filter_movies,
+            "12": self._generate_paged_website,
+            "13": self._command_filter_by_details
         }
 
         while True:
             print(f"{10 * '*'} My Movies Database {10 * '*'}")
             print(menu)
-            user_input = input("Enter choice (0-9): ").strip()
+            user_input = input("Enter choice (0-13): ").strip()
             # Ignore empty input
             if not user_input:
                 continue
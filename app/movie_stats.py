@@ -0,0 +1,216 @@
+from bisect import bisect_left, insort
+from storage.movie_details import parse_rating, parse_year
+from storage.movie_table import PERCENTILES
+
+
+class RatingStats:
+    """
+    Rating statistics that are kept up to date as movies are added, updated and deleted,
+    so a stats query doesn't re-scan and re-sort the whole collection.
+
+    Ratings are counted per distinct value. OMDb ratings have one decimal, so
+    there are at most about a hundred distinct values no matter how many movies
+    are stored, and median, percentiles, best and worst walk those values only.
+    Movies without a numeric rating are left out.
+    """
+
+    def __init__(self, movies=None):
+        """
+        Initialize the statistics, optionally from a movies dictionary.
+        """
+        self.rebuild(movies or {})
+
+
+    def rebuild(self, movies):
+        """
+        Recompute all statistics from a movies dictionary (title -> info).
+        """
+        # title -> (rating, year) of every counted movie
+        self._entries = {}
+        # rating -> titles with that rating, and the distinct ratings in ascending order
+        self._titles_by_rating = {}
+        self._ratings = []
+        self._sum = 0.0
+        # year -> [count, sum of ratings]
+        self._years = {}
+
+        for title, info in movies.items():
+            self.add(title, info)
+
+
+    def add(self, title, info):
+        """
+        Count a movie, replacing its previous rating if it was counted before.
+        """
+        self.remove(title)
+
+        rating = parse_rating(info.get("rating"))
+        if rating is None:
+            return
+
+        year = parse_year(info.get("year"))
+        self._entries[title] = (rating, year)
+        self._sum += rating
+
+        titles = self._titles_by_rating.get(rating)
+        if titles is None:
+            titles = self._titles_by_rating[rating] = set()
+            insort(self._ratings, rating)
+        titles.add(title)
+
+        year_totals = self._years.setdefault(year, [0, 0.0])
+        year_totals[0] += 1
+        year_totals[1] += rating
+
+
+    def remove(self, title):
+        """
+        Stop counting a movie.
+        """
+        entry = self._entries.pop(title, None)
+        if entry is None:
+            return
+
+        rating, year = entry
+        self._sum -= rating
+
+        titles = self._titles_by_rating[rating]
+        titles.discard(title)
+        if not titles:
+            del self._titles_by_rating[rating]
+            del self._ratings[bisect_left(self._ratings, rating)]
+
+        year_totals = self._years[year]
+        year_totals[0] -= 1
+        year_totals[1] -= rating
+        if year_totals[0] == 0:
+            del self._years[year]
+
+
+    @property
+    def count(self):
+        """
+        Number of movies with a numeric rating.
+        """
+        return len(self._entries)
+
+
+    def average(self):
+        """
+        Return the average rating, or None if no movie is counted.
+        """
+        if not self._entries:
+            return None
+        return self._sum / len(self._entries)
+
+
+    def _rating_at(self, index):
+        """
+        Return the rating at position <index> of the sorted list of all ratings.
+        """
+        seen = 0
+        for rating in self._ratings:
+            seen += len(self._titles_by_rating[rating])
+            if index < seen:
+                return rating
+        raise IndexError(index)
+
+
+    def median(self):
+        """
+        Return the median rating, or None if no movie is counted.
+        """
+        count = len(self._entries)
+        if count == 0:
+            return None
+
+        mid_index = count // 2
+        if count % 2 == 0:
+            return (self._rating_at(mid_index - 1) + self._rating_at(mid_index)) / 2
+        return self._rating_at(mid_index)
+
+
+    def percentile(self, percent):
+        """
+        Return the rating at <percent> (0-100) using the nearest-rank method, or None if empty.
+        """
+        count = len(self._entries)
+        if count == 0:
+            return None
+
+        rank = max(1, -(-percent * count // 100))
+        return self._rating_at(int(rank) - 1)
+
+
+    def best(self):
+        """
+        Return (highest rating, titles with it), or (None, []) if empty.
+        """
+        if not self._ratings:
+            return None, []
+        rating = self._ratings[-1]
+        return rating, sorted(self._titles_by_rating[rating])
+
+
+    def worst(self):
+        """
+        Return (lowest rating, titles with it), or (None, []) if empty.
+        """
+        if not self._ratings:
+            return None, []
+        rating = self._ratings[0]
+        return rating, sorted(self._titles_by_rating[rating])
+
+
+    def by_year(self):
+        """
+        Return {year: (count, average rating)}, sorted by year. Movies without a year are left out.
+        """
+        years = sorted(year for year in self._years if year is not None)
+        return {year: (self._years[year][0], self._years[year][1] / self._years[year][0]) for year in years}
+
+
+    def by_decade(self):
+        """
+        Return {decade: (count, average rating)}, e.g. {1990: (12, 7.4)}, sorted by decade.
+        """
+        decades = {}
+        for year, (count, total) in self._years.items():
+            if year is None:
+                continue
+            decade_totals = decades.setdefault(year // 10 * 10, [0, 0.0])
+            decade_totals[0] += count
+            decade_totals[1] += total
+
+        return {decade: (count, total / count) for decade, (count, total) in sorted(decades.items())}
+
+
+    def histogram(self):
+        """
+        Return {bucket: count} with one bucket per whole rating point (0-9, 10 counts as 9).
+        """
+        buckets = dict.fromkeys(range(10), 0)
+        for rating in self._ratings:
+            buckets[min(9, max(0, int(rating)))] += len(self._titles_by_rating[rating])
+        return buckets
+
+
+    def summary(self):
+        """
+        Return all statistics as a JSON-serializable dict (percents, years, decades and buckets as string keys).
+        """
+        best_rating, best_titles = self.best()
+        worst_rating, worst_titles = self.worst()
+        return {
+            "rated": self.count,
+            "average": self.average(),
+            "median": self.median(),
+            "best": {"rating": best_rating, "titles": best_titles},
+            "worst": {"rating": worst_rating, "titles": worst_titles},
+            "percentiles": {str(percent): self.percentile(percent) for percent in PERCENTILES},
+            "by_year": {str(year): {"movies": count, "average": average}
+                        for year, (count, average) in self.by_year().items()},
+            "by_decade": {str(decade): {"movies": count, "average": average}
+                          for decade, (count, average) in self.by_decade().items()},
+            "histogram": {str(bucket): count for bucket, count in self.histogram().items()}
+        }
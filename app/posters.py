@@ -0,0 +1,265 @@
+"""
+Local poster cache for the generated website.
+
+cache_posters() downloads every poster URL once, a few at a time over a shared
+keep-alive session, into a content-addressed folder next to the pages: the file
+name of a poster is the digest of its bytes, so the same image behind two URLs
+is stored once. Smaller copies for the card size and high-density screens are
+written with Pillow (see requirements.txt) and offered through srcset.
+
+An index file in the cache folder remembers the ETag, Last-Modified date and
+digest of every URL. Posters already in the cache aren't requested again, unless
+asked to revalidate, which sends a conditional request and skips the download
+when the server answers 304 Not Modified.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
+import os
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    from PIL import Image
+except ImportError:
+    # Without Pillow, the cards use the downloaded original, see cache_posters()
+    Image = None
+
+
+POSTER_DIR = "static/posters"
+INDEX_FILE = "index.json"
+INDEX_VERSION = 1
+# Widths (px) of the thumbnails; the cards are 128px wide, 256px is for high-density screens
+THUMBNAIL_WIDTHS = (128, 256)
+THUMBNAIL_QUALITY = 85
+# Downloads running at the same time
+WORKERS = 8
+TIMEOUT = (3.05, 10)
+
+CONTENT_TYPES = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/webp": ".webp",
+    "image/gif": ".gif"
+}
+# Values OMDb uses for a movie without a poster
+MISSING_POSTERS = ("", "N/A")
+
+
+def _load_index(poster_dir):
+    """
+    Return {url: entry} of the cache index, empty if there is none.
+    """
+    try:
+        with open(os.path.join(poster_dir, INDEX_FILE), "r", encoding="utf-8") as handle:
+            index = json.load(handle)
+    except (OSError, ValueError):
+        return {}
+
+    if index.get("version") != INDEX_VERSION:
+        return {}
+    return index["posters"]
+
+
+def _save_index(poster_dir, entries):
+    index_path = os.path.join(poster_dir, INDEX_FILE)
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as handle:
+        handle.write(json.dumps({"version": INDEX_VERSION, "posters": entries}))
+    os.replace(tmp_path, index_path)
+
+
+def _write_file(path, data):
+    """
+    Write <data> next to <path> and swap it in, so a file in the cache is never half written.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as handle:
+        handle.write(data)
+    os.replace(tmp_path, path)
+
+
+def _extension(url, content_type):
+    """
+    Return the file extension of a poster, from its content type or else its URL.
+    """
+    extension = CONTENT_TYPES.get((content_type or "").split(";")[0].strip().lower())
+    if extension is not None:
+        return extension
+
+    extension = os.path.splitext(urlparse(url).path)[1].lower()
+    return extension if extension in CONTENT_TYPES.values() else ".img"
+
+
+def _thumbnail_file(digest, width):
+    return f"{digest}-{width}w.jpg"
+
+
+def _make_thumbnails(poster_dir, digest, original):
+    """
+    Write the thumbnails of a poster that are missing.
+
+    Returns:
+        tuple: (width of the original, widths of the thumbnails), or (None, []) if
+               Pillow isn't installed or the file isn't an image it can read.
+    """
+    if Image is None:
+        return None, []
+
+    try:
+        with Image.open(os.path.join(poster_dir, original)) as image:
+            widths = [width for width in THUMBNAIL_WIDTHS if width < image.width]
+            missing = [width for width in widths
+                       if not os.path.exists(os.path.join(poster_dir, _thumbnail_file(digest, width)))]
+            rgb = image.convert("RGB") if missing else None
+
+            for width in missing:
+                path = os.path.join(poster_dir, _thumbnail_file(digest, width))
+                height = max(1, round(image.height * width / image.width))
+                thumbnail = rgb.resize((width, height), Image.LANCZOS)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                thumbnail.save(tmp_path, "JPEG", quality=THUMBNAIL_QUALITY, optimize=True)
+                os.replace(tmp_path, path)
+
+            return image.width, widths
+    except OSError as error:
+        print(f"Error: Couldn't make thumbnails of {original}: {error}")
+        return None, []
+
+
+def _is_cached(poster_dir, entry):
+    """
+    Return True if the original and thumbnails of an index entry are all on disk.
+    """
+    files = [entry["file"]] + [_thumbnail_file(entry["digest"], width) for width in entry["thumbnails"]]
+    return all(os.path.exists(os.path.join(poster_dir, name)) for name in files)
+
+
+def _fetch(session, poster_dir, url, entry, revalidate):
+    """
+    Bring one poster into the cache.
+
+    Returns:
+        tuple: (status, entry), status is "cached" (not requested), "not_modified" (304),
+               "unchanged" (downloaded, but the same bytes were already cached),
+               "downloaded" or "failed" (entry is None, unless the poster was cached).
+    """
+    cached = entry is not None and _is_cached(poster_dir, entry)
+    if cached and not revalidate:
+        return "cached", entry
+
+    headers = {}
+    if cached:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    try:
+        response = session.get(url, headers=headers, timeout=TIMEOUT)
+        if cached and response.status_code == 304:
+            return "not_modified", entry
+        response.raise_for_status()
+    except requests.exceptions.RequestException as error:
+        print(f"Error: Couldn't download poster {url}: {error}")
+        # A poster that couldn't be revalidated is still served from the cache
+        return "failed", entry if cached else None
+
+    data = response.content
+    digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+    original = digest + _extension(url, response.headers.get("Content-Type"))
+    path = os.path.join(poster_dir, original)
+
+    status = "unchanged" if os.path.exists(path) else "downloaded"
+    if status == "downloaded":
+        _write_file(path, data)
+
+    width, thumbnails = _make_thumbnails(poster_dir, digest, original)
+    return status, {
+        "digest": digest,
+        "file": original,
+        "width": width,
+        "thumbnails": thumbnails,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified")
+    }
+
+
+def poster_sources(entry, prefix):
+    """
+    Return the src and srcset attributes of the <img> of a cached poster.
+
+    Args:
+        entry (dict): Cache index entry of the poster.
+        prefix (str): Path of the cache folder as seen from the pages, e.g. "posters".
+
+    Returns:
+        dict: src (the smallest thumbnail, or the original) and srcset ("" without thumbnails).
+    """
+    original = f"{prefix}/{entry['file']}"
+    if not entry["thumbnails"]:
+        return {"src": original, "srcset": ""}
+
+    candidates = [(f"{prefix}/{_thumbnail_file(entry['digest'], width)}", width) for width in entry["thumbnails"]]
+    candidates.append((original, entry["width"]))
+    srcset = ", ".join(f"{path} {width}w" for path, width in candidates)
+    return {"src": candidates[0][0], "srcset": srcset}
+
+
+def cache_posters(urls, poster_dir=POSTER_DIR, workers=WORKERS, revalidate=False, session=None):
+    """
+    Download the posters at <urls> into the cache, skipping the ones already there.
+
+    Args:
+        urls (iterable): Poster URLs; duplicates and missing posters ("N/A") are skipped.
+        poster_dir (str): Cache folder, inside the folder the pages are written to.
+        workers (int): Number of downloads running at the same time.
+        revalidate (bool): Ask the server whether cached posters changed (ETag / Last-Modified).
+        session (requests.Session): Session to download with (defaults to a new one with <workers> connections).
+
+    Returns:
+        tuple: ({url: {"src", "srcset"}} of every cached poster, relative to the pages,
+                {status: number of URLs}, see _fetch()).
+    """
+    if workers < 1:
+        raise ValueError("workers must be at least 1.")
+
+    os.makedirs(poster_dir, exist_ok=True)
+    entries = _load_index(poster_dir)
+    urls = list(dict.fromkeys(url for url in urls if url not in MISSING_POSTERS))
+
+    if Image is None and urls:
+        print("Warning: Pillow isn't installed, the posters get no thumbnails or srcset "
+              "(pip install -r requirements.txt).")
+
+    own_session = session is None
+    if own_session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=workers)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(
+                lambda url: _fetch(session, poster_dir, url, entries.get(url), revalidate), urls))
+    finally:
+        if own_session:
+            session.close()
+
+    stats = dict.fromkeys(("cached", "not_modified", "unchanged", "downloaded", "failed"), 0)
+    changed = False
+    for url, (status, entry) in zip(urls, results):
+        stats[status] += 1
+        if entry is not None and entries.get(url) != entry:
+            entries[url] = entry
+            changed = True
+
+    if changed:
+        _save_index(poster_dir, entries)
+
+    prefix = os.path.basename(os.path.normpath(poster_dir))
+    posters = {url: poster_sources(entries[url], prefix) for url in urls if url in entries}
+    return posters, stats
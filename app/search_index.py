@@ -0,0 +1,161 @@
+from array import array
+from collections import Counter, defaultdict
+import heapq
+from rapidfuzz import utils
+from app.fuzzy_match import extract, SCORE_THRESHOLD
+
+
+def _trigrams(text):
+    """
+    Return the set of 3-character sequences in <text>, normalized the way the fuzzy scorer does
+    (lowercase, punctuation removed) and padded so that word starts and ends count too.
+    """
+    normalized = f"  {utils.default_process(text)} "
+    return {normalized[i:i + 3] for i in range(len(normalized) - 2)}
+
+
+class TitleSearchIndex:
+    """
+    Trigram index over movie titles for fast fuzzy search.
+
+    Instead of scoring a query against every title, the index picks the
+    titles sharing the most trigrams with the query, relative to their length,
+    and only scores that short list with the fuzzy scorer. Queries shorter than
+    a trigram, or sharing none with any title, are scored against every title,
+    so they find what a full fuzzy scan finds.
+    Titles can be added and removed without rebuilding the index.
+    """
+
+    # Postings of very common trigrams (" th", "the") are skipped once this many were counted
+    MAX_SCANNED_POSTINGS = 50_000
+    # Number of most similar titles that get fully scored
+    MAX_CANDIDATES = 250
+    # Queries with fewer characters (after normalizing) are scored against every title
+    MIN_QUERY_LENGTH = 3
+
+    def __init__(self, titles=()):
+        """
+        Initialize the index with the given titles.
+        """
+        # id -> title (None once removed), id -> number of trigrams,
+        # title -> id, trigram -> ids of titles containing it
+        self._titles = []
+        self._gram_counts = array("I")
+        self._ids = {}
+        self._postings = defaultdict(lambda: array("I"))
+
+        for title in titles:
+            self.add(title)
+
+
+    def __len__(self):
+        return len(self._ids)
+
+
+    def __contains__(self, title):
+        return title in self._ids
+
+
+    def add(self, title):
+        """
+        Add a title to the index.
+        """
+        if title in self._ids:
+            return
+
+        title_id = len(self._titles)
+        grams = _trigrams(title)
+        self._titles.append(title)
+        self._gram_counts.append(len(grams))
+        self._ids[title] = title_id
+
+        for gram in grams:
+            self._postings[gram].append(title_id)
+
+
+    def remove(self, title):
+        """
+        Remove a title from the index.
+        Its postings are only dropped once enough titles were removed to make a rebuild worth it.
+        """
+        title_id = self._ids.pop(title, None)
+        if title_id is None:
+            return
+
+        self._titles[title_id] = None
+
+        if len(self._titles) > 2 * len(self._ids) + 1000:
+            self._rebuild()
+
+
+    def _rebuild(self):
+        """
+        Rebuild the postings from the current titles, dropping removed ones.
+        """
+        titles = list(self._ids)
+        self._titles = []
+        self._gram_counts = array("I")
+        self._ids = {}
+        self._postings = defaultdict(lambda: array("I"))
+
+        for title in titles:
+            self.add(title)
+
+
+    def sync(self, titles):
+        """
+        Bring the index in line with <titles>: add the new ones, remove the ones that are gone.
+
+        Args:
+            titles: A set-like collection of titles, e.g. movies.keys().
+        """
+        for title in self._ids.keys() - titles:
+            self.remove(title)
+
+        for title in titles - self._ids.keys():
+            self.add(title)
+
+
+    def candidates(self, query):
+        """
+        Return the titles most similar to <query> by shared trigrams (Dice coefficient), best first.
+        """
+        query_grams = _trigrams(query)
+        grams = [gram for gram in query_grams if gram in self._postings]
+        # Rare trigrams say the most about a match, count them first
+        grams.sort(key=lambda gram: len(self._postings[gram]))
+
+        counts = Counter()
+        scanned = 0
+        for gram in grams:
+            postings = self._postings[gram]
+            if scanned and scanned + len(postings) > self.MAX_SCANNED_POSTINGS:
+                break
+            counts.update(postings)
+            scanned += len(postings)
+
+        # Shared trigrams relative to both lengths, so short close matches beat long titles
+        query_size = len(query_grams)
+        titles = self._titles
+        gram_counts = self._gram_counts
+        similarity = {title_id: shared / (query_size + gram_counts[title_id])
+                      for title_id, shared in counts.items() if titles[title_id] is not None}
+
+        best_ids = heapq.nlargest(self.MAX_CANDIDATES, similarity, key=similarity.get)
+        return [titles[title_id] for title_id in best_ids]
+
+
+    def search(self, query, limit=5, threshold=SCORE_THRESHOLD):
+        """
+        Return the best fuzzy matches for <query>, as if it was scored against all titles.
+
+        Returns:
+            list: Up to <limit> (title, score) tuples scoring at least <threshold>, best first.
+        """
+        if len(utils.default_process(query)) >= self.MIN_QUERY_LENGTH:
+            candidates = self.candidates(query)
+            if candidates:
+                return extract(query, candidates, limit=limit, threshold=threshold)
+
+        # Too short to share a trigram with its matches, e.g. "u" for "Get Out"
+        return extract(query, list(self._ids), limit=limit, threshold=threshold)
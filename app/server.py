@@ -0,0 +1,582 @@
+"""
+Local HTTP/JSON query service.
+
+MovieService keeps the whole collection and the app's search index, rating
+statistics and sorted indexes warm in memory, so a query costs a dict or index
+lookup instead of parsing the data file. Requests are served by a thread each;
+they only read the in-memory state, under a shared lock. All changes go through
+a single writer thread: it takes whatever changes are queued, writes them to the
+storage in one batch per kind (add / update / delete), then briefly takes the
+lock exclusively to apply them to the in-memory state. When idle, the writer
+checks the storage revision every second and reloads if another process changed
+the data file.
+
+Endpoints (all answers are JSON, errors are {"error": message}; 400 for a bad request, 500 if the
+storage can't be read or written):
+    GET    /movies?offset=0&limit=50   {"total", "offset", "movies": [{"title", "year", ...}]}
+    GET    /movies/<title>             {"title", "year", ...}, 404 if not stored
+    GET    /search?q=<query>&limit=5   {"query", "matches": [{"title", "score", "year", "rating"}]}
+    GET    /top?k=10                   {"movies": [{"title", "rating"}]}, best rated first
+    GET    /stats                      Rating statistics, see RatingStats.summary()
+    GET    /filter?genre=Drama&director=Paul Thomas Anderson&min_rating=8&limit=50
+                                       {"total", "movies": [{"title", "year", ...}]}, best rated first;
+                                       also actor, language and max_runtime (minutes), all optional
+    POST   /movies                     Add {"title", "year", "rating", "poster", "imdb_id"} or a list of them:
+                                       {"results": [{"title", "status": "added" | "exists"}]}
+                                       Optional: "genres", "directors", "actors", "languages" (lists of
+                                       names) and "runtime" (minutes), see storage.movie_details
+    PATCH  /movies/<title>             Change {"rating", "notes"} (both optional), 404 if not stored
+    DELETE /movies/<title>             {"title", "status": "deleted"}, 404 if not stored
+
+Usage:
+    python3 -m app.main <filename> serve [--host 127.0.0.1] [--port 8000]
+"""
+
+from concurrent.futures import Future
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import groupby, islice
+import json
+import queue
+import sqlite3
+import threading
+from urllib.parse import parse_qs, unquote, urlparse
+from app.movie_app import MovieApp
+from storage.movie_details import FILTERS, NAME_FIELDS
+
+
+HOST = "127.0.0.1"
+PORT = 8000
+# Upper bound of the limit / k parameters
+MAX_LIMIT = 1000
+# Most changes the writer takes off the queue and writes to storage at once
+WRITE_BATCH = 1000
+# Seconds between checks for changes made to the storage by other processes
+REFRESH_INTERVAL = 1.0
+# Largest request body accepted (bytes)
+MAX_BODY = 16 * 1024 * 1024
+MOVIE_FIELDS = ("year", "rating", "poster", "imdb_id")
+
+
+class _ReadWriteLock:
+    """
+    Many readers or one writer at a time. Waiting writers go first, so a steady stream
+    of reads can't hold off a change forever.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writing = False
+        self._writers_waiting = 0
+
+
+    @contextmanager
+    def read(self):
+        with self._condition:
+            while self._writing or self._writers_waiting:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+
+    @contextmanager
+    def write(self):
+        with self._condition:
+            self._writers_waiting += 1
+            while self._writing or self._readers:
+                self._condition.wait()
+            self._writers_waiting -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writing = False
+                self._condition.notify_all()
+
+
+class MovieService(MovieApp):
+    """
+    Thread-safe queries and changes on a warm copy of the collection and the app's indexes.
+    The storage itself is only used by the writer thread.
+    """
+
+    def __init__(self, data_storage):
+        """
+        Load the collection, build the indexes and start the writer thread.
+        """
+        super().__init__(data_storage)
+        self._movies = None
+        self._lock = _ReadWriteLock()
+        self._writes = queue.Queue()
+
+        self._reload()
+        self._writer = threading.Thread(target=self._write_loop, name="movie-writer", daemon=True)
+        self._writer.start()
+
+
+    def close(self):
+        """
+        Write the changes still queued and stop the writer thread.
+        """
+        self._writes.put(None)
+        self._writer.join()
+
+
+    def _reload(self):
+        """
+        Reload the collection and indexes if the storage changed behind our back.
+        Storages without a revision are reloaded every time.
+        """
+        revision = self._data_storage.revision()
+        if self._movies is not None and revision is not None and revision == self._indexed_revision:
+            return
+
+        movies = dict(self._data_storage.iter_movies())
+        with self._lock.write():
+            self._movies = movies
+            self._refresh_indexes(movies)
+
+
+    def _write_loop(self):
+        while True:
+            try:
+                job = self._writes.get(timeout=REFRESH_INTERVAL)
+            except queue.Empty:
+                try:
+                    self._reload()
+                except Exception as error:
+                    # Tried again on the next write or refresh, the writer must not die
+                    print(f"Error reloading the collection: {error}")
+                continue
+
+            jobs = [job]
+            while job is not None and len(jobs) < WRITE_BATCH:
+                try:
+                    job = self._writes.get_nowait()
+                except queue.Empty:
+                    break
+                jobs.append(job)
+
+            stop = jobs[-1] is None
+            if stop:
+                jobs.pop()
+
+            try:
+                self._reload()
+                # Runs of the same kind of change are written together, in the order they came in
+                for operation, group in groupby(jobs, key=lambda queued: queued[0]):
+                    group = list(group)
+                    try:
+                        statuses = self._apply(operation, [(title, payload) for _, title, payload, _ in group])
+                    except Exception as error:
+                        for *_, future in group:
+                            future.set_exception(error)
+                    else:
+                        for (*_, future), status in zip(group, statuses):
+                            future.set_result(status)
+
+            except Exception as error:
+                # E.g. the reload failed: fail the changes not written yet, and keep serving later ones
+                for *_, future in jobs:
+                    if not future.done():
+                        future.set_exception(error)
+
+            if stop:
+                return
+
+
+    def _apply(self, operation, changes):
+        """
+        Write a batch of changes of one kind to the storage, then to the in-memory state.
+        Only called by the writer thread, the only one changing self._movies.
+
+        Args:
+            operation (str): "add", "update" or "delete".
+            changes (list): (title, payload) tuples: the movie info for "add",
+                            the changed fields for "update", None for "delete".
+
+        Returns:
+            list: The status of every change ("added", "exists", "updated", "deleted" or "missing").
+        """
+        statuses = []
+        changed = {}
+        # Changed title -> position of its status, corrected once the storage answered
+        positions = {}
+
+        for title, payload in changes:
+            if operation == "add":
+                if title in self._movies or title in changed:
+                    statuses.append("exists")
+                else:
+                    changed[title] = payload
+                    statuses.append("added")
+
+            elif operation == "update":
+                info = changed.get(title) or self._movies.get(title)
+                if info is None:
+                    statuses.append("missing")
+                else:
+                    changed[title] = {**info, **payload}
+                    statuses.append("updated")
+
+            elif title in self._movies and title not in changed:
+                changed[title] = None
+                statuses.append("deleted")
+            else:
+                statuses.append("missing")
+
+            if title in changed:
+                positions[title] = len(statuses) - 1
+
+        if not changed:
+            return statuses
+
+        revision = self._data_storage.revision()
+        if operation == "add":
+            added = set(self._data_storage.add_movies(changed))
+        elif operation == "update":
+            self._data_storage.update_movies({title: {"rating": info["rating"], "notes": info.get("notes", "")}
+                                              for title, info in changed.items()})
+        else:
+            self._data_storage.delete_movies(list(changed))
+
+        if operation != "delete":
+            # Keep what the storage holds, not what was asked for: another process may have added
+            # or deleted a movie since the last reload, and storages may not keep every field
+            for title in changed:
+                changed[title] = self._data_storage.get_movie(title)
+                if operation == "add" and title not in added:
+                    statuses[positions[title]] = "exists"
+                elif changed[title] is None:
+                    statuses[positions[title]] = "missing"
+
+        with self._lock.write():
+            for title, info in changed.items():
+                if info is None:
+                    self._movies.pop(title, None)
+                else:
+                    self._movies[title] = info
+            self._movies_changed(revision, changed)
+
+        return statuses
+
+
+    def _submit(self, operation, changes):
+        """
+        Queue (title, payload) changes for the writer and wait until they're written.
+
+        Returns:
+            list: The status of every change, see _apply().
+        """
+        futures = []
+        for title, payload in changes:
+            future = Future()
+            self._writes.put((operation, title, payload, future))
+            futures.append(future)
+        return [future.result() for future in futures]
+
+
+    def list_movies(self, offset=0, limit=50):
+        with self._lock.read():
+            page = [{"title": title, **info} for title, info in islice(self._movies.items(), offset, offset + limit)]
+            return {"total": len(self._movies), "offset": offset, "movies": page}
+
+
+    def get_movie(self, title):
+        """
+        Return the movie as {"title", ...}, or None if it isn't stored.
+        """
+        with self._lock.read():
+            info = self._movies.get(title)
+            return None if info is None else {"title": title, **info}
+
+
+    def search(self, query, limit=5):
+        with self._lock.read():
+            matches = []
+            for title, score in self._search_index.search(query, limit=limit):
+                info = self._movies[title]
+                matches.append({"title": title, "score": round(score, 1),
+                                "year": info["year"], "rating": info["rating"]})
+            return {"query": query, "matches": matches}
+
+
+    def top(self, k=10):
+        with self._lock.read():
+            return {"movies": [{"title": title, "rating": rating} for title, rating in self._rating_index.top(k)]}
+
+
+    def stats(self):
+        with self._lock.read():
+            return {"movies": len(self._movies), **self._stats.summary()}
+
+
+    def filter(self, limit=50, **filters):
+        """
+        Return the movies matching the filters of FacetIndex.query(), best rated first.
+        """
+        with self._lock.read():
+            titles = self._facet_index.query(**filters)
+            movies = [{"title": title, **self._movies[title]} for title in titles[:limit]]
+            return {"total": len(titles), "movies": movies}
+
+
+    def add_movies(self, movies):
+        """
+        Add movies ({title: info}) and wait until they're stored.
+
+        Returns:
+            list: "added" or "exists" for every movie.
+        """
+        return self._submit("add", movies.items())
+
+
+    def update_movie(self, title, changes):
+        """
+        Change the rating and/or notes of a movie and wait until it's stored.
+
+        Returns:
+            str: "updated" or "missing".
+        """
+        return self._submit("update", [(title, changes)])[0]
+
+
+    def delete_movie(self, title):
+        """
+        Delete a movie and wait until it's gone from storage.
+
+        Returns:
+            str: "deleted" or "missing".
+        """
+        return self._submit("delete", [(title, None)])[0]
+
+
+def _int_param(params, name, default, maximum=MAX_LIMIT):
+    """
+    Return query parameter <name> as an int from 0 to <maximum> (None for no maximum).
+
+    Raises:
+        ValueError: If it's not a number in that range.
+    """
+    value = params.get(name, [str(default)])[0]
+    if not value.isdigit():
+        raise ValueError(f"'{name}' must be a whole number.")
+    if maximum is not None and int(value) > maximum:
+        raise ValueError(f"'{name}' can be at most {maximum}.")
+    return int(value)
+
+
+def _float_param(params, name):
+    """
+    Return query parameter <name> as a float, or None if it isn't given.
+
+    Raises:
+        ValueError: If it's not a number.
+    """
+    if name not in params:
+        return None
+    try:
+        return float(params[name][0])
+    except ValueError:
+        raise ValueError(f"'{name}' must be a number.")
+
+
+def _movie_record(body):
+    """
+    Return (title, info) of a movie in a POST body.
+
+    Raises:
+        ValueError: If the title is missing or a detail has the wrong type.
+    """
+    if not isinstance(body, dict) or not isinstance(body.get("title"), str) or not body["title"].strip():
+        raise ValueError("Every movie needs a 'title'.")
+
+    # No notes: movies start without them, like in every storage; PATCH sets them
+    info = {field: str(body.get(field, "")) for field in MOVIE_FIELDS}
+
+    for field in NAME_FIELDS:
+        names = body.get(field)
+        if names is None:
+            continue
+        if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+            raise ValueError(f"'{field}' must be a list of names.")
+        info[field] = [name.strip() for name in names if name.strip()]
+
+    if body.get("runtime") is not None:
+        if not isinstance(body["runtime"], int) or body["runtime"] < 0:
+            raise ValueError("'runtime' must be a whole number of minutes.")
+        info["runtime"] = body["runtime"]
+    return body["title"].strip(), info
+
+
+def _rating_changes(body):
+    """
+    Return the changed fields of a PATCH body, with the rating stored the way the app stores it.
+
+    Raises:
+        ValueError: If the rating isn't a number from 0 to 10 or nothing is changed.
+    """
+    if not isinstance(body, dict) or not ({"rating", "notes"} & body.keys()):
+        raise ValueError("Send a 'rating' and/or 'notes' to change.")
+
+    changes = {}
+    if "rating" in body:
+        try:
+            rating = float(str(body["rating"]).replace(",", "."))
+        except ValueError:
+            rating = -1
+        if not 0 <= rating <= 10:
+            raise ValueError("'rating' must be a number from 0 to 10.")
+        changes["rating"] = str(rating)
+    if "notes" in body:
+        changes["notes"] = str(body["notes"])
+    return changes
+
+
+class MovieRequestHandler(BaseHTTPRequestHandler):
+    """
+    Map the endpoints to the MovieService of the server.
+    """
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes, Nagle would delay the body on a kept-alive connection
+    disable_nagle_algorithm = True
+
+    def _send_json(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY:
+            raise ValueError("Request body too large.")
+        try:
+            return json.loads(self.rfile.read(length) or b"null")
+        except ValueError:
+            raise ValueError("Request body must be JSON.")
+
+
+    def _title(self, path):
+        """
+        Return the title of a /movies/<title> path, or None for other paths.
+        """
+        if path.startswith("/movies/") and len(path) > len("/movies/"):
+            return unquote(path[len("/movies/"):])
+        return None
+
+
+    def _handle(self, method):
+        service = self.server.service
+        url = urlparse(self.path)
+        path = url.path
+        params = parse_qs(url.query)
+        title = self._title(path)
+
+        try:
+            if method == "GET" and path == "/movies":
+                return self._send_json(200, service.list_movies(_int_param(params, "offset", 0, maximum=None),
+                                                                _int_param(params, "limit", 50)))
+
+            if method == "GET" and title is not None:
+                movie = service.get_movie(title)
+                if movie is None:
+                    return self._send_json(404, {"error": f"Movie {title} not found."})
+                return self._send_json(200, movie)
+
+            if method == "GET" and path == "/search":
+                query = params.get("q", [""])[0].strip()
+                if not query:
+                    raise ValueError("Pass the search text as 'q'.")
+                return self._send_json(200, service.search(query, _int_param(params, "limit", 5)))
+
+            if method == "GET" and path == "/top":
+                return self._send_json(200, service.top(_int_param(params, "k", 10)))
+
+            if method == "GET" and path == "/stats":
+                return self._send_json(200, service.stats())
+
+            if method == "GET" and path == "/filter":
+                filters = {parameter: params[parameter][0].strip() for parameter in FILTERS if parameter in params}
+                return self._send_json(200, service.filter(_int_param(params, "limit", 50),
+                                                           min_rating=_float_param(params, "min_rating"),
+                                                           max_runtime=_float_param(params, "max_runtime"),
+                                                           **filters))
+
+            if method == "POST" and path == "/movies":
+                body = self._read_json()
+                movies = dict(map(_movie_record, body if isinstance(body, list) else [body]))
+                statuses = service.add_movies(movies)
+                return self._send_json(200, {"results": [{"title": movie_title, "status": status}
+                                                         for movie_title, status in zip(movies, statuses)]})
+
+            if method in ("PATCH", "DELETE") and title is not None:
+                if method == "PATCH":
+                    status = service.update_movie(title, _rating_changes(self._read_json()))
+                else:
+                    status = service.delete_movie(title)
+
+                if status == "missing":
+                    return self._send_json(404, {"error": f"Movie {title} not found."})
+                return self._send_json(200, {"title": title, "status": status})
+
+            return self._send_json(404, {"error": f"No endpoint {method} {path}."})
+
+        except ValueError as error:
+            return self._send_json(400, {"error": str(error)})
+
+        except (OSError, sqlite3.Error) as error:
+            # E.g. the data file couldn't be written; the service keeps running
+            return self._send_json(500, {"error": f"Storage error: {error}"})
+
+
+    def do_GET(self):
+        self._handle("GET")
+
+
+    def do_POST(self):
+        self._handle("POST")
+
+
+    def do_PATCH(self):
+        self._handle("PATCH")
+
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+
+    def log_request(self, code="-", size="-"):
+        # One line per request would cost more than most requests; errors are still logged
+        pass
+
+
+class MovieServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server with a MovieService for its handlers.
+    """
+    # Connections waiting to be accepted, enough for a burst of clients
+    request_queue_size = 128
+
+    def __init__(self, data_storage, host=HOST, port=PORT):
+        """
+        Load the collection and listen on <host>:<port> (0 for any free port).
+        """
+        self.service = MovieService(data_storage)
+        super().__init__((host, port), MovieRequestHandler)
+
+
+    def server_close(self):
+        super().server_close()
+        self.service.close()
@@ -0,0 +1,177 @@
+from bisect import bisect_left, bisect_right
+from storage.movie_details import parse_rating, parse_year
+
+
+def rating_key(info):
+    """
+    Return the rating of a movie as a float, or None if it has none.
+    """
+    return parse_rating(info.get("rating"))
+
+
+def year_key(info):
+    """
+    Return the (first) release year of a movie as an int, or None if it has none.
+    """
+    return parse_year(info.get("year"))
+
+
+class SortedIndex:
+    """
+    Secondary index keeping movie titles sorted by one value (e.g. rating or year).
+
+    Top-K, range and page queries find their start with a binary search and
+    then walk the index lazily, so asking for the 20 best movies or one page
+    of a range doesn't sort or scan the whole collection. Movies are added and
+    removed one by one as the storage changes. Movies without a value
+    (e.g. an "N/A" rating) are left out. Ties are ordered by title.
+    """
+
+    def __init__(self, key, descending=False, movies=None):
+        """
+        Initialize the index.
+
+        Args:
+            key (callable): Returns the indexed value of a movie info dict, or None.
+            descending (bool): Walk the index from the highest value down.
+            movies (dict): Movies to index (title -> info).
+        """
+        self._key = key
+        self._descending = descending
+        self.rebuild(movies or {})
+
+
+    def rebuild(self, movies):
+        """
+        Re-index all movies of a movies dictionary (title -> info).
+        """
+        entries = []
+        for title, info in movies.items():
+            value = self._key(info)
+            if value is not None:
+                entries.append((self._sort_key(value), title))
+        entries.sort()
+
+        # Parallel lists in walking order: sort keys and titles; title -> value
+        self._sort_keys = [sort_key for sort_key, _ in entries]
+        self._titles = [title for _, title in entries]
+        self._values = {title: self._value(sort_key) for sort_key, title in entries}
+
+
+    def _sort_key(self, value):
+        return -value if self._descending else value
+
+
+    def _value(self, sort_key):
+        return -sort_key if self._descending else sort_key
+
+
+    def _position(self, sort_key, title):
+        """
+        Return the position of (sort_key, title) in the index, or where it would be inserted.
+        """
+        low = bisect_left(self._sort_keys, sort_key)
+        high = bisect_right(self._sort_keys, sort_key, low)
+        return bisect_left(self._titles, title, low, high)
+
+
+    def add(self, title, info):
+        """
+        Index a movie, replacing its previous value if it was indexed before.
+        """
+        self.remove(title)
+
+        value = self._key(info)
+        if value is None:
+            return
+
+        sort_key = self._sort_key(value)
+        position = self._position(sort_key, title)
+        self._sort_keys.insert(position, sort_key)
+        self._titles.insert(position, title)
+        self._values[title] = value
+
+
+    def remove(self, title):
+        """
+        Drop a movie from the index.
+        """
+        value = self._values.pop(title, None)
+        if value is None:
+            return
+
+        position = self._position(self._sort_key(value), title)
+        del self._sort_keys[position]
+        del self._titles[position]
+
+
+    def __len__(self):
+        return len(self._titles)
+
+
+    def value_of(self, title):
+        """
+        Return the indexed value of <title>, or None if it isn't indexed.
+        """
+        return self._values.get(title)
+
+
+    def _bounds(self, low, high):
+        """
+        Return the (start, end) positions of the movies with low <= value <= high.
+        """
+        if self._descending:
+            low, high = high, low
+
+        start = 0 if low is None else bisect_left(self._sort_keys, self._sort_key(low))
+        end = len(self._sort_keys) if high is None else bisect_right(self._sort_keys, self._sort_key(high))
+        return start, max(start, end)
+
+
+    def count(self, low=None, high=None):
+        """
+        Return the number of movies with low <= value <= high (None means unbounded).
+        """
+        start, end = self._bounds(low, high)
+        return end - start
+
+
+    def scan(self, low=None, high=None, offset=0):
+        """
+        Lazily walk the movies with low <= value <= high, in index order.
+        Don't change the index while walking it.
+
+        Args:
+            low: Smallest value to include (None means unbounded).
+            high: Largest value to include (None means unbounded).
+            offset (int): Number of matching movies to skip.
+
+        Yields:
+            tuple: (title, value)
+        """
+        start, end = self._bounds(low, high)
+        for position in range(start + offset, end):
+            title = self._titles[position]
+            yield title, self._value(self._sort_keys[position])
+
+
+    def top(self, k):
+        """
+        Return the first <k> (title, value) tuples in index order, e.g. the k best rated movies.
+        """
+        return [(title, self._value(sort_key))
+                for sort_key, title in zip(self._sort_keys[:k], self._titles[:k])]
+
+
+    def page(self, number, size=20, low=None, high=None):
+        """
+        Return page <number> (0-based) of the movies with low <= value <= high.
+
+        Returns:
+            list: Up to <size> (title, value) tuples.
+        """
+        start, end = self._bounds(low, high)
+        first = min(end, start + number * size)
+        last = min(end, first + size)
+        return [(self._titles[position], self._value(self._sort_keys[position]))
+                for position in range(first, last)]
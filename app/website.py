@@ -0,0 +1,441 @@
+"""
+Static website generation.
+
+build_site() writes a single page: the template with one <li> card per movie spliced in.
+It streams: the template is split at its placeholders once (and kept until the
+template file changes), then the head, every card and the tail are written to
+the file as the movies come in, so the page is never held in memory.
+
+A build manifest next to the output file records the digest and size of every
+card, one line per card, so an incremental build only renders and writes
+what changed: cards of the same size are overwritten in place, and if cards
+were added, removed or changed size, the file is rewritten from the first such
+card on.
+
+build_paged_site() splits the collection into pages of a fixed number of movies,
+optionally with extra pages per release year or first letter, all linked by a
+navigation bar, and writes the pages in parallel. The first page is page-1.html,
+so a paged site lives next to the single page without overwriting it.
+
+Both take an optional poster mapping from app.posters.cache_posters(), to serve
+posters from the local cache instead of the remote URLs.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import glob
+import hashlib
+import json
+import os
+import time
+
+
+TEMPLATE_PATH = "static/index_template.html"
+OUTPUT_PATH = "static/index.html"
+OUTPUT_DIR = "static"
+SITE_TITLE = "I LOVE CINEMA"
+# Version 2: cards are digested by their data instead of their HTML, one "<digest> <size>" line per card
+MANIFEST_VERSION = 2
+# Bytes read from the end of the manifest to find its footer line
+MANIFEST_FOOTER_MAX = 4096
+# Write buffer of the page and manifest files
+WRITE_BUFFER = 1024 * 1024
+# Movies per page of a paged site
+PAGE_SIZE = 100
+# Pages linked before and after the current one in the navigation bar
+NAV_WINDOW = 3
+# File name patterns of the pages build_paged_site() writes
+PAGE_PATTERNS = ("page-*.html", "year-*.html", "letter-*.html")
+
+# template path -> ((mtime, size), (text before the grid, text after it)), see _compile_template()
+_compiled_templates = {}
+
+
+def _compile_template(template_path, site_title, navigation=""):
+    """
+    Return (head, tail, digest) of the template: the encoded page before and after
+    the movie grid, and a digest of both. The template file is only read and split
+    again when it changes.
+    """
+    stat = os.stat(template_path)
+    cached = _compiled_templates.get(template_path)
+
+    if cached is not None and cached[0] == (stat.st_mtime_ns, stat.st_size):
+        before_grid, after_grid = cached[1]
+    else:
+        with open(template_path, "r", encoding="utf-8") as handle:
+            html_template = handle.read()
+
+        before_grid, after_grid = html_template.split("__TEMPLATE_MOVIE_GRID__", 1)
+        _compiled_templates[template_path] = ((stat.st_mtime_ns, stat.st_size), (before_grid, after_grid))
+
+    head = before_grid.replace("__TEMPLATE_TITLE__", site_title)
+    head = head.replace("__TEMPLATE_NAVIGATION__", navigation).encode("utf-8")
+    tail = after_grid.encode("utf-8")
+    digest = hashlib.blake2b(head + b"\0" + tail, digest_size=16).hexdigest()
+    return head, tail, digest
+
+
+def render_card(title, info, poster=None):
+    """
+    Return the HTML of one movie card.
+
+    Args:
+        title (str): The movie title.
+        info (dict): The movie record.
+        poster (dict): src and srcset of the locally cached poster, None to use info["poster"].
+    """
+    note = info.get("notes", "")
+    imdb_id = info.get("imdb_id")
+    imdb_url = f"https://www.imdb.com/title/{imdb_id}"
+    if poster is None:
+        image = f'src="{info["poster"]}"'
+    elif poster["srcset"]:
+        image = f'src="{poster["src"]}" srcset="{poster["srcset"]}" sizes="128px"'
+    else:
+        image = f'src="{poster["src"]}"'
+    return f"""
+        <li>
+            <div class="movie">
+                <a href="{imdb_url}" target="_blank">
+                    <img class="movie-poster" {image} title="{note}" loading="lazy">
+                </a>
+                <div class="movie-title">{title}</div>
+                <div class="movie-year">{info["year"]}</div>
+                <div class="movie-rating">{info["rating"]}</div>
+            </div>
+        </li>
+"""
+
+
+def _card_data(info, poster):
+    """
+    Return the values a card is rendered from, to tell if it needs rendering again.
+    """
+    return (info.get("year"), info.get("rating"), info.get("poster"), info.get("imdb_id"), info.get("notes", ""),
+            poster and (poster["src"], poster["srcset"]))
+
+
+def _local_poster(posters, info):
+    """
+    Return the cached poster of a movie from a cache_posters() mapping, or None.
+    """
+    if not posters:
+        return None
+    return posters.get(info.get("poster"))
+
+
+def _card_digest(title, data):
+    """
+    Return the digest of the values a card is rendered from: cards with the same digest
+    render the same, so a card whose digest didn't change isn't rendered again.
+    """
+    return hashlib.blake2b(repr((title, data)).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _manifest_path(output_path):
+    return output_path + ".manifest.json"
+
+
+def _file_stat(path):
+    """
+    Return [mtime, size] of <path>, or None if it doesn't exist.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _load_manifest(output_path, template_digest):
+    """
+    Return an iterator over the (digest, size) of the cards of the last build, read from
+    the manifest as they're needed, or None if the output can't be patched: no manifest,
+    another template, or the output file was changed since.
+    """
+    path = _manifest_path(output_path)
+    try:
+        with open(path, "rb") as handle:
+            header = json.loads(handle.readline())
+            # The footer with the stat of the page is the last line
+            cards_start = handle.tell()
+            handle.seek(max(cards_start, os.fstat(handle.fileno()).st_size - MANIFEST_FOOTER_MAX))
+            footer = json.loads(handle.read().rstrip(b"\n").rsplit(b"\n", 1)[-1])
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(header, dict) or not isinstance(footer, dict) \
+            or header.get("version") != MANIFEST_VERSION or header.get("template") != template_digest \
+            or footer.get("output") != _file_stat(output_path):
+        return None
+
+    def cards():
+        with open(path, "r", encoding="utf-8") as handle:
+            handle.readline()
+            for line in handle:
+                if line.startswith("{"):
+                    return
+                digest, size = line.split()
+                yield digest, int(size)
+
+    return cards()
+
+
+def _write_cards(handle, manifest, movies, posters, old_cards, offset):
+    """
+    Write the cards of <movies> to the page open in <handle> and record them in <manifest>.
+
+    Without <old_cards>, every card is written one after the other. Otherwise cards are
+    patched in place at <offset> on, as long as they keep the size of the card in their
+    place in the last build, and only rendered if their digest changed. From the first card
+    that was added, removed or resized on, the rest of the page is written out again.
+
+    Returns:
+        tuple: (cards, cards written, bytes written, True if the page was written from some card on,
+                so the template tail has to follow).
+    """
+    count = written = bytes_written = 0
+    moved = old_cards is None
+
+    for title, info in movies:
+        poster = _local_poster(posters, info)
+        digest = _card_digest(title, _card_data(info, poster))
+        count += 1
+
+        if not moved:
+            old = next(old_cards, None)
+            if old is not None and old[0] == digest:
+                # Unchanged card, it's already there
+                offset += old[1]
+                manifest.write(f"{digest} {old[1]}\n")
+                continue
+
+        card = render_card(title, info, poster).encode("utf-8")
+        size = len(card)
+
+        if not moved:
+            if old is None or old[1] != size:
+                moved = True
+            handle.seek(offset)
+        handle.write(card)
+
+        written += 1
+        bytes_written += size
+        offset += size
+        manifest.write(f"{digest} {size}\n")
+
+    if not moved and next(old_cards, None) is not None:
+        # Cards were removed from the end
+        moved = True
+        handle.seek(offset)
+
+    return count, written, bytes_written, moved
+
+
+def build_site(movies, template_path=TEMPLATE_PATH, output_path=OUTPUT_PATH,
+               site_title=SITE_TITLE, incremental=True, posters=None):
+    """
+    Write the website for <movies>. The movies are consumed one at a time and every card
+    is written as soon as it's rendered, so memory use doesn't grow with the collection.
+
+    Args:
+        movies (iterable): (title, info) pairs in page order, e.g. storage.iter_movies().
+        template_path (str): HTML template with __TEMPLATE_TITLE__ and __TEMPLATE_MOVIE_GRID__.
+        output_path (str): The page to write.
+        site_title (str): Replaces __TEMPLATE_TITLE__.
+        incremental (bool): Only write the cards that changed since the last build, if possible.
+        posters (dict): {poster URL: {"src", "srcset"}} from cache_posters(); movies
+                        not in it keep their remote poster.
+
+    Returns:
+        dict: cards (number of movies), written (cards written), bytes_written,
+              full (True if the whole page was written).
+    """
+    head, tail, template_digest = _compile_template(template_path, site_title)
+    old_cards = _load_manifest(output_path, template_digest) if incremental else None
+    full = old_cards is None
+
+    manifest_path = _manifest_path(output_path)
+    manifest_tmp_path = manifest_path + ".tmp"
+    try:
+        with open(manifest_tmp_path, "w", encoding="utf-8", buffering=WRITE_BUFFER) as manifest:
+            manifest.write(json.dumps({"version": MANIFEST_VERSION, "template": template_digest}) + "\n")
+
+            if full:
+                # Written next to the page and swapped in
+                tmp_path = output_path + ".tmp"
+                with open(tmp_path, "wb", buffering=WRITE_BUFFER) as handle:
+                    handle.write(head)
+                    count, written, bytes_written, moved = _write_cards(
+                        handle, manifest, movies, posters, None, len(head))
+                    handle.write(tail)
+                os.replace(tmp_path, output_path)
+                bytes_written += len(head) + len(tail)
+            else:
+                with open(output_path, "r+b", buffering=WRITE_BUFFER) as handle:
+                    count, written, bytes_written, moved = _write_cards(
+                        handle, manifest, movies, posters, old_cards, len(head))
+                    if moved:
+                        handle.write(tail)
+                        handle.truncate()
+                        bytes_written += len(tail)
+
+            manifest.write(json.dumps({"output": _file_stat(output_path)}) + "\n")
+    finally:
+        if old_cards is not None:
+            old_cards.close()
+
+    if written or moved:
+        os.replace(manifest_tmp_path, manifest_path)
+    else:
+        # Nothing changed, the old manifest still describes the page
+        os.remove(manifest_tmp_path)
+
+    return {"cards": count, "written": written, "bytes_written": bytes_written, "full": full}
+
+
+def _shard_key(shard_by, title, info):
+    """
+    Return (sort key, label, file name part) of the shard a movie belongs to.
+    """
+    if shard_by == "year":
+        year = str(info.get("year", ""))[:4]
+        if year.isdigit():
+            return int(year), year, year
+        return 10_000, "Unknown", "unknown"
+
+    letter = title[:1].upper()
+    if letter.isalpha() and letter.isascii():
+        return letter, letter, letter.lower()
+    return "~", "#", "other"
+
+
+def _page_file(prefix, number):
+    """
+    Return the file name of page <number> (1-based) of a group of pages, e.g. "year-1999-2.html".
+    """
+    if not prefix:
+        # Not index.html, that is build_site()'s page and its manifest would no longer match it
+        return f"page-{number}.html"
+    return f"{prefix}.html" if number == 1 else f"{prefix}-{number}.html"
+
+
+def _navigation(prefix, number, page_count, shard_links):
+    """
+    Return the HTML of the navigation bar of one page.
+    """
+    links = []
+    if number > 1:
+        links.append(f'<a href="{_page_file(prefix, number - 1)}">&laquo; Previous</a>')
+
+    # First, last and a window around the current page
+    shown = {1, page_count} | set(range(max(1, number - NAV_WINDOW), min(page_count, number + NAV_WINDOW) + 1))
+    last_shown = 0
+    for page in sorted(shown):
+        if page > last_shown + 1:
+            links.append("<span>&hellip;</span>")
+        if page == number:
+            links.append(f'<span class="current">{page}</span>')
+        else:
+            links.append(f'<a href="{_page_file(prefix, page)}">{page}</a>')
+        last_shown = page
+
+    if number < page_count:
+        links.append(f'<a href="{_page_file(prefix, number + 1)}">Next &raquo;</a>')
+
+    return f"""<nav class="page-nav">
+    <div class="page-links">{" ".join(links)}</div>
+    {shard_links}
+</nav>"""
+
+
+def _write_page(path, head, tail, movies, posters=None):
+    """
+    Render and write one page.
+
+    Returns:
+        dict: path, cards, bytes and seconds it took.
+    """
+    start = time.perf_counter()
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as handle:
+        handle.write(head)
+        size = len(head) + len(tail)
+        for title, info in movies:
+            card = render_card(title, info, _local_poster(posters, info)).encode("utf-8")
+            handle.write(card)
+            size += len(card)
+        handle.write(tail)
+    os.replace(tmp_path, path)
+
+    return {"path": path, "cards": len(movies), "bytes": size, "seconds": time.perf_counter() - start}
+
+
+def build_paged_site(movies, output_dir=OUTPUT_DIR, template_path=TEMPLATE_PATH, site_title=SITE_TITLE,
+                     page_size=PAGE_SIZE, shard_by=None, workers=4, posters=None):
+    """
+    Write the website as pages of <page_size> movies: page-1.html, page-2.html, ...
+    Pages written by an earlier build that aren't part of this one are removed.
+
+    Args:
+        movies (iterable): (title, info) pairs in page order, e.g. storage.iter_movies().
+        output_dir (str): Folder to write the pages to.
+        template_path (str): HTML template with __TEMPLATE_TITLE__, __TEMPLATE_NAVIGATION__
+                             and __TEMPLATE_MOVIE_GRID__.
+        site_title (str): Replaces __TEMPLATE_TITLE__.
+        page_size (int): Movies per page.
+        shard_by (str): Also write pages per release year ("year") or first letter of the title
+                        ("letter"), e.g. year-1999.html or letter-a.html. None for no shards.
+        workers (int): Number of pages written at the same time.
+        posters (dict): {poster URL: {"src", "srcset"}} from cache_posters(); movies
+                        not in it keep their remote poster.
+
+    Returns:
+        list: One dict per page with its path, cards, bytes and seconds, in page order.
+    """
+    if shard_by not in (None, "year", "letter"):
+        raise ValueError(f"Unknown shard type {shard_by!r}, use 'year' or 'letter'.")
+
+    movies = list(movies)
+
+    # (file name prefix, movies) of every group of pages: all movies, then one group per shard
+    groups = [("", movies)]
+    shard_links = ""
+
+    if shard_by is not None:
+        shards = {}
+        for title, info in movies:
+            key, label, name = _shard_key(shard_by, title, info)
+            shards.setdefault((key, label, f"{shard_by}-{name}"), []).append((title, info))
+
+        ordered = sorted(shards.items())
+        groups.extend((prefix, shard_movies) for (_, _, prefix), shard_movies in ordered)
+
+        label = "Years" if shard_by == "year" else "Letters"
+        links = " ".join(f'<a href="{_page_file(prefix, 1)}">{shard_label}</a>'
+                         for (_, shard_label, prefix), _ in ordered)
+        shard_links = f'<div class="shard-links"><a href="{_page_file("", 1)}">All</a> | {label}: {links}</div>'
+
+    jobs = []
+    for prefix, group_movies in groups:
+        page_count = max(1, -(-len(group_movies) // page_size))
+
+        for number in range(1, page_count + 1):
+            navigation = _navigation(prefix, number, page_count, shard_links)
+            head, tail, _ = _compile_template(template_path, site_title, navigation)
+            page_movies = group_movies[(number - 1) * page_size:number * page_size]
+            jobs.append((os.path.join(output_dir, _page_file(prefix, number)), head, tail, page_movies, posters))
+
+    os.makedirs(output_dir, exist_ok=True)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pages = list(executor.map(lambda job: _write_page(*job), jobs))
+
+    # Remove pages of an earlier, larger build
+    written = {page["path"] for page in pages}
+    for pattern in PAGE_PATTERNS:
+        for path in glob.glob(os.path.join(output_dir, pattern)):
+            if path not in written:
+                os.remove(path)
+
+    return pages
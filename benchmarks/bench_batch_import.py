@@ -0,0 +1,61 @@
+"""
+Benchmark importing a title list one movie at a time versus as one batch.
+
+Per item, every add_movie call rewrites the whole data file, so the import
+is quadratic in the number of titles. add_movies loads once, applies all
+changes in memory and writes once.
+
+Usage:
+    python3 -m benchmarks.bench_batch_import [count]
+
+Example:
+    python3 -m benchmarks.bench_batch_import 10000
+"""
+
+import os
+import sys
+import time
+from benchmarks.bench_storage_cache import make_movies
+from storage.storage_json import StorageJson
+from storage.storage_csv import StorageCsv
+from storage.storage_sqlite import StorageSqlite
+
+
+DEFAULT_COUNT = 10_000
+
+
+def import_per_item(storage, movies):
+    for title, info in movies.items():
+        storage.add_movie(title, info["year"], info["rating"], info["poster"], info["imdb_id"])
+
+
+def import_batch(storage, movies):
+    storage.add_movies(movies)
+
+
+def run(storage_class, ext, movies):
+    for importer in (import_per_item, import_batch):
+        storage = storage_class(f"bench_batch{ext}")
+        start = time.perf_counter()
+        importer(storage, movies)
+        elapsed = time.perf_counter() - start
+
+        assert len(storage.list_movies()) == len(movies)
+        print(f"{storage_class.__name__:<14}{len(movies):>8}  {importer.__name__:<16}{elapsed:10.3f} s")
+
+        if hasattr(storage, "close"):
+            storage.close()
+        os.remove(storage._file_path)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_COUNT
+    movies = make_movies(count)
+
+    run(StorageJson, ".json", movies)
+    run(StorageCsv, ".csv", movies)
+    run(StorageSqlite, ".db", movies)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark startup and lookups of the binary snapshot storage against JSON and SQLite.
+
+"startup + lookup" opens a fresh storage object and looks up one movie, which
+is what every short-lived process (e.g. one app.main invocation) pays.
+"100 lookups" looks up 100 more titles on the same object, "load all" reads
+the whole collection with list_movies().
+
+Usage:
+    python3 -m benchmarks.bench_binary_snapshot [size ...]
+
+Example:
+    python3 -m benchmarks.bench_binary_snapshot 100000 1000000
+"""
+
+import os
+import sys
+import time
+from benchmarks.bench_storage_cache import make_movies
+from storage.storage_binary import StorageBinary
+from storage.storage_json import StorageJson
+from storage.storage_sqlite import StorageSqlite
+
+
+DEFAULT_SIZES = [100_000, 1_000_000]
+STORAGES = {
+    "json": (StorageJson, "bench_snapshot.json"),
+    "sqlite": (StorageSqlite, "bench_snapshot.db"),
+    "mvdb": (StorageBinary, "bench_snapshot.mvdb")
+}
+
+
+def timed(function):
+    start = time.perf_counter()
+    function()
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+
+    for size in sizes:
+        movies = make_movies(size)
+        titles = [f"Movie {i}" for i in range(0, size, max(1, size // 100))]
+        print(f"{size} movies")
+
+        for name, (storage_class, filename) in STORAGES.items():
+            storage = storage_class(filename)
+            storage.add_movies(movies)
+            file_path = storage._file_path
+            del storage
+
+            startup = timed(lambda: storage_class(filename).get_movie("Movie 12345"))
+            storage = storage_class(filename)
+            storage.get_movie("Movie 1")
+            lookups = timed(lambda: [storage.get_movie(title) for title in titles])
+            load_all = timed(lambda: storage_class(filename).list_movies())
+
+            print(f"  {name:>6}  startup + lookup {startup:9.2f} ms  100 lookups {lookups:8.2f} ms  "
+                  f"load all {load_all:8.0f} ms")
+
+            if hasattr(storage, "close"):
+                storage.close()
+            os.remove(file_path)
+
+
+if __name__ == "__main__":
+    main()
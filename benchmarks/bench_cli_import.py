@@ -0,0 +1,74 @@
+"""
+Benchmark importing a title list against a stand-in OMDb server on localhost:
+one title at a time, the way the menu adds movies, versus the headless
+`import` command (app.cli.command_add), which streams the titles through
+concurrent lookups and writes the movies to storage in batches.
+
+Usage:
+    python3 -m benchmarks.bench_cli_import [titles] [titles one at a time]
+
+Example:
+    python3 -m benchmarks.bench_cli_import 100000 2000
+"""
+
+import io
+import os
+import sys
+import time
+from api import omdb_api
+from api.rate_limiter import RateLimiter
+from app.cli import command_add
+from benchmarks.bench_omdb_pooling import start_stub_server
+from storage.storage_json import StorageJson
+from storage.storage_sqlite import StorageSqlite
+
+
+STORAGES = {
+    "json": (StorageJson, "bench_cli_import.json"),
+    "sqlite": (StorageSqlite, "bench_cli_import.db")
+}
+
+
+def one_at_a_time(storage, titles, base_url):
+    """
+    Check, fetch and store every title on its own, like menu entry 2 does.
+    """
+    for title in titles:
+        if storage.movie_exist(title):
+            continue
+        movie_data = omdb_api.get_movie_data(title, base_url=base_url, save_response=False, use_cache=False)
+        storage.add_movie(movie_data["Title"], movie_data["Year"], movie_data["imdbRating"],
+                          movie_data["Poster"], movie_data["imdbID"])
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    single_count = int(sys.argv[2]) if len(sys.argv) > 2 else 2_000
+
+    server = start_stub_server()
+    base_url = f"http://127.0.0.1:{server.server_port}/"
+    # Don't let the client-side throttle or the real daily quota skew the numbers
+    omdb_api.set_rate_limiter(RateLimiter(rate=1_000_000, daily_budget=10 ** 9))
+
+    for name, (storage_class, filename) in STORAGES.items():
+        for label, size, run in (
+                ("one at a time", single_count, lambda storage, titles: one_at_a_time(storage, titles, base_url)),
+                ("import command", count, lambda storage, titles: command_add(
+                    storage, titles, io.StringIO(), base_url=base_url, use_cache=False))):
+            storage = storage_class(filename)
+            titles = (f"Movie {i}" for i in range(size))
+
+            start = time.perf_counter()
+            run(storage, titles)
+            elapsed = time.perf_counter() - start
+
+            stored = len(storage.list_movies())
+            print(f"  {name:>6}  {label:<15} {size:7} titles  {elapsed:8.2f} s  "
+                  f"{size / elapsed:8.0f} titles/s  ({stored} stored)")
+            os.remove(storage._file_path)
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
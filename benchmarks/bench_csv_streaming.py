@@ -0,0 +1,70 @@
+"""
+Benchmark StorageCsv with and without streaming mode: peak memory and time of
+walking the whole collection and of adding one movie.
+
+Peak memory is the traced Python allocation peak of each operation on a fresh
+storage object, so the cached mode includes loading the file. Tracing slows
+everything down, so compare the times with each other only.
+
+Usage:
+    python3 -m benchmarks.bench_csv_streaming [size ...]
+
+Example:
+    python3 -m benchmarks.bench_csv_streaming 100000 1000000
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+from benchmarks.bench_storage_cache import make_movies
+from storage.storage_csv import StorageCsv
+
+
+DEFAULT_SIZES = [100_000, 1_000_000]
+FILENAME = "bench_csv_streaming.csv"
+
+
+def measure(function):
+    """
+    Return (seconds, peak traced bytes) of calling function().
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def walk(storage):
+    for _ in storage.iter_movies():
+        pass
+
+
+def add_one(storage):
+    storage.add_movie("Benchmark Movie", "2024", "7.0", "", "tt9999999")
+    storage.delete_movie("Benchmark Movie")
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+
+    for size in sizes:
+        StorageCsv(FILENAME).add_movies(make_movies(size))
+        file_path = StorageCsv(FILENAME)._file_path
+        print(f"{size} movies, {os.path.getsize(file_path) / 2**20:.1f} MiB file")
+
+        for streaming in (False, True):
+            label = "streaming" if streaming else "cached"
+            walk_time, walk_peak = measure(lambda: walk(StorageCsv(FILENAME, streaming=streaming)))
+            add_time, add_peak = measure(lambda: add_one(StorageCsv(FILENAME, streaming=streaming)))
+            print(f"  {label:>9}  walk {walk_time:6.2f} s, peak {walk_peak / 2**20:7.1f} MiB   "
+                  f"add+delete {add_time:6.2f} s, peak {add_peak / 2**20:7.1f} MiB")
+
+        os.remove(file_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Benchmark the resumable enrichment pipeline (app/enrich.py) against a stand-in
+OMDb server on localhost that answers after a fixed delay, fails every 100th
+request with HTTP 503 (retried by the client) and doesn't know the titles
+starting with "Missing".
+
+The titles file has duplicate lines and titles that are stored already. The
+first run is interrupted after a few seconds, like Ctrl+C, the second one
+resumes from its checkpoint. For every run the titles/second, lookups sent and
+counts are printed; at the end, the stored movies are checked against the titles.
+
+Usage:
+    python3 -m benchmarks.bench_enrich [titles] [delay ms] [seconds until interrupt]
+
+Example:
+    python3 -m benchmarks.bench_enrich 20000 5 5
+"""
+
+from contextlib import redirect_stdout
+from http.server import ThreadingHTTPServer
+import _thread
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlparse, parse_qs
+from api import omdb_api
+from api.rate_limiter import RateLimiter
+from app.enrich import enrich
+from benchmarks.bench_omdb_pooling import StubOmdbHandler
+from storage.storage_json import StorageJson
+
+
+FILENAME = "bench_enrich.json"
+# Every n-th request of the stub fails with HTTP 503
+FAIL_EVERY = 100
+
+
+class FlakyOmdbHandler(StubOmdbHandler):
+    """
+    StubOmdbHandler with latency, occasional 503s and unknown titles.
+    """
+    delay = 0.0
+    requests = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        with self.lock:
+            FlakyOmdbHandler.requests += 1
+            fail = FlakyOmdbHandler.requests % FAIL_EVERY == 0
+
+        title = parse_qs(urlparse(self.path).query).get("t", [""])[0]
+        if fail or title.startswith("Missing"):
+            body = json.dumps({"Response": "False", "Error": "Movie not found!"}).encode("utf-8")
+            self.send_response(503 if fail else 200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        super().do_GET()
+
+
+def write_titles(path, count):
+    """
+    Write <count> lines: every 50th title is unknown to OMDb, every 20th line repeats the one before.
+    Returns the titles OMDb knows.
+    """
+    known = set()
+    with open(path, "w", encoding="utf-8") as handle:
+        for i in range(count):
+            title = f"Missing {i}" if i % 50 == 49 else f"Movie {i}"
+            if i % 20 == 19:
+                title = f"Movie {i - 1}"
+            if not title.startswith("Missing"):
+                known.add(title)
+            handle.write(title + "\n")
+    return known
+
+
+def run(label, storage, titles_path, base_url, interrupt_after=None):
+    FlakyOmdbHandler.requests = 0
+    timer = None
+    if interrupt_after is not None:
+        # Same as pressing Ctrl+C
+        timer = threading.Timer(interrupt_after, _thread.interrupt_main)
+        timer.start()
+
+    # Keep the client's retry messages out of the results
+    try:
+        with redirect_stdout(io.StringIO()):
+            summary = enrich(storage, titles_path, io.StringIO(), base_url=base_url, use_cache=False)
+    finally:
+        # A run that finished first mustn't be interrupted later on
+        if timer is not None:
+            timer.cancel()
+    print(f"  {label:<10} {summary['seconds']:7.2f} s  {summary['titles_per_second']:7.0f} titles/s  "
+          f"{FlakyOmdbHandler.requests:6} lookups  titles {summary['titles']}  added {summary['added']}  "
+          f"exists {summary['exists']}  failed {summary['failed']}  retries {summary['retries']}  "
+          f"complete {summary['complete']}  {summary.get('stopped', '')}")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    delay = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    interrupt_after = float(sys.argv[3]) if len(sys.argv) > 3 else 5.0
+
+    FlakyOmdbHandler.delay = delay / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyOmdbHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}/"
+    # Don't let the client-side throttle or the real daily quota skew the numbers
+    omdb_api.set_rate_limiter(RateLimiter(rate=1_000_000, daily_budget=10 ** 9))
+
+    storage = StorageJson(FILENAME)
+    # Some titles are stored already and need no lookup
+    storage.add_movies({f"Movie {i}": {"year": "2000", "rating": "7.0", "poster": "N/A", "imdb_id": "tt0000000"}
+                        for i in range(0, count, 10)})
+
+    print(f"{count} titles, {delay} ms server delay, interrupted after {interrupt_after:g} s")
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            titles_path = os.path.join(tmp_dir, "titles.txt")
+            known = write_titles(titles_path, count)
+
+            run("first run", storage, titles_path, base_url, interrupt_after)
+            run("resumed", storage, titles_path, base_url)
+            run("again", storage, titles_path, base_url)
+
+        stored = StorageJson(FILENAME).list_movies()
+        print(f"  {len(known - stored.keys())} of {len(known)} known titles missing from storage")
+    finally:
+        server.shutdown()
+        for suffix in ("", ".lock"):
+            if os.path.exists(storage._file_path + suffix):
+                os.remove(storage._file_path + suffix)
+
+
+if __name__ == "__main__":
+    main()
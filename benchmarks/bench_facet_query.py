@@ -0,0 +1,107 @@
+"""
+Benchmark queries combining director, genre and rating, like "dramas by one director rated 8.0 or more":
+scanning every record versus the FacetIndex (JSON/CSV storages, the app and the server) and the
+inverted index in SQLite.
+
+Movies get 1-3 of 20 genres, one of 5,000 directors, 3 of 50,000 actors and 1-2 of 10 languages.
+Each query asks for one director (with a few movies) plus "Drama" and a rating of 8.0 or more;
+the average over 200 queries with different directors is printed.
+
+Usage:
+    python3 -m benchmarks.bench_facet_query [size ...]
+
+Example:
+    python3 -m benchmarks.bench_facet_query 10000 100000
+"""
+
+import os
+import random
+import sys
+import time
+from storage.movie_details import FacetIndex
+from storage.storage_sqlite import StorageSqlite
+
+
+DEFAULT_SIZES = [10_000, 100_000]
+GENRES = ["Drama", "Comedy", "Action", "Crime", "Thriller", "Romance", "Horror", "Sci-Fi", "Adventure",
+          "Animation", "Family", "Fantasy", "Mystery", "Biography", "History", "War", "Western", "Music",
+          "Sport", "Documentary"]
+LANGUAGES = ["English", "French", "German", "Spanish", "Italian", "Japanese", "Korean", "Hindi",
+             "Mandarin", "Russian"]
+QUERIES = 200
+FILENAME = "bench_facet_query.db"
+
+
+def make_movies(count, seed=1):
+    randomizer = random.Random(seed)
+    return {
+        f"Movie {i}": {
+            "year": str(randomizer.randint(1920, 2024)),
+            "rating": f"{randomizer.uniform(1, 10):.1f}",
+            "poster": "",
+            "imdb_id": f"tt{i:07d}",
+            # Drama is the most common genre, like on IMDb
+            "genres": ["Drama"] * (randomizer.random() < 0.4)
+                      + randomizer.sample(GENRES[1:], randomizer.randint(1, 2)),
+            "directors": [f"Director {randomizer.randrange(5_000)}"],
+            "actors": [f"Actor {randomizer.randrange(50_000)}" for _ in range(3)],
+            "languages": randomizer.sample(LANGUAGES, randomizer.randint(1, 2)),
+            "runtime": randomizer.randint(70, 200)
+        }
+        for i in range(count)
+    }
+
+
+def full_scan(movies, director, genre, min_rating):
+    """
+    Check every record, like a filter over list_movies() would.
+    """
+    matches = [(title, info) for title, info in movies.items()
+               if director in info["directors"] and genre in info["genres"]
+               and float(info["rating"]) >= min_rating]
+    return sorted(matches, key=lambda item: (-float(item[1]["rating"]), item[0]))
+
+
+def average_ms(function, directors):
+    start = time.perf_counter()
+    results = 0
+    for director in directors:
+        results += len(function(director))
+    return (time.perf_counter() - start) * 1000 / len(directors), results
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+
+    for size in sizes:
+        movies = make_movies(size)
+        directors = random.Random(2).sample(sorted({info["directors"][0] for info in movies.values()}), QUERIES)
+
+        start = time.perf_counter()
+        index = FacetIndex(movies)
+        build = (time.perf_counter() - start) * 1000
+
+        storage = StorageSqlite(FILENAME)
+        try:
+            start = time.perf_counter()
+            storage.add_movies(movies)
+            insert = (time.perf_counter() - start) * 1000
+
+            scan, scan_results = average_ms(lambda name: full_scan(movies, name, "Drama", 8.0), directors)
+            facet, facet_results = average_ms(
+                lambda name: index.query(genre="Drama", director=name, min_rating=8.0), directors)
+            sql, sql_results = average_ms(
+                lambda name: storage.movies_by_details(genre="Drama", director=name, min_rating=8.0), directors)
+        finally:
+            storage.close()
+            os.remove(storage._file_path)
+
+        assert scan_results == facet_results == sql_results
+        print(f"{size:>9} movies  FacetIndex build {build:8.1f} ms  SQLite insert {insert:8.1f} ms  "
+              f"({scan_results} matches in {QUERIES} queries)")
+        print(f"    director + Drama + 8.0+   full scan {scan:8.3f} ms  FacetIndex {facet:7.4f} ms  "
+              f"SQLite {sql:7.4f} ms  per query")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark fuzzy title search: scoring all titles versus the trigram index.
+
+Queries are parts of existing titles with a typo, like a user would type them.
+Besides latency, the script reports how often both approaches find a best
+match with the same score, and how often the scores of all five results are
+the same (many titles tie on score, so the titles themselves may differ).
+
+Usage:
+    python3 -m benchmarks.bench_fuzzy_search [size ...]
+
+Example:
+    python3 -m benchmarks.bench_fuzzy_search 1000 10000 100000
+"""
+
+import random
+import sys
+import time
+from app.fuzzy_match import extract
+from app.search_index import TitleSearchIndex
+
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+QUERIES = 20
+
+WORDS = ("the dark night return of king lost city blood moon star war love story last "
+         "house river man woman girl boy dead life death game secret garden black white "
+         "red blue summer winter day dream shadow fire ice empire kingdom ghost killer "
+         "road home world time light silent hill wild heart iron golden").split()
+
+
+def make_titles(count, rng):
+    """
+    Return <count> unique made-up movie titles.
+    """
+    titles = set()
+    while len(titles) < count:
+        words = rng.sample(WORDS, rng.randint(1, 4))
+        titles.add(" ".join(words).title() + (f" {rng.randint(2, 9)}" if rng.random() < 0.2 else ""))
+    return list(titles)
+
+
+def make_query(title, rng):
+    """
+    Return part of <title> with one typo.
+    """
+    words = title.split()
+    query = " ".join(words[:rng.randint(1, len(words))]).lower()
+    if len(query) > 3:
+        i = rng.randrange(len(query) - 1)
+        query = query[:i] + query[i + 1] + query[i] + query[i + 2:]
+    return query
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    rng = random.Random(42)
+
+    for size in sizes:
+        titles = make_titles(size, rng)
+        queries = [make_query(rng.choice(titles), rng) for _ in range(QUERIES)]
+
+        start = time.perf_counter()
+        index = TitleSearchIndex(titles)
+        build = time.perf_counter() - start
+
+        full_time = index_time = 0.0
+        same_best = same_scores = 0
+        for query in queries:
+            start = time.perf_counter()
+            full = extract(query, titles, limit=5)
+            full_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            indexed = index.search(query, limit=5)
+            index_time += time.perf_counter() - start
+
+            # Ties make the exact titles arbitrary, compare the scores
+            full_scores = [score for _, score in full]
+            index_scores = [score for _, score in indexed]
+            same_best += full_scores[:1] == index_scores[:1]
+            same_scores += full_scores == index_scores
+
+        print(f"{size:>8} titles  build {build * 1000:9.1f} ms  "
+              f"full scan {full_time / QUERIES * 1000:9.2f} ms/query  "
+              f"index {index_time / QUERIES * 1000:7.2f} ms/query  "
+              f"same best score {same_best}/{QUERIES}  "
+              f"same top-5 scores {same_scores}/{QUERIES}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark the StorageJson file layouts: indented JSON (the default), compact JSON and NDJSON.
+
+For every size and layout, each operation runs in a fresh Python process, so
+its peak RSS (resident memory) is measured on its own:
+
+    load    list_movies(), i.e. parse the whole file into memory
+    stream  walk iter_movies() without keeping the movies
+    lookup  get_movie() of one title (NDJSON reads it through the offset index)
+
+The peak RSS includes the interpreter and imports, shown as "baseline".
+
+Usage:
+    python3 -m benchmarks.bench_json_layouts [size ...]
+
+Example:
+    python3 -m benchmarks.bench_json_layouts 10000 100000 1000000
+"""
+
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from benchmarks.bench_storage_cache import make_movies
+from storage.storage_json import StorageJson
+
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+LAYOUTS = {
+    "indented": ("bench_layout_indented.json", 4),
+    "compact": ("bench_layout_compact.json", None),
+    "ndjson": ("bench_layout.ndjson", 4)
+}
+OPERATIONS = ["baseline", "load", "stream", "lookup"]
+
+
+def run_operation(filename, indent, operation):
+    """
+    Run one operation on a fresh storage object and print its time and peak RSS as JSON.
+    """
+    start = time.perf_counter()
+    storage = StorageJson(filename, indent=indent)
+
+    if operation == "load":
+        storage.list_movies()
+    elif operation == "stream":
+        for _ in storage.iter_movies():
+            pass
+    elif operation == "lookup":
+        storage.get_movie("Movie 12345")
+
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"seconds": elapsed, "peak_rss": peak_rss()}))
+
+
+def peak_rss():
+    """
+    Return the peak RSS of this process in bytes.
+    """
+    # ru_maxrss starts at the parent's value after fork(), VmHWM belongs to this process only
+    try:
+        with open("/proc/self/status", "r", encoding="utf-8") as handle:
+            for line in handle:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def measure(filename, indent, operation):
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_json_layouts", "--child", filename, str(indent), operation],
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+
+    for size in sizes:
+        movies = make_movies(size)
+        print(f"{size} movies")
+
+        for layout, (filename, indent) in LAYOUTS.items():
+            storage = StorageJson(filename, indent=indent)
+            storage.add_movies(movies)
+            file_size = os.path.getsize(storage._file_path)
+
+            results = [measure(filename, indent, operation) for operation in OPERATIONS]
+            print(f"  {layout:>8} {file_size / 2**20:7.1f} MiB  " + "  ".join(
+                f"{operation} {result['seconds'] * 1000:8.1f} ms {result['peak_rss'] / 2**20:6.0f} MiB"
+                for operation, result in zip(OPERATIONS, results)
+                if operation != "baseline"
+            ) + f"  (baseline {results[0]['peak_rss'] / 2**20:.0f} MiB)")
+
+            os.remove(storage._file_path)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        _, _, child_filename, child_indent, child_operation = sys.argv
+        run_operation(child_filename, None if child_indent == "None" else int(child_indent), child_operation)
+    else:
+        main()
@@ -0,0 +1,72 @@
+"""
+Benchmark movie statistics: re-scanning the collection versus the incremental RatingStats.
+
+The re-scan is what the stats command used to do on every call: convert all
+ratings with float(), sort them and find the best and worst movies. RatingStats
+is built once and then only updated per change.
+
+Usage:
+    python3 -m benchmarks.bench_movie_stats [size ...]
+
+Example:
+    python3 -m benchmarks.bench_movie_stats 1000 100000 1000000
+"""
+
+import sys
+import time
+from app.movie_stats import RatingStats
+from benchmarks.bench_storage_cache import make_movies
+
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+
+
+def rescan_stats(movies):
+    """
+    Compute average, median, best and worst the way the stats command used to.
+    """
+    sorted_ratings = sorted(float(info["rating"]) for info in movies.values())
+    average = sum(sorted_ratings) / len(sorted_ratings)
+    mid_index = len(sorted_ratings) // 2
+    median = sorted_ratings[mid_index]
+    highest = max(float(info["rating"]) for info in movies.values())
+    best = [title for title, info in movies.items() if float(info["rating"]) == highest]
+    lowest = min(float(info["rating"]) for info in movies.values())
+    worst = [title for title, info in movies.items() if float(info["rating"]) == lowest]
+    return average, median, best, worst
+
+
+def incremental_stats(stats):
+    return stats.average(), stats.median(), stats.best(), stats.worst()
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+
+    for size in sizes:
+        movies = make_movies(size)
+
+        start = time.perf_counter()
+        rescan_stats(movies)
+        rescan = time.perf_counter() - start
+
+        start = time.perf_counter()
+        stats = RatingStats(movies)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for i in range(1000):
+            stats.add(f"Movie {i}", {"year": "1999", "rating": "9.9"})
+        update = (time.perf_counter() - start) / 1000
+
+        start = time.perf_counter()
+        incremental_stats(stats)
+        query = time.perf_counter() - start
+
+        print(f"{size:>9} movies  re-scan {rescan * 1000:9.2f} ms  "
+              f"build {build * 1000:9.2f} ms  update {update * 1e6:7.2f} us  "
+              f"query {query * 1000:7.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
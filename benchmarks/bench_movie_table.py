@@ -0,0 +1,76 @@
+"""
+Benchmark the columnar MovieTable against the dict-of-dicts returned by list_movies().
+
+Memory is the traced allocation size of each representation. Latency covers
+the stats (average, median, best, worst; the table's summary adds decades and
+a histogram), sorting by rating and a rating/year filter, done with float()
+loops over the dicts versus vectorized over the table.
+
+Usage:
+    python3 -m benchmarks.bench_movie_table [size ...]
+
+Example:
+    python3 -m benchmarks.bench_movie_table 100000 1000000
+"""
+
+import sys
+import time
+import tracemalloc
+from benchmarks.bench_movie_stats import rescan_stats
+from benchmarks.bench_storage_cache import make_movies
+from storage.movie_table import MovieTable
+
+
+DEFAULT_SIZES = [1_000_000]
+
+
+def traced_size(build):
+    """
+    Return (result of build(), bytes allocated by it and still alive).
+    """
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+def dict_sort(movies):
+    return sorted(movies.items(), key=lambda item: float(item[1]["rating"]), reverse=True)
+
+
+def dict_filter(movies):
+    return [title for title, info in movies.items()
+            if float(info["rating"]) >= 7 and 1990 <= int(info["year"][:4]) <= 1999]
+
+
+def table_filter(table):
+    return table.filter(min_rating=7, year_from=1990, year_to=1999)
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+
+    for size in sizes:
+        movies, dict_bytes = traced_size(lambda: make_movies(size))
+        table, table_bytes = traced_size(lambda: MovieTable.from_movies(movies.items()))
+        build = timed(MovieTable.from_movies, movies.items())
+        # The title list and index share the title strings with the dicts, count the columns separately
+        column_bytes = table.years.nbytes + table.ratings.nbytes + table.imdb_numbers.nbytes
+
+        print(f"{size} movies")
+        print(f"  memory   dicts {dict_bytes / 2**20:8.1f} MiB  table {table_bytes / 2**20:8.1f} MiB "
+              f"(columns {column_bytes / 2**20:.1f} MiB), built in {build:.0f} ms")
+        print(f"  stats    dicts {timed(rescan_stats, movies):8.1f} ms  table {timed(table.summary):8.1f} ms")
+        print(f"  sort     dicts {timed(dict_sort, movies):8.1f} ms  table {timed(table.sort_by_rating):8.1f} ms")
+        print(f"  filter   dicts {timed(dict_filter, movies):8.1f} ms  table {timed(table_filter, table):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Micro-benchmark OMDb lookups with cold connections versus the pooled session.
+
+A local stand-in for OMDb (keep-alive HTTP/1.1) answers every lookup, so
+only the client side is measured: with cold connections every request pays
+for a new TCP connection, the pooled session reuses a keep-alive one.
+
+Usage:
+    python3 -m benchmarks.bench_omdb_pooling [requests]
+
+Example:
+    python3 -m benchmarks.bench_omdb_pooling 500
+"""
+
+import json
+import statistics
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import requests
+from api import omdb_api
+from api.rate_limiter import RateLimiter
+
+
+DEFAULT_REQUESTS = 500
+
+
+class StubOmdbHandler(BaseHTTPRequestHandler):
+    """
+    Answer every lookup with a minimal OMDb movie response.
+    """
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes, Nagle would delay the body on a kept-alive connection
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        title = parse_qs(urlparse(self.path).query).get("t", [""])[0]
+        body = json.dumps({
+            "Title": title, "Year": "2000", "imdbRating": "7.0",
+            "Poster": "N/A", "imdbID": "tt0000000", "Response": "True"
+        }).encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server():
+    """
+    Start the stand-in server on a free local port and return it.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubOmdbHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def measure(count, base_url, session):
+    """
+    Return per-request latencies in milliseconds for <count> lookups.
+    """
+    latencies = []
+    for i in range(count):
+        start = time.perf_counter()
+        omdb_api.get_movie_data(f"Movie {i}", session=session, base_url=base_url,
+                                save_response=False, use_cache=False)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_REQUESTS
+
+    server = start_stub_server()
+    base_url = f"http://127.0.0.1:{server.server_port}/"
+    # Don't let the client-side throttle or the real daily quota skew the numbers
+    omdb_api.set_rate_limiter(RateLimiter(rate=1_000_000, daily_budget=10 ** 9))
+
+    # The requests module opens a new connection for every call
+    for label, session in (("cold", requests), ("pooled", omdb_api.get_session())):
+        latencies = measure(count, base_url, session)
+        print(f"{label:<8}{count:>6} requests  "
+              f"mean {statistics.mean(latencies):7.3f} ms  "
+              f"p50 {statistics.median(latencies):7.3f} ms  "
+              f"p99 {statistics.quantiles(latencies, n=100)[98]:7.3f} ms")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
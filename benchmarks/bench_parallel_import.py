@@ -0,0 +1,117 @@
+"""
+Run several importer processes against one data file and count the movies that got lost.
+
+Every worker process opens the same file and adds its own distinct movies in
+batches through add_movies(), like parallel `import` commands would. Afterwards
+the file is opened once more and every movie that should be in it is counted.
+Each storage runs twice: with the file lock, and "unlocked" with fcntl switched
+off in the workers (how the storages behaved before the lock), where workers
+overwrite each other's changes.
+
+Usage:
+    python3 -m benchmarks.bench_parallel_import [workers] [movies per worker] [batch size]
+
+Example:
+    python3 -m benchmarks.bench_parallel_import 4 200 10
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+import storage.file_lock
+from storage.storage_binary import StorageBinary
+from storage.storage_csv import StorageCsv
+from storage.storage_json import StorageJson
+
+
+# label -> (filename, function opening it)
+STORAGES = {
+    "json": ("bench_parallel.json", StorageJson),
+    "ndjson": ("bench_parallel.ndjson", StorageJson),
+    "json --journal": ("bench_parallel_journal.json", lambda filename: StorageJson(filename, journal=True)),
+    "csv": ("bench_parallel.csv", StorageCsv),
+    "csv streaming": ("bench_parallel_streaming.csv", lambda filename: StorageCsv(filename, streaming=True)),
+    "mvdb": ("bench_parallel.mvdb", StorageBinary)
+}
+
+
+def worker_movies(worker, count):
+    return {
+        f"Worker {worker} movie {i}": {
+            "year": str(1900 + i % 125),
+            "rating": str(round(i % 100 / 10, 1)),
+            "poster": "",
+            "imdb_id": f"tt{worker:02d}{i:06d}"
+        }
+        for i in range(count)
+    }
+
+
+def run_worker(label, worker, count, batch_size):
+    """
+    Add the movies of <worker> in batches. Errors are printed as JSON, not raised.
+    """
+    filename, open_storage = STORAGES[label]
+    storage_ = open_storage(filename)
+    items = list(worker_movies(worker, count).items())
+
+    try:
+        for start in range(0, count, batch_size):
+            storage_.add_movies(dict(items[start:start + batch_size]))
+    except Exception as e:
+        print(json.dumps({"error": f"{type(e).__name__}: {e}"}))
+
+
+def remove_files(file_path):
+    for suffix in ("", ".log", ".lock", ".tmp"):
+        if os.path.exists(file_path + suffix):
+            os.remove(file_path + suffix)
+
+
+def run(label, workers, count, batch_size, locked):
+    filename, open_storage = STORAGES[label]
+    file_path = open_storage(filename)._file_path
+    remove_files(file_path)
+    open_storage(filename)
+
+    start = time.perf_counter()
+    command = [sys.executable, "-m", "benchmarks.bench_parallel_import", "--child", label, str(count), str(batch_size)]
+    processes = [subprocess.Popen(command + [str(worker)] + ([] if locked else ["--unlocked"]),
+                                  stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+                 for worker in range(workers)]
+    errors = sum(1 for process in processes for line in process.communicate()[0].splitlines() if '"error"' in line)
+    elapsed = time.perf_counter() - start
+
+    try:
+        stored = open_storage(filename).list_movies()
+    except Exception:
+        stored = {}
+    expected = [title for worker in range(workers) for title in worker_movies(worker, count)]
+    lost = sum(1 for title in expected if title not in stored)
+
+    print(f"  {label:<16} {'locked' if locked else 'unlocked':<9} {elapsed * 1000:8.0f} ms  "
+          f"{lost:6} of {len(expected)} movies lost  {errors} workers failed")
+    remove_files(file_path)
+
+
+def main():
+    if sys.argv[1:2] == ["--child"]:
+        if "--unlocked" in sys.argv:
+            storage.file_lock.fcntl = None
+        run_worker(sys.argv[2], int(sys.argv[5]), int(sys.argv[3]), int(sys.argv[4]))
+        return
+
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    batch_size = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+    print(f"{workers} workers adding {count} movies each, {batch_size} per batch")
+
+    for label in STORAGES:
+        for locked in (False, True):
+            run(label, workers, count, batch_size, locked)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Benchmark the local poster cache against a stand-in poster server on localhost.
+
+The stub serves one generated image per URL after a fixed delay (like a remote CDN),
+with an ETag, and answers conditional requests with 304 Not Modified. The cache is
+filled cold with one and with several download workers, then refreshed while warm
+(no requests) and with revalidation (conditional requests). The bytes a browser
+loads for the posters of one page are compared between the originals and the
+128px thumbnails.
+
+Usage:
+    python3 -m benchmarks.bench_poster_cache [posters] [delay ms] [workers]
+
+Example:
+    python3 -m benchmarks.bench_poster_cache 200 20 8
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import hashlib
+import io
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from app.posters import Image, cache_posters
+
+
+# Size of the generated posters, about what OMDb links to
+POSTER_SIZE = (300, 445)
+
+
+def make_poster(number):
+    """
+    Return the bytes of poster <number>: a noisy JPEG with Pillow, random bytes without it.
+    """
+    rng = random.Random(number)
+    if Image is None:
+        return rng.randbytes(40_000)
+
+    image = Image.new("RGB", POSTER_SIZE, tuple(rng.randrange(256) for _ in range(3)))
+    image.paste(Image.frombytes("RGB", (100, 150), rng.randbytes(100 * 150 * 3)), (100, 150))
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+class StubPosterHandler(BaseHTTPRequestHandler):
+    """
+    Serve /poster/<number>.jpg with an ETag, 304 if the client already has it.
+    """
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    posters = {}
+    delay = 0.0
+    requests = 0
+    bytes_sent = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        number = int(self.path.rsplit("/", 1)[-1].split(".")[0])
+        body = self.posters[number]
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        not_modified = self.headers.get("If-None-Match") == etag
+
+        with self.lock:
+            StubPosterHandler.requests += 1
+            StubPosterHandler.bytes_sent += 0 if not_modified else len(body)
+
+        self.send_response(304 if not_modified else 200)
+        self.send_header("ETag", etag)
+        if not_modified:
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run(label, urls, poster_dir, workers, revalidate=False):
+    StubPosterHandler.requests = StubPosterHandler.bytes_sent = 0
+    start = time.perf_counter()
+    posters, stats = cache_posters(urls, poster_dir=poster_dir, workers=workers, revalidate=revalidate)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"  {label:<28} {elapsed:8.0f} ms  {StubPosterHandler.requests:5} requests  "
+          f"{StubPosterHandler.bytes_sent / 2**20:6.2f} MiB transferred  {stats}")
+    return posters
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    delay = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+
+    StubPosterHandler.posters = {number: make_poster(number) for number in range(count)}
+    StubPosterHandler.delay = delay / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubPosterHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/poster"
+    urls = [f"{base_url}/{number}.jpg" for number in range(count)]
+    print(f"{count} posters, {delay} ms server delay, Pillow {'installed' if Image else 'not installed'}")
+
+    with tempfile.TemporaryDirectory() as site_dir:
+        run("cold, 1 worker", urls, os.path.join(site_dir, "single"), 1)
+
+        poster_dir = os.path.join(site_dir, "posters")
+        posters = run(f"cold, {workers} workers", urls, poster_dir, workers)
+        run("warm", urls, poster_dir, workers)
+        run("warm, revalidated", urls, poster_dir, workers, revalidate=True)
+
+        # What a browser loads for the posters of one page of 100 cards
+        page_urls = urls[:100]
+        remote = sum(len(StubPosterHandler.posters[number]) for number in range(len(page_urls)))
+        local = sum(os.path.getsize(os.path.join(site_dir, posters[url]["src"])) for url in page_urls)
+        print(f"  poster bytes of 100 cards: remote originals {remote / 1024:.0f} KiB, "
+              f"local src {local / 1024:.0f} KiB")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
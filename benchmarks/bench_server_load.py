@@ -0,0 +1,145 @@
+"""
+Load-test the HTTP query service (app/server.py).
+
+Starts `python3 -m app.main <file> serve` on a generated .json collection in a
+separate process and sends a mix of requests from several client threads over
+keep-alive connections: movie lookups, fuzzy searches, top-K, listing pages,
+stats and rating updates (which go through the single writer). Reports
+requests/sec and p50/p99 latency per endpoint, once with the default storage
+(every batch of changes rewrites the file) and once with --journal (changes
+are appended to a log).
+
+For comparison, "open file + lookup" is what a consumer without the server pays
+for one lookup: opening the JSON storage and reading one movie.
+
+Usage:
+    python3 -m benchmarks.bench_server_load [movies] [clients] [requests]
+
+Example:
+    python3 -m benchmarks.bench_server_load 50000 8 5000
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from urllib.parse import quote
+import requests
+from benchmarks.bench_storage_cache import make_movies
+from storage.storage_json import StorageJson
+
+
+FILENAME = "bench_server.json"
+# (endpoint, share of the requests)
+MIX = [
+    ("get", 0.35),
+    ("search", 0.25),
+    ("top", 0.15),
+    ("list", 0.10),
+    ("stats", 0.05),
+    ("update", 0.10)
+]
+
+
+def request(session, base_url, kind, rng, size):
+    title = quote(f"Movie {rng.randrange(size)}")
+
+    if kind == "get":
+        return session.get(f"{base_url}movies/{title}")
+    if kind == "search":
+        return session.get(f"{base_url}search", params={"q": f"movei {rng.randrange(size)}"})
+    if kind == "top":
+        return session.get(f"{base_url}top", params={"k": 10})
+    if kind == "list":
+        return session.get(f"{base_url}movies", params={"offset": rng.randrange(size), "limit": 50})
+    if kind == "stats":
+        return session.get(f"{base_url}stats")
+    return session.patch(f"{base_url}movies/{title}", json={"rating": round(rng.uniform(0, 10), 1)})
+
+
+def client(base_url, count, size, seed):
+    """
+    Send <count> requests of the mix and return [(kind, latency ms)].
+    """
+    rng = random.Random(seed)
+    kinds = [kind for kind, _ in MIX]
+    weights = [share for _, share in MIX]
+    results = []
+
+    with requests.Session() as session:
+        for kind in rng.choices(kinds, weights, k=count):
+            start = time.perf_counter()
+            response = request(session, base_url, kind, rng, size)
+            response.raise_for_status()
+            results.append((kind, (time.perf_counter() - start) * 1000))
+    return results
+
+
+def percentiles(latencies):
+    if len(latencies) < 2:
+        return latencies[0], latencies[0]
+    return statistics.median(latencies), statistics.quantiles(latencies, n=100)[98]
+
+
+def run_load(base_url, clients, count, size):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        shares = [count // clients + (i < count % clients) for i in range(clients)]
+        results = [result for share in executor.map(lambda args: client(base_url, *args),
+                                                    [(share, size, seed) for seed, share in enumerate(shares)])
+                   for result in share]
+    elapsed = time.perf_counter() - start
+
+    print(f"  {'all requests':<20} {len(results) / elapsed:9.0f} req/s  "
+          "p50 {:7.2f} ms  p99 {:7.2f} ms".format(*percentiles([latency for _, latency in results])))
+    for kind, _ in MIX:
+        latencies = [latency for result_kind, latency in results if result_kind == kind]
+        if latencies:
+            print(f"  {kind:<20} {len(latencies):9} reqs   "
+                  "p50 {:7.2f} ms  p99 {:7.2f} ms".format(*percentiles(latencies)))
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    count = int(sys.argv[3]) if len(sys.argv) > 3 else 5_000
+
+    storage = StorageJson(FILENAME)
+    storage.add_movies(make_movies(size))
+    file_path = storage._file_path
+    del storage
+
+    rng = random.Random(0)
+    lookups = []
+    for _ in range(5):
+        start = time.perf_counter()
+        StorageJson(FILENAME).get_movie(f"Movie {rng.randrange(size)}")
+        lookups.append((time.perf_counter() - start) * 1000)
+    print(f"{size} movies, {clients} clients, {count} requests")
+    print(f"  {'open file + lookup':<20} p50 {statistics.median(lookups):9.2f} ms")
+
+    try:
+        for flags in ([], ["--journal"]):
+            print(f"server {' '.join(flags) or '(file rewrites)'}")
+            start = time.perf_counter()
+            server = subprocess.Popen([sys.executable, "-m", "app.main", FILENAME, *flags, "serve", "--port", "0"],
+                                      stdout=subprocess.PIPE, text=True)
+            try:
+                base_url = json.loads(server.stdout.readline())["serving"]
+                print(f"  {'startup':<20} {(time.perf_counter() - start) * 1000:13.0f} ms")
+                run_load(base_url, clients, count, size)
+            finally:
+                server.terminate()
+                server.wait()
+    finally:
+        for suffix in ("", ".log", ".lock"):
+            if os.path.exists(file_path + suffix):
+                os.remove(file_path + suffix)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Benchmark website builds: full rebuild versus incremental build after small changes.
+
+Usage:
+    python3 -m benchmarks.bench_site_build [size ...]
+
+Example:
+    python3 -m benchmarks.bench_site_build 5000 50000
+"""
+
+import os
+import sys
+import tempfile
+import time
+from app.website import build_site
+from benchmarks.bench_storage_cache import make_movies
+
+
+DEFAULT_SIZES = [5_000, 50_000]
+
+
+def timed_build(movies, output_path, incremental):
+    start = time.perf_counter()
+    result = build_site(movies.items(), output_path=output_path, incremental=incremental)
+    return (time.perf_counter() - start) * 1000, result
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        output_path = os.path.join(output_dir, "index.html")
+
+        for size in sizes:
+            movies = make_movies(size)
+            middle = f"Movie {size // 2}"
+
+            full, result = timed_build(movies, output_path, incremental=False)
+            print(f"{size} movies, {os.path.getsize(output_path) / 2**20:.1f} MiB page")
+            print(f"  {'full build':<28} {full:8.1f} ms  {result['bytes_written'] / 2**20:8.2f} MiB written")
+
+            changes = [
+                ("no change", lambda: None),
+                ("one rating, same size", lambda: movies[middle].update(rating="9.9")),
+                ("one rating, new size", lambda: movies[middle].update(rating="10.0")),
+                ("one movie added at the end", lambda: movies.update(
+                    {"New Movie": {"year": "2024", "rating": "7.0", "poster": "", "imdb_id": "", "notes": ""}}))
+            ]
+            for label, change in changes:
+                change()
+                elapsed, result = timed_build(movies, output_path, incremental=True)
+                print(f"  {label:<28} {elapsed:8.1f} ms  {result['bytes_written'] / 2**20:8.2f} MiB written "
+                      f"({result['written']} cards)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark peak memory of writing the website for growing collections.
+
+The movies come from a generator, like iter_movies() of a streaming storage,
+so the collection itself is never held in memory. Every build runs in a fresh
+Python process, so its peak RSS (resident memory) is measured on its own:
+
+    join         render all cards into a list, join them and replace the
+                 placeholders of the template (how the page used to be built)
+    full         build_site(..., incremental=False)
+    incremental  build_site() after one rating changed since the previous build
+
+The peak RSS includes the interpreter and imports, shown as "baseline".
+
+Usage:
+    python3 -m benchmarks.bench_site_memory [size ...]
+
+Example:
+    python3 -m benchmarks.bench_site_memory 10000 100000
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from app.website import TEMPLATE_PATH, SITE_TITLE, build_site, render_card
+from benchmarks.bench_json_layouts import peak_rss
+
+
+DEFAULT_SIZES = [10_000, 100_000]
+MODES = ["baseline", "join", "full", "incremental"]
+
+
+def iter_movies(count, changed=None):
+    """
+    Yield <count> generated (title, info) pairs; the rating of movie <changed> is different.
+    """
+    for i in range(count):
+        yield f"Movie {i}", {
+            "year": str(1900 + i % 125),
+            "rating": "9.9" if i == changed else str(round(i % 100 / 10, 1)),
+            "poster": f"https://example.com/posters/{i}.jpg",
+            "imdb_id": f"tt{i:08d}",
+            "notes": ""
+        }
+
+
+def join_build(movies, output_path):
+    """
+    Build the page as one string, the way it was done before build_site().
+    """
+    with open(TEMPLATE_PATH, "r", encoding="utf-8") as handle:
+        html_template = handle.read()
+
+    movie_items = [render_card(title, info) for title, info in movies]
+    html = html_template.replace("__TEMPLATE_TITLE__", SITE_TITLE)
+    html = html.replace("__TEMPLATE_NAVIGATION__", "")
+    html = html.replace("__TEMPLATE_MOVIE_GRID__", "".join(movie_items))
+
+    with open(output_path, "w", encoding="utf-8") as handle:
+        handle.write(html)
+
+
+def run_mode(size, mode, output_path):
+    """
+    Run one build and print its time and peak RSS as JSON.
+    """
+    start = time.perf_counter()
+
+    if mode == "join":
+        join_build(iter_movies(size), output_path)
+    elif mode == "full":
+        build_site(iter_movies(size), output_path=output_path, incremental=False)
+    elif mode == "incremental":
+        build_site(iter_movies(size, changed=size // 2), output_path=output_path)
+
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"seconds": elapsed, "peak_rss": peak_rss()}))
+
+
+def measure(size, mode, output_path):
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_site_memory", "--child", str(size), mode, output_path],
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main():
+    if sys.argv[1:2] == ["--child"]:
+        run_mode(int(sys.argv[2]), sys.argv[3], sys.argv[4])
+        return
+
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as output_dir:
+            output_path = os.path.join(output_dir, "index.html")
+            print(f"{size} movies")
+
+            for mode in MODES:
+                # The incremental build runs against the page and manifest of the full build
+                result = measure(size, mode, output_path)
+                print(f"  {mode:<12} {result['seconds'] * 1000:8.0f} ms  "
+                      f"peak RSS {result['peak_rss'] / 2**20:7.1f} MiB  "
+                      f"page {os.path.getsize(output_path) / 2**20 if mode != 'baseline' else 0:6.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
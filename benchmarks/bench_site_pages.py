@@ -0,0 +1,55 @@
+"""
+Measure output size and build time of the single-page website versus the paged site.
+
+For the paged site, the size and write time of every page is recorded and
+summarized (average and largest page).
+
+Usage:
+    python3 -m benchmarks.bench_site_pages [size] [page size] [workers]
+
+Example:
+    python3 -m benchmarks.bench_site_pages 50000 100 4
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+from app.website import build_paged_site, build_site
+from benchmarks.bench_storage_cache import make_movies
+
+
+def summarize(label, pages, elapsed):
+    sizes = [page["bytes"] for page in pages]
+    times = [page["seconds"] * 1000 for page in pages]
+    print(f"  {label:<22} {elapsed * 1000:8.0f} ms  {len(pages):5} pages  "
+          f"{sum(sizes) / 2**20:7.1f} MiB total  "
+          f"page avg {statistics.mean(sizes) / 1024:7.1f} KiB / {statistics.mean(times):6.2f} ms  "
+          f"max {max(sizes) / 1024:8.1f} KiB / {max(times):7.2f} ms")
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    page_size = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    movies = make_movies(size)
+    print(f"{size} movies, {page_size} per page, {workers} workers")
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        output_path = os.path.join(output_dir, "index.html")
+        start = time.perf_counter()
+        result = build_site(movies.items(), output_path=output_path, incremental=False)
+        elapsed = time.perf_counter() - start
+        summarize("single page", [{"bytes": result["bytes_written"], "seconds": elapsed}], elapsed)
+
+    for shard_by in (None, "year", "letter"):
+        with tempfile.TemporaryDirectory() as output_dir:
+            start = time.perf_counter()
+            pages = build_paged_site(movies.items(), output_dir=output_dir, page_size=page_size,
+                                     shard_by=shard_by, workers=workers)
+            summarize(f"paged, shards: {shard_by}", pages, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
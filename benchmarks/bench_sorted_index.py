@@ -0,0 +1,75 @@
+"""
+Benchmark top-K and range queries: sorting the whole collection versus the sorted indexes.
+
+The full sort is what the "sorted by rating" command used to do on every call.
+The indexes are built once and then updated per change.
+
+Usage:
+    python3 -m benchmarks.bench_sorted_index [size ...]
+
+Example:
+    python3 -m benchmarks.bench_sorted_index 1000 100000 1000000
+"""
+
+from itertools import islice
+import sys
+import time
+from app.sorted_index import SortedIndex, rating_key, year_key
+from benchmarks.bench_storage_cache import make_movies
+
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+
+
+def full_sort_top(movies, k):
+    return sorted(movies.items(), key=lambda item: float(item[1]["rating"]), reverse=True)[:k]
+
+
+def full_scan_range(movies, k):
+    """
+    First <k> movies from 1990-1999 rated 8 or better, best first.
+    """
+    matches = [(title, info) for title, info in movies.items()
+               if float(info["rating"]) >= 8 and 1990 <= int(info["year"][:4]) <= 1999]
+    return sorted(matches, key=lambda item: float(item[1]["rating"]), reverse=True)[:k]
+
+
+def index_range(rating_index, year_index, k):
+    matches = ((title, rating) for title, rating in rating_index.scan(8, None)
+               if 1990 <= (year_index.value_of(title) or 0) <= 1999)
+    return list(islice(matches, k))
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+
+    for size in sizes:
+        movies = make_movies(size)
+
+        start = time.perf_counter()
+        rating_index = SortedIndex(rating_key, descending=True, movies=movies)
+        year_index = SortedIndex(year_key, movies=movies)
+        build = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        for i in range(1000):
+            rating_index.add(f"Movie {i}", {"year": "1999", "rating": "9.9"})
+        update = (time.perf_counter() - start) / 1000
+
+        print(f"{size:>9} movies  build {build:8.1f} ms  update {update * 1e6:7.2f} us")
+        print(f"    top 20           full sort {timed(full_sort_top, movies, 20):9.2f} ms  "
+              f"index {timed(rating_index.top, 20):7.3f} ms")
+        print(f"    1990s rated 8+   full scan {timed(full_scan_range, movies, 20):9.2f} ms  "
+              f"index {timed(index_range, rating_index, year_index, 20):7.3f} ms")
+        print(f"    page 100 of 8+   full sort {timed(full_sort_top, movies, 2020):9.2f} ms  "
+              f"index {timed(rating_index.page, 100, 20, 8, None):7.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
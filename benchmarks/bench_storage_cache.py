@@ -0,0 +1,87 @@
+"""
+Benchmark the in-memory cache of StorageJson and StorageCsv.
+
+For every collection size a data file is generated inside the data folder,
+then the per-operation cost is measured twice:
+    - cold: the cache is dropped before every call (same work as the
+      uncached storage, which re-parsed the file on every call)
+    - warm: the cache is kept between calls
+
+Usage:
+    python3 -m benchmarks.bench_storage_cache [size ...]
+
+Example:
+    python3 -m benchmarks.bench_storage_cache 1000 100000 1000000
+"""
+
+import os
+import sys
+import time
+from storage.storage_json import StorageJson
+from storage.storage_csv import StorageCsv
+
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+
+
+def make_movies(count):
+    """
+    Return a dictionary with <count> generated movies.
+    """
+    return {
+        f"Movie {i}": {
+            "year": str(1900 + i % 125),
+            "rating": str(round(i % 100 / 10, 1)),
+            "poster": f"https://example.com/posters/{i}.jpg",
+            "imdb_id": f"tt{i:08d}",
+            "notes": ""
+        }
+        for i in range(count)
+    }
+
+
+def time_call(storage, func, repeat, cold):
+    """
+    Return the average seconds per call of <func> over <repeat> calls.
+    """
+    total = 0.0
+    for i in range(repeat):
+        if cold:
+            storage._movies = None
+        start = time.perf_counter()
+        func(i)
+        total += time.perf_counter() - start
+    return total / repeat
+
+
+def run(storage_class, ext, size):
+    filename = f"bench_cache_{size}{ext}"
+    storage = storage_class(filename)
+    storage._save_to_file(make_movies(size))
+    # Fewer repetitions for the big files, a single parse takes seconds there
+    repeat = max(1, min(50, 100_000 // size))
+
+    try:
+        for cold in (True, False):
+            label = "cold" if cold else "warm"
+            exist = time_call(storage, lambda i: storage.movie_exist(f"Movie {i}"), repeat, cold)
+            listing = time_call(storage, lambda i: storage.list_movies(), repeat, cold)
+            add = time_call(storage, lambda i: storage.add_movie(f"New {label} {i}", "2000", "7.0", "", "tt0"),
+                            repeat, cold)
+            print(f"{storage_class.__name__:<12}{size:>10}  {label}  "
+                  f"movie_exist {exist * 1000:10.3f} ms  "
+                  f"list_movies {listing * 1000:10.3f} ms  "
+                  f"add_movie {add * 1000:10.3f} ms")
+    finally:
+        os.remove(storage._file_path)
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    for size in sizes:
+        run(StorageJson, ".json", size)
+        run(StorageCsv, ".csv", size)
+
+
+if __name__ == "__main__":
+    main()
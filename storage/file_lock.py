@@ -0,0 +1,106 @@
+from contextlib import contextmanager
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory locks (e.g. on Windows): only one process may write a data file at a time
+    fcntl = None
+
+
+class FileLock:
+    """
+    Reader/writer lock on a data file, shared by every process that opens it.
+
+    The lock is an advisory fcntl.flock() on '<data file>.lock'. That sidecar is never
+    replaced, so it stays the same file while the data file itself is swapped in by
+    os.replace(). Any number of readers hold it shared at the same time; a writer holds
+    it exclusively for its whole read-modify-write, so no other process can change the
+    file between reading it and writing it back.
+
+    Every thread locks through a handle of its own, so threads of one process exclude
+    each other the same way processes do. Taking the lock again in a thread that already
+    holds it does nothing, so locked methods can call each other.
+    """
+
+    def __init__(self, data_path):
+        """
+        Initialize the lock for the data file at <data_path>.
+        """
+        self._path = data_path + ".lock"
+        # Per thread: the open lock file and the mode it is held in (None if not held)
+        self._local = threading.local()
+
+
+    @property
+    def path(self):
+        return self._path
+
+
+    @contextmanager
+    def shared(self):
+        """
+        Hold the lock shared: other readers go ahead, writers wait until it is released.
+        """
+        with self._hold("shared"):
+            yield
+
+
+    @contextmanager
+    def exclusive(self):
+        """
+        Hold the lock exclusively: everybody else waits until it is released.
+
+        Raises:
+            RuntimeError: If this thread holds the lock shared already (it can't be upgraded).
+        """
+        with self._hold("exclusive"):
+            yield
+
+
+    @contextmanager
+    def _hold(self, mode):
+        held = getattr(self._local, "mode", None)
+
+        if held is not None:
+            if held == "shared" and mode == "exclusive":
+                raise RuntimeError(f"{self._path} is held shared and can't be upgraded to exclusive.")
+            yield
+            return
+
+        handle = None
+        if fcntl is not None:
+            handle = getattr(self._local, "handle", None)
+            if handle is None:
+                os.makedirs(os.path.dirname(self._path), exist_ok=True)
+                handle = self._local.handle = open(self._path, "a+b")
+            fcntl.flock(handle.fileno(), fcntl.LOCK_SH if mode == "shared" else fcntl.LOCK_EX)
+
+        self._local.mode = mode
+        try:
+            yield
+        finally:
+            self._local.mode = None
+            if handle is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+
+def replace_file(tmp_path, path):
+    """
+    Flush the finished temp file <tmp_path> to disk and swap it in for <path>.
+
+    The rename is atomic and only happens once the new content is on disk, and the
+    directory is synced after it, so a crash leaves either the old or the new file,
+    never a truncated one.
+    """
+    with open(tmp_path, "rb") as handle:
+        os.fsync(handle.fileno())
+
+    os.replace(tmp_path, path)
+
+    dir_fd = os.open(os.path.dirname(path), os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
@@ -1,4 +1,6 @@
 from abc import ABC, abstractmethod
+from storage.movie_details import FacetIndex
+from storage.movie_table import MovieTable
 
 
 class IStorage(ABC):
@@ -38,7 +40,7 @@ class IStorage(ABC):
 
 
     @abstractmethod
-    def add_movie(self, title, year, rating, poster, imdb_id):
+    def add_movie(self, title, year, rating, poster, imdb_id, details=None):
         """
         Add a new movie to the storage.
 
@@ -48,6 +50,7 @@ class IStorage(ABC):
             rating (str): The rating of the movie.
             poster (str): The URL of the movie's poster image.
             imdb_id (str): imdbID of a movie title
+            details (dict): Optional details of storage.movie_details (genres, runtime, ...).
         """
         pass
 
@@ -76,3 +79,187 @@ class IStorage(ABC):
         pass
 
 
+    def revision(self):
+        """
+        Return a token that changes whenever the stored collection changes,
+        so callers can tell if data derived from list_movies() is still up to date.
+        Storages that can't tell cheaply return None, meaning "assume it changed".
+
+        Returns:
+            The current revision (only compared with ==), or None.
+        """
+        return None
+
+
+    def iter_movies(self):
+        """
+        Yield all movies one by one, for consumers that don't need them all at once.
+        Storages that can read movies incrementally should override this.
+
+        Yields:
+            tuple: (title, info)
+        """
+        yield from self.list_movies().items()
+
+
+    def get_movie(self, title):
+        """
+        Return the info of one movie.
+        Storages that can look up a single movie without loading all of them should override this.
+
+        Args:
+            title (str): The title of the movie.
+
+        Returns:
+            dict: Its information, or None if there is no such movie.
+        """
+        return self.list_movies().get(title)
+
+
+    def add_movies(self, movies):
+        """
+        Add many movies at once. Titles that already exist are skipped.
+        Storages should override this to write only once for the whole batch.
+
+        Args:
+            movies (dict): Movie titles mapped to dicts with year, rating, poster and imdb_id,
+                           and optionally the details of storage.movie_details (genres, runtime, ...).
+
+        Returns:
+            list: The titles of the movies added, in the given order.
+        """
+        added = []
+        for title, info in movies.items():
+            if not self.movie_exist(title):
+                self.add_movie(title, info["year"], info["rating"], info["poster"], info["imdb_id"], info)
+                added.append(title)
+        return added
+
+
+    def delete_movies(self, titles):
+        """
+        Delete many movies at once. Titles that don't exist are skipped.
+        Storages should override this to write only once for the whole batch.
+
+        Args:
+            titles (iterable): The titles of the movies to delete.
+
+        Returns:
+            int: The number of movies deleted.
+        """
+        deleted = 0
+        for title in titles:
+            if self.movie_exist(title):
+                self.delete_movie(title)
+                deleted += 1
+        return deleted
+
+
+    def update_movies(self, updates):
+        """
+        Update many movies at once. Titles that don't exist are skipped.
+        Storages should override this to write only once for the whole batch.
+
+        Args:
+            updates (dict): Movie titles mapped to dicts with the new rating and notes.
+
+        Returns:
+            int: The number of movies updated.
+        """
+        updated = 0
+        for title, changes in updates.items():
+            if self.movie_exist(title):
+                self.update_movie(title, changes["rating"], changes["notes"])
+                updated += 1
+        return updated
+
+
+    def movie_table(self):
+        """
+        Return the collection as a columnar MovieTable (typed NumPy arrays for year, rating and imdbID).
+        The table is cached until the storage revision changes; treat it as read-only.
+
+        Returns:
+            MovieTable: One row per movie.
+        """
+        revision = self.revision()
+        cached = getattr(self, "_movie_table_cache", None)
+
+        if revision is not None and cached is not None and cached[0] == revision:
+            return cached[1]
+
+        table = MovieTable.from_movies(self.iter_movies())
+        self._movie_table_cache = (revision, table)
+        return table
+
+
+    def _movies_of(self, titles):
+        """
+        Return (title, info) of <titles> in the given order, read in one pass over iter_movies().
+        """
+        wanted = set(titles)
+        found = {title: info for title, info in self.iter_movies() if title in wanted}
+        return [(title, found[title]) for title in titles if title in found]
+
+
+    def movies_by_rating(self, limit=None):
+        """
+        Return movies sorted by rating, highest first. Movies without a rating come last.
+        Sorted over the movie_table(); storages with an index on rating should override this.
+
+        Args:
+            limit (int): Only return the first <limit> movies (all if None).
+
+        Returns:
+            list: (title, info) tuples.
+        """
+        table = self.movie_table()
+        return self._movies_of(table.titles_at(table.sort_by_rating()[:limit]))
+
+
+    def movies_by_year(self, start, end):
+        """
+        Return movies released between <start> and <end> (both inclusive).
+        Filtered over the movie_table(); storages with an index on year should override this.
+
+        Args:
+            start (int): First year of the range.
+            end (int): Last year of the range.
+
+        Returns:
+            dict: A dictionary of movie titles and their associated information.
+        """
+        table = self.movie_table()
+        # Series have years like "2011–2014", only the first year counts
+        return dict(self._movies_of(table.titles_at(table.filter(year_from=start, year_to=end))))
+
+
+    def movies_by_details(self, genre=None, director=None, actor=None, language=None, min_rating=None,
+                          max_runtime=None, limit=None):
+        """
+        Return the movies matching all given filters, best rated first, e.g. all dramas
+        by one director rated 8.0 or more. Names are matched case-insensitively.
+        Uses a FacetIndex, cached until the storage revision changes; storages that
+        index the details themselves should override this.
+
+        Args:
+            genre, director, actor, language (str): A name the movie must have in that field.
+            min_rating (float): Lowest rating (inclusive); unrated movies don't match.
+            max_runtime (int): Longest runtime in minutes (inclusive).
+            limit (int): Only return the first <limit> movies (all if None).
+
+        Returns:
+            list: (title, info) tuples.
+        """
+        revision = self.revision()
+        cached = getattr(self, "_facet_index_cache", None)
+
+        if revision is not None and cached is not None and cached[0] == revision:
+            index = cached[1]
+        else:
+            index = FacetIndex(self.list_movies())
+            self._facet_index_cache = (revision, index)
+
+        # Only the matches are read, not the whole collection again
+        titles = index.query(genre, director, actor, language, min_rating, max_runtime)[:limit]
+        return [(title, self.get_movie(title)) for title in titles]
@@ -0,0 +1,137 @@
+import json
+import os
+
+
+class Journal:
+    """
+    Append-only log of mutations kept next to a storage data file.
+
+    Every add, delete or update is appended as one JSON line to '<data file>.log'
+    instead of rewriting the whole data file. Reading the collection means loading
+    the last snapshot (the data file itself) and replaying the log over it.
+    Once the log grows past <compact_threshold> bytes, the storage folds it into
+    a new snapshot and clears it.
+
+    Replaying is idempotent (add/update overwrite, delete ignores missing titles),
+    so a crash between writing a snapshot and clearing the log is harmless.
+    A crash in the middle of an append leaves a torn last line, which is
+    dropped and cut off the log on the next replay.
+    """
+
+    DEFAULT_COMPACT_THRESHOLD = 1024 * 1024
+
+    def __init__(self, data_path, compact_threshold=DEFAULT_COMPACT_THRESHOLD):
+        """
+        Initialize the journal for the data file at <data_path>.
+        """
+        self._path = data_path + ".log"
+        self._compact_threshold = compact_threshold
+
+
+    @property
+    def path(self):
+        return self._path
+
+
+    def stat(self):
+        """
+        Return (inode, mtime, size) of the log file, or None if it doesn't exist.
+        """
+        try:
+            stat = os.stat(self._path)
+        except FileNotFoundError:
+            return None
+
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+    def size(self):
+        """
+        Return the size of the log file in bytes.
+        """
+        try:
+            return os.path.getsize(self._path)
+        except FileNotFoundError:
+            return 0
+
+
+    def needs_compaction(self):
+        """
+        Return True if the log has grown past the compaction threshold.
+        """
+        return self.size() > self._compact_threshold
+
+
+    def append(self, records):
+        """
+        Append mutation records and flush them to disk with a single fsync.
+
+        Args:
+            records (list): e.g. [{"op": "delete", "title": "Heat"}]
+        """
+        lines = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+
+        # A crash can only tear the last line, replay drops it
+        with open(self._path, "a", encoding="utf-8") as handle:
+            handle.write(lines)
+            handle.flush()
+            os.fsync(handle.fileno())
+
+
+    def replay(self, movies):
+        """
+        Apply all logged mutations to <movies> (in place) and return it.
+        A torn or unreadable tail is cut off the log.
+        """
+        if not os.path.exists(self._path):
+            return movies
+
+        with open(self._path, "rb") as handle:
+            data = handle.read()
+
+        valid_end = 0
+        for line in data.splitlines(keepends=True):
+            if not line.endswith(b"\n"):
+                # Last append never finished
+                break
+            try:
+                record = json.loads(line)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                print(f"Corrupt journal record in {self._path}, ignoring the rest of the log.")
+                break
+
+            self._apply(movies, record)
+            valid_end += len(line)
+
+        if valid_end < len(data):
+            os.truncate(self._path, valid_end)
+
+        return movies
+
+
+    def clear(self):
+        """
+        Empty the log, e.g. after its records were folded into a new snapshot.
+        """
+        if os.path.exists(self._path):
+            os.truncate(self._path, 0)
+
+
+    @staticmethod
+    def _apply(movies, record):
+        """
+        Apply a single mutation record to <movies>.
+        """
+        op = record.get("op")
+        title = record.get("title")
+
+        if op == "add":
+            movies[title] = record["info"]
+
+        elif op == "delete":
+            movies.pop(title, None)
+
+        elif op == "update":
+            if title in movies:
+                movies[title]["rating"] = record["rating"]
+                movies[title]["notes"] = record["notes"]
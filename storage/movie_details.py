@@ -0,0 +1,220 @@
+"""
+Extended movie details from the full OMDb response, and an inverted index over them.
+
+Besides year, rating, poster, imdb_id and notes, a movie's info may hold:
+
+    genres      ["Drama"]                       from OMDb's "Genre"
+    directors   ["Paul Thomas Anderson"]        from "Director"
+    actors      ["Daniel Day-Lewis", ...]       from "Actors"
+    languages   ["English", "American Sign"]    from "Language"
+    runtime     158                             from "Runtime" ("158 min"), in minutes
+
+Movies added before these were kept don't have them; every reader uses info.get().
+
+parse_rating(), parse_year() and parse_runtime() turn the stored strings into numbers
+for everything that sorts, filters or counts movies.
+"""
+
+import sys
+
+
+# Details holding a list of names, in OMDb's order
+NAME_FIELDS = ("genres", "directors", "actors", "languages")
+DETAIL_FIELDS = NAME_FIELDS + ("runtime",)
+# Separator of the names in one OMDb field, and in a CSV column
+NAME_SEPARATOR = ", "
+# Query parameter -> field it filters on, see FacetIndex.query()
+FILTERS = {"genre": "genres", "director": "directors", "actor": "actors", "language": "languages"}
+
+
+def split_names(value):
+    """
+    Return the names in an OMDb field like "Daniel Day-Lewis, Paul Dano" as a list ([] for "N/A").
+    """
+    if not value or value == "N/A":
+        return []
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+def parse_rating(rating):
+    """
+    Return <rating> as a float, or None if it isn't a number (e.g. OMDb's "N/A").
+    """
+    try:
+        return float(rating)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_year(year):
+    """
+    Return the (first) release year as an int, or None. Series have years like "2011–2014".
+    """
+    year = str(year)[:4]
+    return int(year) if year.isdigit() else None
+
+
+def parse_runtime(value):
+    """
+    Return the minutes of an OMDb runtime like "158 min" as an int, or None (e.g. for "N/A").
+    """
+    digits = str(value or "").split(" ")[0]
+    return int(digits) if digits.isdigit() else None
+
+
+def pick_details(info):
+    """
+    Return the details present in a movie info dict, leaving out empty ones.
+    """
+    return {field: info[field] for field in DETAIL_FIELDS if info.get(field) not in (None, [], "")}
+
+
+def format_details(info):
+    """
+    Return the details of a movie info dict as strings, e.g. for the columns of a CSV file.
+    """
+    row = {field: NAME_SEPARATOR.join(info.get(field) or ()) for field in NAME_FIELDS}
+    row["runtime"] = "" if info.get("runtime") is None else str(info["runtime"])
+    return row
+
+
+def parse_details(row):
+    """
+    Return the details in a dict of strings written by format_details(), leaving out empty ones.
+    Missing keys (e.g. columns of an older CSV file) count as empty.
+    """
+    details = {field: row[field].split(NAME_SEPARATOR) for field in NAME_FIELDS if row.get(field)}
+    runtime = parse_runtime(row.get("runtime"))
+    if runtime is not None:
+        details["runtime"] = runtime
+    return details
+
+
+class FacetIndex:
+    """
+    Inverted index from genres, directors, actors and languages to the titles of the movies.
+
+    A query like "dramas by Paul Thomas Anderson rated 8.0 or more" intersects the title
+    sets of the names asked for, smallest first, and only checks rating and runtime of
+    the titles left, so it doesn't scan the collection (unless no name is given at all).
+    Names are matched case-insensitively. Each distinct name is stored once (interned),
+    however many movies share it. Movies are added and removed one by one as the storage changes.
+    """
+
+    def __init__(self, movies=None):
+        """
+        Initialize the index.
+
+        Args:
+            movies (dict): Movies to index (title -> info).
+        """
+        self.rebuild(movies or {})
+
+
+    def rebuild(self, movies):
+        """
+        Re-index all movies of a movies dictionary (title -> info).
+        """
+        # field -> name key -> titles; title -> (rating, runtime, name keys per field)
+        self._postings = {field: {} for field in NAME_FIELDS}
+        self._movies = {}
+
+        for title, info in movies.items():
+            self.add(title, info)
+
+
+    def __len__(self):
+        return len(self._movies)
+
+
+    def add(self, title, info):
+        """
+        Index a movie, replacing its previous entry if it was indexed before.
+        """
+        if title in self._movies:
+            self.remove(title)
+
+        # Only fields with names are kept per movie, to find its postings again on removal
+        keys = {}
+        for field in NAME_FIELDS:
+            names = info.get(field)
+            if not names:
+                continue
+
+            postings = self._postings[field]
+            keys[field] = field_keys = tuple(sys.intern(name.casefold()) for name in names)
+            for key in field_keys:
+                titles = postings.get(key)
+                if titles is None:
+                    postings[key] = titles = set()
+                titles.add(title)
+
+        self._movies[title] = (parse_rating(info.get("rating")), info.get("runtime"), keys)
+
+
+    def remove(self, title):
+        """
+        Remove a movie from the index. Does nothing if it isn't indexed.
+        """
+        entry = self._movies.pop(title, None)
+        if entry is None:
+            return
+
+        for field, keys in entry[2].items():
+            postings = self._postings[field]
+            for key in keys:
+                titles = postings.get(key)
+                # A name may be listed twice for one movie
+                if titles is not None:
+                    titles.discard(title)
+                    if not titles:
+                        del postings[key]
+
+
+    def query(self, genre=None, director=None, actor=None, language=None, min_rating=None, max_runtime=None):
+        """
+        Return the titles of the movies matching all given filters, best rated first.
+
+        Args:
+            genre, director, actor, language (str): A name the movie must have in that field.
+            min_rating (float): Lowest rating (inclusive); unrated movies don't match.
+            max_runtime (int): Longest runtime in minutes (inclusive); movies without one don't match.
+
+        Returns:
+            list: Matching titles, ties (and unrated movies) ordered by title.
+        """
+        names = {"genre": genre, "director": director, "actor": actor, "language": language}
+        title_sets = []
+        for parameter, name in names.items():
+            if name is not None:
+                title_sets.append(self._postings[FILTERS[parameter]].get(name.casefold(), set()))
+
+        if title_sets:
+            title_sets.sort(key=len)
+            candidates = title_sets[0].intersection(*title_sets[1:])
+        else:
+            candidates = self._movies.keys()
+
+        matches = []
+        for title in candidates:
+            rating, runtime, _ = self._movies[title]
+            if min_rating is not None and (rating is None or rating < min_rating):
+                continue
+            if max_runtime is not None and (runtime is None or runtime > max_runtime):
+                continue
+            matches.append((float("inf") if rating is None else -rating, title))
+
+        matches.sort()
+        return [title for _, title in matches]
+
+
+    def counts(self, field, limit=10):
+        """
+        Return the most frequent names of a field (e.g. "genres") with their number of movies.
+
+        Returns:
+            list: (name, count) tuples, most movies first; names are casefolded.
+        """
+        postings = self._postings[field]
+        return sorted(((key, len(titles)) for key, titles in postings.items()),
+                      key=lambda item: (-item[1], item[0]))[:limit]
@@ -0,0 +1,214 @@
+import numpy as np
+from storage.movie_details import parse_rating, parse_year
+
+
+# Rating histogram buckets, one per whole rating point (10 counts as 9)
+HISTOGRAM_BUCKETS = 10
+# Percentiles (nearest rank) reported by summary()
+PERCENTILES = (10, 25, 75, 90)
+
+
+def _parse_imdb_id(imdb_id):
+    """
+    Return the number of an imdbID ("tt0848228" -> 848228), or 0 if there is none.
+    """
+    digits = str(imdb_id)[2:]
+    return int(digits) if digits.isdigit() else 0
+
+
+class MovieTable:
+    """
+    Compact, typed, column-wise copy of a movie collection for analysis.
+
+    Years, ratings and imdbIDs are stored in contiguous NumPy arrays (parsed once),
+    so stats, sorting and filtering run as vectorized operations instead of
+    float() calls in Python loops. Row i of every column belongs to titles[i].
+    Missing years are -1, missing ratings NaN and missing imdbIDs 0; the imdbID
+    is kept as its number, so no string per movie is held for it.
+    """
+
+    def __init__(self, titles, years, ratings, imdb_numbers):
+        """
+        Initialize the table from a list of titles and matching column arrays.
+        """
+        self.titles = titles
+        self.years = np.asarray(years, dtype=np.int16)
+        self.ratings = np.asarray(ratings, dtype=np.float64)
+        self.imdb_numbers = np.asarray(imdb_numbers, dtype=np.uint32)
+        # title -> row
+        self._rows = {title: row for row, title in enumerate(titles)}
+
+
+    @classmethod
+    def from_movies(cls, movies):
+        """
+        Build a table from (title, info) pairs, e.g. storage.iter_movies() or list_movies().items().
+        """
+        titles, years, ratings, imdb_ids = [], [], [], []
+        for title, info in movies:
+            titles.append(title)
+            years.append(info.get("year"))
+            ratings.append(info.get("rating"))
+            imdb_ids.append(info.get("imdb_id", ""))
+        return cls.from_columns(titles, years, ratings, imdb_ids)
+
+
+    @classmethod
+    def from_columns(cls, titles, years, ratings, imdb_ids):
+        """
+        Build a table from parallel lists of titles and raw (string) years, ratings and imdbIDs.
+        """
+        count = len(titles)
+        return cls(titles,
+                   np.fromiter((-1 if year is None else year for year in map(parse_year, years)),
+                               dtype=np.int16, count=count),
+                   np.fromiter((np.nan if rating is None else rating for rating in map(parse_rating, ratings)),
+                               dtype=np.float64, count=count),
+                   np.fromiter(map(_parse_imdb_id, imdb_ids), dtype=np.uint32, count=count))
+
+
+    def __len__(self):
+        return len(self.titles)
+
+
+    def row_of(self, title):
+        """
+        Return the row of <title>, or None if it isn't in the table.
+        """
+        return self._rows.get(title)
+
+
+    def imdb_id(self, row):
+        """
+        Return the imdbID string of <row>, e.g. "tt0848228" (empty if unknown).
+        """
+        number = int(self.imdb_numbers[row])
+        return f"tt{number:07d}" if number else ""
+
+
+    def stats(self):
+        """
+        Return average, median, best and worst rating over all rated movies.
+
+        Returns:
+            dict: count, average, median, best/worst (rating, [titles]); None values if nothing is rated.
+        """
+        rated = ~np.isnan(self.ratings)
+        ratings = self.ratings[rated]
+
+        if len(ratings) == 0:
+            return {"count": 0, "average": None, "median": None, "best": (None, []), "worst": (None, [])}
+
+        highest = ratings.max()
+        lowest = ratings.min()
+        return {
+            "count": len(ratings),
+            "average": float(ratings.mean()),
+            "median": float(np.median(ratings)),
+            "best": (float(highest), sorted(self.titles_at(np.flatnonzero(self.ratings == highest)))),
+            "worst": (float(lowest), sorted(self.titles_at(np.flatnonzero(self.ratings == lowest))))
+        }
+
+
+    def percentile(self, percent):
+        """
+        Return the rating at <percent> (0-100) using the nearest-rank method, or None if nothing is rated.
+        """
+        ratings = np.sort(self.ratings[~np.isnan(self.ratings)])
+        if len(ratings) == 0:
+            return None
+
+        rank = max(1, -(-percent * len(ratings) // 100))
+        return float(ratings[int(rank) - 1])
+
+
+    def by_year(self):
+        """
+        Return {year: (count, average rating)} of the rated movies with a year, sorted by year.
+        """
+        mask = ~np.isnan(self.ratings) & (self.years >= 0)
+        years, groups = np.unique(self.years[mask], return_inverse=True)
+        counts = np.bincount(groups, minlength=len(years))
+        totals = np.bincount(groups, weights=self.ratings[mask], minlength=len(years))
+        return {int(year): (int(count), float(total / count))
+                for year, count, total in zip(years, counts, totals)}
+
+
+    def by_decade(self):
+        """
+        Return {decade: (count, average rating)} of the rated movies with a year, sorted by decade.
+        """
+        mask = ~np.isnan(self.ratings) & (self.years >= 0)
+        decades, groups = np.unique(self.years[mask] // 10 * 10, return_inverse=True)
+        counts = np.bincount(groups, minlength=len(decades))
+        totals = np.bincount(groups, weights=self.ratings[mask], minlength=len(decades))
+        return {int(decade): (int(count), float(total / count))
+                for decade, count, total in zip(decades, counts, totals)}
+
+
+    def histogram(self):
+        """
+        Return {bucket: count} with one bucket per whole rating point (0-9, 10 counts as 9).
+        """
+        ratings = self.ratings[~np.isnan(self.ratings)]
+        buckets = np.clip(ratings.astype(np.int64), 0, HISTOGRAM_BUCKETS - 1)
+        return dict(enumerate(np.bincount(buckets, minlength=HISTOGRAM_BUCKETS).tolist()))
+
+
+    def summary(self):
+        """
+        Return all statistics as a JSON-serializable dict, in the shape of RatingStats.summary().
+        """
+        stats = self.stats()
+        best_rating, best_titles = stats["best"]
+        worst_rating, worst_titles = stats["worst"]
+        return {
+            "rated": stats["count"],
+            "average": stats["average"],
+            "median": stats["median"],
+            "best": {"rating": best_rating, "titles": best_titles},
+            "worst": {"rating": worst_rating, "titles": worst_titles},
+            "percentiles": {str(percent): self.percentile(percent) for percent in PERCENTILES},
+            "by_year": {str(year): {"movies": count, "average": average}
+                        for year, (count, average) in self.by_year().items()},
+            "by_decade": {str(decade): {"movies": count, "average": average}
+                          for decade, (count, average) in self.by_decade().items()},
+            "histogram": {str(bucket): count for bucket, count in self.histogram().items()}
+        }
+
+
+    def sort_by_rating(self, descending=True):
+        """
+        Return the rows ordered by rating (unrated movies last), ties in storage order.
+        """
+        if descending:
+            keys = -np.nan_to_num(self.ratings, nan=-np.inf)
+        else:
+            keys = np.nan_to_num(self.ratings, nan=np.inf)
+        return np.argsort(keys, kind="stable")
+
+
+    def filter(self, min_rating=None, max_rating=None, year_from=None, year_to=None):
+        """
+        Return the rows matching all given bounds (all inclusive, None means unbounded),
+        in storage order. Unrated movies don't match a rating bound, movies without a year no year bound.
+        """
+        mask = np.ones(len(self.titles), dtype=bool)
+
+        if min_rating is not None:
+            mask &= self.ratings >= min_rating
+        if max_rating is not None:
+            mask &= self.ratings <= max_rating
+        if year_from is not None:
+            mask &= self.years >= year_from
+        if year_to is not None:
+            mask &= (self.years <= year_to) & (self.years >= 0)
+
+        return np.flatnonzero(mask)
+
+
+    def titles_at(self, rows):
+        """
+        Return the titles of <rows>.
+        """
+        return [self.titles[row] for row in rows]
@@ -0,0 +1,495 @@
+"""
+Binary snapshot storage, read through mmap.
+
+A .mvdb file is a fixed-layout snapshot of the collection:
+
+    header        magic b"MVDB", format version, number of movies, offset of the table (<4sIIQ)
+    records       one per movie, in insertion order: six field lengths (<6I) followed by
+                  the UTF-8 bytes of title, year, rating, poster, imdb_id and notes
+    offset table  one record offset per movie (<Q), sorted by title
+
+Opening the file maps it into memory instead of parsing it, so startup costs
+nothing and a lookup is a binary search over the offset table that only
+touches the pages it needs. Processes opening the same snapshot share those
+pages read-only. Every change writes a new snapshot (unchanged records are
+copied as raw bytes) and swaps it in atomically, under an exclusive lock on
+'<file>.lock' so changes from several processes don't overwrite each other.
+
+The layout has no room for the details of storage.movie_details (genres,
+directors, actors, languages, runtime): they are dropped, and filtering by
+them finds nothing in a snapshot.
+
+Convert from and to the JSON and CSV files with:
+    python3 -m storage.storage_binary <source> <target>
+
+Example:
+    python3 -m storage.storage_binary movies.json movies.mvdb
+    python3 -m storage.storage_binary movies.mvdb movies.csv
+"""
+
+from storage.file_lock import FileLock, replace_file
+from storage.istorage import IStorage
+from storage.storage_json import StorageJson, NDJSON_EXTENSIONS
+from storage.storage_csv import StorageCsv
+import argparse
+import mmap
+import os
+import struct
+
+
+MAGIC = b"MVDB"
+VERSION = 1
+HEADER = struct.Struct("<4sIIQ")
+FIELD_LENGTHS = struct.Struct("<6I")
+OFFSET = struct.Struct("<Q")
+# Fields of a record after the title, in file order
+FIELDS = ("year", "rating", "poster", "imdb_id", "notes")
+
+
+def _encode_record(title, info):
+    """
+    Return the bytes of one record.
+    """
+    values = [title.encode("utf-8")] + [str(info.get(field, "")).encode("utf-8") for field in FIELDS]
+    return FIELD_LENGTHS.pack(*map(len, values)) + b"".join(values)
+
+
+class StorageBinary(IStorage):
+    def __init__(self, filename):
+        """
+        Initialize the storage by mapping the snapshot file inside the data folder.
+        Creates an empty snapshot if it doesn't exist.
+        """
+        base_dir = os.path.dirname(__file__)
+        data_dir = os.path.abspath(os.path.join(base_dir, "..", "data"))
+
+        filename = os.path.basename(filename)
+
+        self._file_path = os.path.join(data_dir, filename)
+
+        # Mapped snapshot, its movie count and offset table position, and the file stat it was mapped at
+        self._map = None
+        self._count = 0
+        self._table_offset = 0
+        self._file_stat = None
+        # Held exclusively by every change, see FileLock
+        self._lock = FileLock(self._file_path)
+
+        if not os.path.exists(self._file_path):
+            os.makedirs(data_dir, exist_ok=True)
+            with self._lock.exclusive():
+                # Another process may have created it while we waited
+                if not os.path.exists(self._file_path):
+                    self._write_snapshot(iter(()))
+
+
+    def _current_stat(self):
+        """
+        Return (inode, mtime, size) of the snapshot file, or None if it doesn't exist.
+        """
+        try:
+            stat = os.stat(self._file_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+    def _snapshot(self):
+        """
+        Return the mapped snapshot, mapping it again if the file was replaced since.
+        Callers keep what is returned for the whole read, so a replaced file can't mix into it.
+
+        Returns:
+            tuple: (mapped file, movie count, offset table position).
+
+        Raises:
+            ValueError: If the file isn't a snapshot of a supported version.
+        """
+        stat = self._current_stat()
+        if self._map is not None and stat == self._file_stat:
+            return self._map, self._count, self._table_offset
+
+        # The previous map isn't closed: an iterator may still be reading it. It is unmapped
+        # once the last one lets go of it
+        with open(self._file_path, "rb") as handle:
+            snapshot = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            # The file may have been replaced since the stat above, keep the stat of what was mapped
+            stat = os.fstat(handle.fileno())
+            stat = stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+        magic, version, count, table_offset = HEADER.unpack_from(snapshot, 0)
+        if magic != MAGIC or version != VERSION:
+            snapshot.close()
+            raise ValueError(f"{self._file_path} is not a movie snapshot (version {VERSION}).")
+
+        self._map = snapshot
+        self._count = count
+        self._table_offset = table_offset
+        self._file_stat = stat
+        return snapshot, count, table_offset
+
+
+    @staticmethod
+    def _record_offset(snapshot, table_offset, index):
+        """
+        Return the offset of the record at position <index> of the title-sorted table.
+        """
+        return OFFSET.unpack_from(snapshot, table_offset + index * OFFSET.size)[0]
+
+
+    @staticmethod
+    def _record_title(snapshot, offset):
+        """
+        Return the UTF-8 title bytes of the record at <offset>.
+        """
+        title_length = FIELD_LENGTHS.unpack_from(snapshot, offset)[0]
+        start = offset + FIELD_LENGTHS.size
+        return snapshot[start:start + title_length]
+
+
+    @staticmethod
+    def _read_record(snapshot, offset):
+        """
+        Return (title, info, offset of the next record) of the record at <offset>.
+        """
+        lengths = FIELD_LENGTHS.unpack_from(snapshot, offset)
+        position = offset + FIELD_LENGTHS.size
+        values = []
+        for length in lengths:
+            values.append(snapshot[position:position + length].decode("utf-8"))
+            position += length
+        return values[0], dict(zip(FIELDS, values[1:])), position
+
+
+    def _find(self, title):
+        """
+        Binary search the offset table for <title>.
+
+        Returns:
+            tuple: (snapshot, offset of its record), or None if it isn't stored.
+        """
+        snapshot, count, table_offset = self._snapshot()
+        key = title.encode("utf-8")
+        low, high = 0, count
+
+        while low < high:
+            middle = (low + high) // 2
+            offset = self._record_offset(snapshot, table_offset, middle)
+            middle_title = self._record_title(snapshot, offset)
+
+            if middle_title == key:
+                return snapshot, offset
+            if middle_title < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        return None
+
+
+    def _iter_raw_records(self):
+        """
+        Yield (title bytes, raw record bytes) of every record in file order.
+        """
+        snapshot, count, _ = self._snapshot()
+        position = HEADER.size
+
+        for _ in range(count):
+            lengths = FIELD_LENGTHS.unpack_from(snapshot, position)
+            end = position + FIELD_LENGTHS.size + sum(lengths)
+            title_start = position + FIELD_LENGTHS.size
+            yield snapshot[title_start:title_start + lengths[0]], snapshot[position:end]
+            position = end
+
+
+    def _write_snapshot(self, records):
+        """
+        Write (title bytes, raw record bytes) pairs as a new snapshot and swap it in.
+        """
+        tmp_path = self._file_path + ".tmp"
+        # (title bytes, offset) of every record, sorted into the offset table at the end
+        entries = []
+
+        with open(tmp_path, "wb") as handle:
+            handle.write(HEADER.pack(MAGIC, VERSION, 0, 0))
+            position = HEADER.size
+
+            for title, record in records:
+                entries.append((title, position))
+                handle.write(record)
+                position += len(record)
+
+            entries.sort()
+            handle.write(b"".join(OFFSET.pack(offset) for _, offset in entries))
+
+            # The header goes in last, once count and table position are known
+            handle.seek(0)
+            handle.write(HEADER.pack(MAGIC, VERSION, len(entries), position))
+
+        replace_file(tmp_path, self._file_path)
+
+
+    def _rewrite(self, deleted=(), updated=None, added=None):
+        """
+        Write a new snapshot with the given changes, copying all other records unchanged.
+
+        Args:
+            deleted (set): Titles to leave out.
+            updated (dict): Titles mapped to their new info.
+            added (dict): New titles mapped to their info, appended at the end.
+        """
+        updated = updated or {}
+        added = added or {}
+        deleted = {title.encode("utf-8") for title in deleted}
+        updated = {title.encode("utf-8"): (title, info) for title, info in updated.items()}
+
+        def records():
+            for title, record in self._iter_raw_records():
+                if title in deleted:
+                    continue
+                if title in updated:
+                    yield title, _encode_record(*updated[title])
+                else:
+                    yield title, record
+
+            for title, info in added.items():
+                yield title.encode("utf-8"), _encode_record(title, info)
+
+        self._write_snapshot(records())
+
+
+    def revision(self):
+        """
+        Return the stat of the snapshot file. Every change replaces the file, so this changes with it.
+
+        Returns:
+            tuple: (inode, mtime, size) of the file.
+        """
+        return self._current_stat()
+
+
+    def list_movies(self):
+        """
+        Return all movies stored in the snapshot.
+
+        Returns:
+            dict: A dictionary of movie titles and
+            their associated information (year, rating, poster).
+        """
+        return dict(self.iter_movies())
+
+
+    def iter_movies(self):
+        """
+        Yield all movies one by one, in the order they were added.
+
+        Yields:
+            tuple: (title, info)
+        """
+        snapshot, count, _ = self._snapshot()
+        position = HEADER.size
+
+        for _ in range(count):
+            title, info, position = self._read_record(snapshot, position)
+            yield title, info
+
+
+    def get_movie(self, title):
+        """
+        Return the info of one movie, found by binary search over the offset table.
+
+        Args:
+            title (str): The title of the movie.
+
+        Returns:
+            dict: Its information, or None if there is no such movie.
+        """
+        found = self._find(title)
+        if found is None:
+            return None
+        return self._read_record(*found)[1]
+
+
+    def movie_exist(self, title):
+        """
+        Check if a movie with the given title already exists in storage.
+
+        Args:
+            title (str): The title of the movie to check.
+
+        Returns:
+            bool: True if the movie exists, otherwise False.
+        """
+        return self._find(title) is not None
+
+
+    def add_movie(self, title, year, rating, poster, imdb_id, details=None):
+        """
+        Add a new movie to the storage if it doesn't already exist.
+
+        Args:
+            title (str): The title of the movie.
+            year (int): The year the movie was released.
+            rating (str): The movie's rating.
+            poster (str): The URL to the movie's poster image.
+            imdb_id (str): imdbID of a movie title.
+            details (dict): Ignored, this format doesn't keep genres, runtime, ...
+        """
+        if not self.add_movies({title: {"year": year, "rating": rating, "poster": poster, "imdb_id": imdb_id}}):
+            print(f"Movie '{title}' already exists.")
+
+
+    def delete_movie(self, title):
+        """
+        Delete a movie from the storage by its title.
+
+        Args:
+            title (str): The title of the movie to delete.
+        """
+        if not self.delete_movies([title]):
+            print(f"Movie '{title}' not found.")
+
+
+    def update_movie(self, title, rating, notes):
+        """
+        Update the rating and notes of an existing movie in the storage.
+
+        Args:
+            title (str): The title of the movie to update.
+            rating (float): The new rating of the movie.
+            notes (str): movie notes.
+        """
+        if not self.update_movies({title: {"rating": rating, "notes": notes}}):
+            print(f"Movie '{title}' not found.")
+
+
+    def add_movies(self, movies):
+        """
+        Add many movies with a single new snapshot.
+        Titles that already exist are skipped.
+
+        Args:
+            movies (dict): Movie titles mapped to dicts with year, rating, poster and imdb_id.
+                           Other keys (e.g. genres or runtime) aren't kept by this format.
+
+        Returns:
+            list: The titles of the movies added, in the given order.
+        """
+        with self._lock.exclusive():
+            added = {}
+            for title, info in movies.items():
+                if not self.movie_exist(title):
+                    added[title] = {
+                        "year": info["year"],
+                        "rating": info["rating"],
+                        "poster": info["poster"],
+                        "imdb_id": info["imdb_id"],
+                        "notes": ""
+                    }
+
+            if added:
+                self._rewrite(added=added)
+            return list(added)
+
+
+    def delete_movies(self, titles):
+        """
+        Delete many movies with a single new snapshot.
+        Titles that don't exist are skipped.
+
+        Args:
+            titles (iterable): The titles of the movies to delete.
+
+        Returns:
+            int: The number of movies deleted.
+        """
+        with self._lock.exclusive():
+            deleted = {title for title in titles if self.movie_exist(title)}
+
+            if deleted:
+                self._rewrite(deleted=deleted)
+            return len(deleted)
+
+
+    def update_movies(self, updates):
+        """
+        Update the rating and notes of many movies with a single new snapshot.
+        Titles that don't exist are skipped.
+
+        Args:
+            updates (dict): Movie titles mapped to dicts with the new rating and notes.
+
+        Returns:
+            int: The number of movies updated.
+        """
+        with self._lock.exclusive():
+            updated = {}
+            for title, changes in updates.items():
+                info = self.get_movie(title)
+                if info is not None:
+                    info["rating"] = changes["rating"]
+                    info["notes"] = changes["notes"]
+                    updated[title] = info
+
+            if updated:
+                self._rewrite(updated=updated)
+            return len(updated)
+
+
+    def close(self):
+        """
+        Unmap the snapshot.
+        """
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+def _open_storage(filename):
+    """
+    Return the storage for a .json, .ndjson/.jsonl, .csv or .mvdb file by its extension.
+    """
+    ext = os.path.splitext(filename)[1].lower()
+
+    if ext == ".json" or ext in NDJSON_EXTENSIONS:
+        return StorageJson(filename)
+    if ext == ".csv":
+        return StorageCsv(filename)
+    if ext == ".mvdb":
+        return StorageBinary(filename)
+    raise ValueError("Unsupported file type. Please use a .json, .ndjson, .jsonl, .csv or .mvdb file.")
+
+
+def convert(source_filename, target_filename):
+    """
+    Copy all movies from one file into another, e.g. from movies.json into a new movies.mvdb
+    snapshot or back. Movies already in the target are left alone.
+
+    Args:
+        source_filename (str): The .json, .ndjson, .jsonl, .csv or .mvdb file in the data folder.
+        target_filename (str): The .json, .ndjson, .jsonl, .csv or .mvdb file to create or fill.
+
+    Returns:
+        int: The number of movies copied.
+    """
+    source = _open_storage(source_filename)
+    target = _open_storage(target_filename)
+
+    movies = {title: info for title, info in source.list_movies().items() if not target.movie_exist(title)}
+    copied = len(target.add_movies(movies))
+
+    # add_movies() starts every movie without notes, bring them along
+    notes = {title: {"rating": info["rating"], "notes": info["notes"]}
+             for title, info in movies.items() if info.get("notes")}
+    target.update_movies(notes)
+    return copied
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert movies between .json, .csv and .mvdb snapshot files.")
+    parser.add_argument("source", help="The .json, .ndjson, .jsonl, .csv or .mvdb file to read movies from.")
+    parser.add_argument("target", help="The .json, .ndjson, .jsonl, .csv or .mvdb file to write movies to.")
+    args = parser.parse_args()
+
+    count = convert(args.source, args.target)
+    print(f"Converted {count} movies from {args.source} to {args.target}.")
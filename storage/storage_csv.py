@@ -1,14 +1,93 @@
+from storage.file_lock import FileLock, replace_file
 from storage.istorage import IStorage
+from storage.journal import Journal
+from storage.movie_details import DETAIL_FIELDS, format_details, parse_details, pick_details
 import csv
 import os
 
 
+# Files written before the details were kept lack their columns, they are read as empty
+FIELDNAMES = ["title", "year", "rating", "poster", "imdb_id", "notes", *DETAIL_FIELDS]
+
+
+def _add_rows(rows, movies):
+    """
+    Pass <rows> through and append the <movies> whose titles aren't among them.
+    Returns the titles appended.
+    """
+    new_movies = dict(movies)
+
+    for title, info in rows:
+        new_movies.pop(title, None)
+        yield title, info
+
+    for title, info in new_movies.items():
+        yield title, {
+            "year": info["year"],
+            "rating": info["rating"],
+            "poster": info["poster"],
+            "imdb_id": info["imdb_id"],
+            **pick_details(info),
+            "notes": ""
+        }
+    return list(new_movies)
+
+
+def _delete_rows(rows, titles):
+    """
+    Pass <rows> through, leaving out the given titles. Returns the number of rows left out.
+    """
+    titles = set(titles)
+    deleted = 0
+
+    for title, info in rows:
+        if title in titles:
+            deleted += 1
+            continue
+        yield title, info
+    return deleted
+
+
+def _update_rows(rows, updates):
+    """
+    Pass <rows> through with the rating and notes of the given titles replaced.
+    Returns the number of rows changed.
+    """
+    updated = 0
+
+    for title, info in rows:
+        changes = updates.get(title)
+        if changes is not None:
+            info["rating"] = changes["rating"]
+            info["notes"] = changes["notes"]
+            updated += 1
+        yield title, info
+    return updated
+
+
 class StorageCsv(IStorage):
-    def __init__(self, filename):
+    def __init__(self, filename, journal=False, compact_threshold=Journal.DEFAULT_COMPACT_THRESHOLD,
+                 streaming=False):
         """
         Initialize the storage by setting the CSV file path inside the data folder.
         Creates an empty file if it doesn't exist.
+
+        With <journal> enabled, mutations are appended to '<filename>.log' instead of
+        rewriting the whole file; the log is folded into the file once it grows past
+        <compact_threshold> bytes.
+
+        With <streaming> enabled, the collection is never held in memory: reads walk
+        the file row by row and every change copies it row by row into a new file.
+        Memory stays bounded no matter how large the file is, at the cost of a full
+        pass over the file per operation. Can't be combined with <journal>.
+
+        Several processes can share the file: every change reloads it and writes it back
+        under an exclusive lock on '<filename>.lock', so no change made in between is lost,
+        and reloads hold the lock shared.
         """
+        if journal and streaming:
+            raise ValueError("Journal mode keeps the collection in memory and can't be combined with streaming.")
+
         base_dir = os.path.dirname(__file__)
         data_dir = os.path.abspath(os.path.join(base_dir, "..", "data"))
 
@@ -16,9 +95,31 @@ class StorageCsv(IStorage):
 
         self._file_path = os.path.join(data_dir, filename)
 
+        # In-memory copy of the collection and the file stat it was loaded from
+        self._movies = None
+        self._file_stat = None
+        # Bumped on every reload and every change, see revision()
+        self._revision = 0
+
+        self._streaming = streaming
+        self._journal = Journal(self._file_path, compact_threshold)
+        self._lock = FileLock(self._file_path)
+
         # If file doesn't exist, create empty CSV file
         if not os.path.exists(self._file_path):
-            self._create_empty_file()
+            with self._lock.exclusive():
+                # Another process may have created it while we waited
+                if not os.path.exists(self._file_path):
+                    self._create_empty_file()
+
+        if not journal:
+            # Fold in a log left behind by a journaled run before writing without one
+            if self._journal.size() > 0:
+                self.compact()
+            self._journal = None
+
+        if streaming:
+            self._movies = None
 
 
     def _create_empty_file(self):
@@ -27,75 +128,276 @@ class StorageCsv(IStorage):
         """
         os.makedirs(os.path.dirname(self._file_path), exist_ok=True)
         with open(self._file_path, "w", encoding="utf-8") as handle:
-            # <fieldnames> represent the column headers in CSV file
-            fieldnames = ["title", "year", "rating", "poster", "imdb_id", "notes"]
-            writer = csv.DictWriter(handle, fieldnames=fieldnames)
-            writer.writeheader()
+            # <FIELDNAMES> represent the column headers in CSV file
+            csv.writer(handle).writerow(FIELDNAMES)
+
+
+    def _write_tmp_file(self, rows):
+        """
+        Write (title, info) pairs row by row into a temp file next to the CSV file.
+
+        Returns:
+            str: Path of the temp file.
+        """
+        tmp_path = self._file_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8", newline="") as handle:
+            writer = csv.writer(handle)
+            writer.writerow(FIELDNAMES)
+            for title, info in rows:
+                details = format_details(info)
+                writer.writerow((title, info["year"], info["rating"], info["poster"],
+                                 info["imdb_id"], info["notes"], *(details[field] for field in DETAIL_FIELDS)))
+        return tmp_path
 
 
     def _save_to_file(self, movies):
         """
         Private method to write the updated movies dictionary back to the file.
         """
-        rows = []
-        for title, info in movies.items():
-            row = {
-                "title": title,
-                "year": info["year"],
-                "rating": info["rating"],
-                "poster": info["poster"],
-                "imdb_id": info["imdb_id"],
-                "notes": info["notes"]
-            }
-            rows.append(row)
-
-        with open(self._file_path, "w", encoding="utf-8") as handle:
-            fieldnames = ["title", "year", "rating", "poster", "imdb_id", "notes"]
-            writer = csv.DictWriter(handle, fieldnames=fieldnames)
+        # Write next to the live file and swap it in, so a crash never leaves half a file
+        replace_file(self._write_tmp_file(movies.items()), self._file_path)
 
-            writer.writeheader()
-            writer.writerows(rows)
+        # Write-through: keep the cache in sync with the file
+        self._movies = movies
+        self._file_stat = self._current_stat()
 
 
-    def list_movies(self):
+    def _current_stat(self):
         """
-        Return all movies stored in the CSV file.
+        Return (inode, mtime, size) of the CSV file, or None if it doesn't exist.
+        In journal mode the stat of the log is included as well.
+        Used to notice when the file was changed outside of this object.
+        """
+        try:
+            stat = os.stat(self._file_path)
+        except FileNotFoundError:
+            return None
 
-        Returns:
-            dict: A dictionary of movie titles and
-            their associated information (year, rating, poster).
+        file_stat = stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+        if self._journal is not None:
+            return file_stat, self._journal.stat()
+
+        return file_stat
+
+
+    def _iter_file(self):
         """
-        # Initialise movies dict
-        movies = {}
+        Parse the CSV file row by row.
 
+        Yields:
+            tuple: (title, info) for every movie in the file.
+
+        Raises:
+            csv.Error, UnicodeDecodeError, ...: If a row can't be read. Streaming
+                changes must not write back a file that stops at a bad row.
+        """
         if not os.path.exists(self._file_path):
-            # If file doesn't exist, return empty dict
-            return movies
+            # If file doesn't exist, there is nothing to yield
+            return
+
+        with open(self._file_path, "r", encoding="utf-8", newline="") as handle:
+            reader = csv.DictReader(handle)
+            for row in reader:
+                yield row["title"], {
+                    "year": row["year"],
+                    "rating": row["rating"],
+                    "poster": row["poster"],
+                    "imdb_id": row["imdb_id"],
+                    "notes": row["notes"],
+                    **parse_details(row)
+                }
+
+
+    def _read_file(self):
+        """
+        Parse the CSV file and return the movies dictionary.
+        Reading stops at a bad row, the movies before it are returned.
+        """
+        movies = {}
         try:
-            with open(self._file_path, "r", encoding="utf-8") as handle:
-                reader = csv.DictReader(handle)
-                for row in reader:
-                    title = row["title"]
-                    movies[title] = {
-                        "year": row["year"],
-                        "rating": row["rating"],
-                        "poster": row["poster"],
-                        "imdb_id": row["imdb_id"],
-                        "notes": row["notes"]
-                    }
+            for title, info in self._iter_file():
+                movies[title] = info
         except csv.Error as e:
+            # Stop at a CSV error
             print(f"Error reading CSV file: {e}")
-            # Return empty dict in case of CSV error
-            return movies
 
         except Exception as e:
+            # Stop at any unexpected error
             print(f"Unexpected error: {e}")
-            # Return empty dict in case of any unexpected error
-            return movies
 
         return movies
 
 
+    def _stream_commit(self, edit):
+        """
+        Streaming mode: copy the file row by row through <edit> into a temp file and swap it in.
+
+        Args:
+            edit (callable): Generator function that takes and yields (title, info) pairs
+                             and returns the number (or the titles) of the movies it changed.
+
+        Returns:
+            What <edit> returned. The file is left alone if that's 0 or empty.
+
+        Raises:
+            Exception: Whatever stopped reading the file; it is left alone then, too.
+        """
+        changed = 0
+        tmp_path = self._file_path + ".tmp"
+
+        def rows():
+            nonlocal changed
+            changed = yield from edit(self._iter_file())
+
+        with self._lock.exclusive():
+            try:
+                self._write_tmp_file(rows())
+            except BaseException:
+                # A copy that stops at a bad row would drop every movie after it
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+            if changed:
+                replace_file(tmp_path, self._file_path)
+            else:
+                os.remove(tmp_path)
+        return changed
+
+
+    def _load_movies(self):
+        """
+        Return the cached movies dictionary.
+        The file is only parsed again if its mtime or size changed since the last load.
+        """
+        stat = self._current_stat()
+
+        if self._movies is None or stat != self._file_stat:
+            # Locked, so no writer replaces the file or appends to the log while both are read
+            with self._lock.shared():
+                stat = self._current_stat()
+                self._movies = self._read_file()
+
+                if self._journal is not None:
+                    self._journal.replay(self._movies)
+                    # Replaying may have cut a torn record off the log
+                    stat = self._current_stat()
+
+            self._file_stat = stat
+            self._revision += 1
+
+        return self._movies
+
+
+    def _commit(self, movies, records):
+        """
+        Persist mutations that were already applied to <movies>.
+        Append <records> to the journal if enabled, otherwise rewrite the whole file.
+        If that fails, the cache is dropped, so the next read sees what is on disk.
+        """
+        if not records:
+            return
+
+        try:
+            if self._journal is None:
+                self._save_to_file(movies)
+            else:
+                self._journal.append(records)
+
+                if self._journal.needs_compaction():
+                    self.compact()
+                else:
+                    self._file_stat = self._current_stat()
+
+        except BaseException:
+            # <movies> is the cache, and it holds changes the file may not have
+            self._movies = None
+            self._file_stat = None
+            raise
+
+        self._revision += 1
+
+
+    def compact(self):
+        """
+        Fold the journal into a new snapshot of the CSV file and clear it.
+        Does nothing if journal mode is off.
+        """
+        if self._journal is None:
+            return
+
+        with self._lock.exclusive():
+            movies = self._load_movies()
+            # Snapshot first: if we crash before clearing, replaying the log again is harmless
+            self._save_to_file(movies)
+            self._journal.clear()
+            self._file_stat = self._current_stat()
+
+
+    def revision(self):
+        """
+        Return a counter that changes whenever the collection is reloaded from disk or changed.
+        In streaming mode, the file stat is returned instead.
+
+        Returns:
+            int: The current revision.
+        """
+        if self._streaming:
+            # Every change replaces the file, so its stat is a revision of its own
+            return self._current_stat()
+
+        # Checks the file stat, so changes made by other processes count too
+        self._load_movies()
+        return self._revision
+
+
+    def list_movies(self):
+        """
+        Return all movies stored in the CSV file.
+
+        Returns:
+            dict: A dictionary of movie titles and
+            their associated information (year, rating, poster).
+        """
+        if self._streaming:
+            return self._read_file()
+
+        # Shallow copy, so callers can't add or remove titles in the cache
+        return dict(self._load_movies())
+
+
+    def iter_movies(self):
+        """
+        Yield all movies one by one. In streaming mode they are read from the file
+        as they are yielded, so the collection is never held in memory.
+
+        Yields:
+            tuple: (title, info)
+        """
+        if self._streaming:
+            yield from self._iter_file()
+        else:
+            yield from self.list_movies().items()
+
+
+    def get_movie(self, title):
+        """
+        Return the info of one movie. In streaming mode, the file is read until it is found.
+
+        Args:
+            title (str): The title of the movie.
+
+        Returns:
+            dict: Its information, or None if there is no such movie.
+        """
+        if self._streaming:
+            return next((info for stored_title, info in self._iter_file() if stored_title == title), None)
+
+        info = self._load_movies().get(title)
+        return None if info is None else dict(info)
+
+
     def movie_exist(self, title):
         """
         Check if a movie with the given title already exists in storage.
@@ -106,11 +408,13 @@ class StorageCsv(IStorage):
         Returns:
             bool: True if the movie exists, otherwise False.
         """
-        movies = self.list_movies()
-        return title in movies
+        if self._streaming:
+            return any(stored_title == title for stored_title, _ in self._iter_file())
 
+        return title in self._load_movies()
 
-    def add_movie(self, title, year, rating, poster, imdb_id):
+
+    def add_movie(self, title, year, rating, poster, imdb_id, details=None):
         """
         Add a new movie to the storage if it doesn't already exist.
 
@@ -120,22 +424,30 @@ class StorageCsv(IStorage):
             rating (str): The movie's rating.
             poster (str): The URL to the movie's poster image.
             imdb_id (str): imdbID of a movie title.
+            details (dict): Optional details of storage.movie_details (genres, runtime, ...).
         """
-        movies = self.list_movies()
+        if self._streaming:
+            movie = {**(details or {}), "year": year, "rating": rating, "poster": poster, "imdb_id": imdb_id}
+            if not self.add_movies({title: movie}):
+                print(f"Movie '{title}' already exists.")
+            return
+
+        with self._lock.exclusive():
+            movies = self._load_movies()
+
+            if title in movies:
+                print(f"Movie '{title}' already exists.")
+                return
 
-        if not self.movie_exist(title):
             movies[title] = {
                 "year": year,
                 "rating": rating,
                 "poster": poster,
                 "imdb_id": imdb_id,
+                **pick_details(details or {}),
                 "notes": ""
             }
-
-        else:
-            print(f"Movie '{title}' already exists.")
-
-        self._save_to_file(movies)
+            self._commit(movies, [{"op": "add", "title": title, "info": movies[title]}])
 
 
     def delete_movie(self, title):
@@ -145,14 +457,20 @@ class StorageCsv(IStorage):
         Args:
             title (str): The title of the movie to delete.
         """
-        movies = self.list_movies()
+        if self._streaming:
+            if not self.delete_movies([title]):
+                print(f"Movie '{title}' not found.")
+            return
 
-        if not self.movie_exist(title):
-            print(f"Movie '{title}' not found.")
-        else:
-            del movies[title]
+        with self._lock.exclusive():
+            movies = self._load_movies()
+
+            if title not in movies:
+                print(f"Movie '{title}' not found.")
+                return
 
-        self._save_to_file(movies)
+            del movies[title]
+            self._commit(movies, [{"op": "delete", "title": title}])
 
 
     def update_movie(self, title, rating, notes):
@@ -164,12 +482,112 @@ class StorageCsv(IStorage):
             rating (float): The new rating of the movie.
             notes (str): movie notes.
         """
-        movies = self.list_movies()
+        if self._streaming:
+            if not self.update_movies({title: {"rating": rating, "notes": notes}}):
+                print(f"Movie '{title}' not found.")
+            return
+
+        with self._lock.exclusive():
+            movies = self._load_movies()
+
+            if title not in movies:
+                print(f"Movie '{title}' not found.")
+                return
 
-        if not self.movie_exist(title):
-            print(f"Movie '{title}' not found.")
-        else:
             movies[title].update({"rating": rating})
             movies[title] ["notes"] = notes
+            self._commit(movies, [{"op": "update", "title": title, "rating": rating, "notes": notes}])
+
+
+    def add_movies(self, movies):
+        """
+        Add many movies with a single load and a single write.
+        Titles that already exist are skipped.
+
+        Args:
+            movies (dict): Movie titles mapped to dicts with year, rating, poster and imdb_id,
+                           and optionally the details of storage.movie_details (genres, runtime, ...).
+
+        Returns:
+            list: The titles of the movies added, in the given order.
+        """
+        if self._streaming:
+            return self._stream_commit(lambda rows: _add_rows(rows, movies))
+
+        with self._lock.exclusive():
+            stored_movies = self._load_movies()
+            records = []
+
+            for title, info in movies.items():
+                if title in stored_movies:
+                    continue
+
+                stored_movies[title] = {
+                    "year": info["year"],
+                    "rating": info["rating"],
+                    "poster": info["poster"],
+                    "imdb_id": info["imdb_id"],
+                    **pick_details(info),
+                    "notes": ""
+                }
+                records.append({"op": "add", "title": title, "info": stored_movies[title]})
+
+            self._commit(stored_movies, records)
+            return [record["title"] for record in records]
+
+
+    def delete_movies(self, titles):
+        """
+        Delete many movies with a single load and a single write.
+        Titles that don't exist are skipped.
+
+        Args:
+            titles (iterable): The titles of the movies to delete.
+
+        Returns:
+            int: The number of movies deleted.
+        """
+        if self._streaming:
+            return self._stream_commit(lambda rows: _delete_rows(rows, titles))
+
+        with self._lock.exclusive():
+            movies = self._load_movies()
+            records = []
+
+            for title in titles:
+                if movies.pop(title, None) is not None:
+                    records.append({"op": "delete", "title": title})
+
+            self._commit(movies, records)
+            return len(records)
+
+
+    def update_movies(self, updates):
+        """
+        Update the rating and notes of many movies with a single load and a single write.
+        Titles that don't exist are skipped.
+
+        Args:
+            updates (dict): Movie titles mapped to dicts with the new rating and notes.
+
+        Returns:
+            int: The number of movies updated.
+        """
+        if self._streaming:
+            return self._stream_commit(lambda rows: _update_rows(rows, updates))
+
+        with self._lock.exclusive():
+            movies = self._load_movies()
+            records = []
+
+            for title, changes in updates.items():
+                if title not in movies:
+                    continue
+
+                movies[title]["rating"] = changes["rating"]
+                movies[title]["notes"] = changes["notes"]
+                records.append({"op": "update", "title": title,
+                                "rating": changes["rating"], "notes": changes["notes"]})
 
-        self._save_to_file(movies)
+            self._commit(movies, records)
+            return len(records)
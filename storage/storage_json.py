@@ -1,13 +1,115 @@
+from storage.file_lock import FileLock, replace_file
 from storage.istorage import IStorage
+from storage.journal import Journal
+from storage.movie_details import pick_details
 import json
 import os
+import re
+
+
+# File extensions of the NDJSON layout: one movie per line, {"title": ..., "year": ..., ...}
+NDJSON_EXTENSIONS = (".ndjson", ".jsonl")
+# Size of the pieces a JSON file is read in when streaming it
+CHUNK_SIZE = 64 * 1024
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+# Every NDJSON line written by this class starts like this, see _line_title()
+_LINE_PREFIX = b'{"title": '
+
+
+def _iter_json_object(handle, chunk_size=CHUNK_SIZE):
+    """
+    Yield the (key, value) pairs of the JSON object in <handle> one by one,
+    reading the file in chunks instead of parsing it all at once.
+
+    Raises:
+        json.JSONDecodeError: If the file isn't a valid JSON object.
+    """
+    buffer = ""
+    pos = 0
+
+    def fill():
+        # Drop what was parsed already and read the next chunk; False at the end of the file
+        nonlocal buffer, pos
+        chunk = handle.read(chunk_size)
+        if not chunk:
+            return False
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        return True
+
+    def skip_whitespace():
+        nonlocal pos
+        while True:
+            pos = _WHITESPACE.match(buffer, pos).end()
+            if pos < len(buffer) or not fill():
+                return
+
+    def expect(char):
+        nonlocal pos
+        skip_whitespace()
+        if buffer[pos:pos + 1] != char:
+            raise json.JSONDecodeError(f"Expecting '{char}'", buffer, pos)
+        pos += 1
+
+    def decode():
+        # A value cut off at the end of the buffer fails to decode: read more and try again
+        nonlocal pos
+        skip_whitespace()
+        while True:
+            try:
+                value, pos = _DECODER.raw_decode(buffer, pos)
+                return value
+            except json.JSONDecodeError:
+                if not fill():
+                    raise
+
+    expect("{")
+    skip_whitespace()
+    if buffer[pos:pos + 1] == "}":
+        return
+
+    while True:
+        key = decode()
+        expect(":")
+        yield key, decode()
+
+        skip_whitespace()
+        if buffer[pos:pos + 1] == "}":
+            return
+        expect(",")
+
+
+def _line_title(line):
+    """
+    Return the title of an NDJSON line (bytes) without parsing the rest of it.
+    """
+    if line.startswith(_LINE_PREFIX):
+        return _DECODER.raw_decode(line.decode("utf-8"), len(_LINE_PREFIX))[0]
+    # Written by something else, e.g. edited by hand
+    return json.loads(line)["title"]
 
 
 class StorageJson(IStorage):
-    def __init__(self, filename):
+    def __init__(self, filename, journal=False, compact_threshold=Journal.DEFAULT_COMPACT_THRESHOLD,
+                 indent=4):
         """
         Initialize the storage by setting the JSON file path inside the data folder.
         Creates an empty file if it doesn't exist.
+
+        Files ending in .ndjson or .jsonl are stored as one movie per line (NDJSON),
+        which can be read movie by movie and looked up by title through an offset index.
+        Other files hold one JSON object, indented by <indent> spaces
+        (None writes it compactly, without any whitespace).
+
+        With <journal> enabled, mutations are appended to '<filename>.log' instead of
+        rewriting the whole file; the log is folded into the file once it grows past
+        <compact_threshold> bytes.
+
+        Several processes can share the file: every change reloads it and writes it back
+        under an exclusive lock on '<filename>.lock', so no change made in between is lost,
+        and reloads hold the lock shared.
         """
         # Get the folder path where <storage_json.py> is located
         base_dir = os.path.dirname(__file__)
@@ -20,9 +122,33 @@ class StorageJson(IStorage):
         self._file_path = os.path.join(data_dir, filename)
         # print(f"Looking for file at: {self._file_path}")
 
+        self._ndjson = os.path.splitext(filename)[1].lower() in NDJSON_EXTENSIONS
+        self._indent = indent
+        # NDJSON: title -> (offset, length) of its line, and the file stat it was built from
+        self._offsets = None
+        self._offsets_stat = None
+
+        # In-memory copy of the collection and the file stat it was loaded from
+        self._movies = None
+        self._file_stat = None
+        # Bumped on every change made through this object, see revision()
+        self._revision = 0
+
+        self._journal = Journal(self._file_path, compact_threshold)
+        self._lock = FileLock(self._file_path)
+
         # If file doesn't exist, create empty JSON file
         if not os.path.exists(self._file_path):
-            self._create_empty_file()
+            with self._lock.exclusive():
+                # Another process may have created it while we waited
+                if not os.path.exists(self._file_path):
+                    self._create_empty_file()
+
+        if not journal:
+            # Fold in a log left behind by a journaled run before writing without one
+            if self._journal.size() > 0:
+                self.compact()
+            self._journal = None
 
 
     def _create_empty_file(self):
@@ -33,24 +159,54 @@ class StorageJson(IStorage):
         # <os.path.dirname> – gets dir part of the file path (~/.../250411_CODIO_Movie_Phase_3/data)
         os.makedirs(os.path.dirname(self._file_path), exist_ok=True)
         with open(self._file_path, "w", encoding="utf-8") as handle:
-            json.dump({}, handle, indent=4)
+            # An empty NDJSON file has no lines at all
+            if not self._ndjson:
+                json.dump({}, handle, indent=self._indent)
 
 
     def _save_to_file(self, movies):
         """
         Private method to write the updated movies dictionary back to the file.
+        The cache is kept in sync with what was written (write-through).
         """
-        with open(self._file_path, "w", encoding="utf-8") as handle:
-            json.dump(movies, handle, indent=4)
+        # Write next to the live file and swap it in, so a crash never leaves half a file
+        tmp_path = self._file_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            if self._ndjson:
+                for title, info in movies.items():
+                    handle.write(json.dumps({"title": title, **info}) + "\n")
+            elif self._indent is None:
+                json.dump(movies, handle, separators=(",", ":"))
+            else:
+                json.dump(movies, handle, indent=self._indent)
+        replace_file(tmp_path, self._file_path)
+
+        self._movies = movies
+        self._file_stat = self._current_stat()
+
+
+    def _current_stat(self):
+        """
+        Return (inode, mtime, size) of the JSON file, or None if it doesn't exist.
+        In journal mode the stat of the log is included as well.
+        Used to notice when the file was changed outside of this object.
+        """
+        try:
+            stat = os.stat(self._file_path)
+        except FileNotFoundError:
+            return None
 
+        file_stat = stat.st_ino, stat.st_mtime_ns, stat.st_size
 
-    def list_movies(self):
-        """
-        Return all movies stored in the JSON file.
+        if self._journal is not None:
+            return file_stat, self._journal.stat()
 
-        Returns:
-            dict: A dictionary of movie titles and
-            their associated information (year, rating, poster).
+        return file_stat
+
+
+    def _read_file(self):
+        """
+        Parse the JSON file and return the movies dictionary.
         """
         if not os.path.exists(self._file_path):
             # If file doesn't exist, return empty dict
@@ -58,15 +214,213 @@ class StorageJson(IStorage):
 
         with open(self._file_path, "r", encoding="utf-8") as handle:
             try:
-                movies = json.load(handle)
-
-            except json.JSONDecodeError:
+                if self._ndjson:
+                    # One json.loads() over all lines as an array is much faster than one per line
+                    lines = (line for line in handle if line.strip())
+                    movies = {info.pop("title"): info for info in json.loads(f"[{','.join(lines)}]")}
+                else:
+                    movies = json.load(handle)
+
+            except (json.JSONDecodeError, KeyError):
                 # If file is empty or contains invalid JSON, return empty dict
                 movies = {}
 
         return movies
 
 
+    def _iter_file(self):
+        """
+        Parse the JSON file movie by movie, without building the whole dictionary.
+
+        Yields:
+            tuple: (title, info) for every movie in the file.
+        """
+        if not os.path.exists(self._file_path):
+            return
+
+        with open(self._file_path, "r", encoding="utf-8") as handle:
+            try:
+                if self._ndjson:
+                    for line in handle:
+                        if line.strip():
+                            info = json.loads(line)
+                            yield info.pop("title"), info
+                else:
+                    yield from _iter_json_object(handle)
+
+            except (json.JSONDecodeError, KeyError) as e:
+                # Stop at invalid JSON, like _read_file() returns nothing for it
+                print(f"Error reading JSON file: {e}")
+
+
+    def _cache_is_current(self):
+        """
+        Return True if the in-memory copy is loaded and the file didn't change since.
+        """
+        return self._movies is not None and self._current_stat() == self._file_stat
+
+
+    def _line_offsets(self):
+        """
+        NDJSON: return {title: (offset, length)} of every line, rebuilt when the file changed.
+        Only the titles are parsed, so this is much cheaper than loading the movies.
+        """
+        stat = self._current_stat()
+        if self._offsets is not None and stat == self._offsets_stat:
+            return self._offsets
+
+        offsets = {}
+        offset = 0
+        # Locked, so the file isn't replaced between taking its stat and reading it
+        with self._lock.shared():
+            stat = self._current_stat()
+            with open(self._file_path, "rb") as handle:
+                for line in handle:
+                    if line.strip():
+                        offsets[_line_title(line)] = (offset, len(line))
+                    offset += len(line)
+
+        self._offsets = offsets
+        self._offsets_stat = stat
+        return offsets
+
+
+    def _load_movies(self):
+        """
+        Return the cached movies dictionary.
+        The file is only parsed again if its mtime or size changed since the last load.
+        """
+        stat = self._current_stat()
+
+        if self._movies is None or stat != self._file_stat:
+            # Locked, so no writer replaces the file or appends to the log while both are read
+            with self._lock.shared():
+                stat = self._current_stat()
+                self._movies = self._read_file()
+
+                if self._journal is not None:
+                    self._journal.replay(self._movies)
+                    # Replaying may have cut a torn record off the log
+                    stat = self._current_stat()
+
+            self._file_stat = stat
+
+        return self._movies
+
+
+    def _commit(self, movies, records):
+        """
+        Persist mutations that were already applied to <movies>.
+        Append <records> to the journal if enabled, otherwise rewrite the whole file.
+        If that fails, the cache is dropped, so the next read sees what is on disk.
+        """
+        if not records:
+            return
+
+        try:
+            if self._journal is None:
+                self._save_to_file(movies)
+            else:
+                self._journal.append(records)
+
+                if self._journal.needs_compaction():
+                    self.compact()
+                else:
+                    self._file_stat = self._current_stat()
+
+        except BaseException:
+            # <movies> is the cache, and it holds changes the file may not have
+            self._movies = None
+            self._file_stat = None
+            raise
+
+        self._revision += 1
+
+
+    def compact(self):
+        """
+        Fold the journal into a new snapshot of the JSON file and clear it.
+        Does nothing if journal mode is off.
+        """
+        if self._journal is None:
+            return
+
+        with self._lock.exclusive():
+            movies = self._load_movies()
+            # Snapshot first: if we crash before clearing, replaying the log again is harmless
+            self._save_to_file(movies)
+            self._journal.clear()
+            self._file_stat = self._current_stat()
+
+
+    def revision(self):
+        """
+        Return a token that changes whenever the collection is changed,
+        through this object or by another process. The file isn't read.
+
+        Returns:
+            tuple: (own changes, file stat).
+        """
+        # The stat catches changes by other processes, the counter own changes within the mtime resolution
+        return self._revision, self._current_stat()
+
+
+    def list_movies(self):
+        """
+        Return all movies stored in the JSON file.
+
+        Returns:
+            dict: A dictionary of movie titles and
+            their associated information (year, rating, poster).
+        """
+        # Shallow copy, so callers can't add or remove titles in the cache
+        return dict(self._load_movies())
+
+
+    def iter_movies(self):
+        """
+        Yield all movies one by one. Unless they are in memory already, they are
+        read from the file as they are yielded, without loading the whole collection.
+
+        Yields:
+            tuple: (title, info)
+        """
+        # The journal can only be replayed onto the whole collection
+        if self._journal is not None or self._cache_is_current():
+            yield from self.list_movies().items()
+        else:
+            yield from self._iter_file()
+
+
+    def get_movie(self, title):
+        """
+        Return the info of one movie. In the NDJSON layout, a movie that isn't in memory
+        is read from its line in the file, found through the offset index.
+
+        Args:
+            title (str): The title of the movie.
+
+        Returns:
+            dict: Its information, or None if there is no such movie.
+        """
+        if self._journal is not None or not self._ndjson or self._cache_is_current():
+            info = self._load_movies().get(title)
+            return None if info is None else dict(info)
+
+        # Locked, so the offset still points into the file that is read
+        with self._lock.shared():
+            position = self._line_offsets().get(title)
+            if position is None:
+                return None
+
+            offset, length = position
+            with open(self._file_path, "rb") as handle:
+                handle.seek(offset)
+                info = json.loads(handle.read(length))
+        del info["title"]
+        return info
+
+
     def movie_exist(self, title):
         """
         Check if a movie with the given title already exists in storage.
@@ -77,11 +431,13 @@ class StorageJson(IStorage):
         Returns:
             bool: True if the movie exists, otherwise False.
         """
-        movies = self.list_movies()
-        return title in movies
+        if self._journal is None and self._ndjson and not self._cache_is_current():
+            return title in self._line_offsets()
+
+        return title in self._load_movies()
 
 
-    def add_movie(self, title, year, rating, poster, imdb_id):
+    def add_movie(self, title, year, rating, poster, imdb_id, details=None):
         """
         Add a new movie to the storage if it doesn't already exist.
 
@@ -91,22 +447,24 @@ class StorageJson(IStorage):
             rating (str): The movie's rating.
             poster (str): The URL to the movie's poster image.
             imdb_id (str): imdbID of a movie title.
+            details (dict): Optional details of storage.movie_details (genres, runtime, ...).
         """
-        movies = self.list_movies()
+        with self._lock.exclusive():
+            movies = self._load_movies()
+
+            if title in movies:
+                print(f"Movie '{title}' already exists.")
+                return
 
-        if not self.movie_exist(title):
             movies[title] = {
                 "year": year,
                 "rating": rating,
                 "poster": poster,
                 "imdb_id": imdb_id,
+                **pick_details(details or {}),
                 "notes": ""
             }
-
-        else:
-            print(f"Movie '{title}' already exists.")
-
-        self._save_to_file(movies)
+            self._commit(movies, [{"op": "add", "title": title, "info": movies[title]}])
 
 
     def delete_movie(self, title):
@@ -116,16 +474,17 @@ class StorageJson(IStorage):
         Args:
             title (str): The title of the movie to delete.
         """
-        movies = self.list_movies()
+        with self._lock.exclusive():
+            movies = self._load_movies()
+
+            if title not in movies:
+                print(f"Movie '{title}' not found.")
+                return
 
-        if not self.movie_exist(title):
-            print(f"Movie '{title}' not found.")
-        else:
             del movies[title]
+            self._commit(movies, [{"op": "delete", "title": title}])
             print(f"Movie {title} successfully deleted")
 
-        self._save_to_file(movies)
-
 
     def update_movie(self, title, rating, notes):
         """
@@ -137,12 +496,98 @@ class StorageJson(IStorage):
             rating (float): The new rating of the movie.
             notes (str): movie notes.
         """
-        movies = self.list_movies()
+        with self._lock.exclusive():
+            movies = self._load_movies()
+
+            if title not in movies:
+                print(f"Movie '{title}' not found.")
+                return
 
-        if not self.movie_exist(title):
-            print(f"Movie '{title}' not found.")
-        else:
             movies[title].update({"rating": rating})
             movies[title] ["notes"] = notes
+            self._commit(movies, [{"op": "update", "title": title, "rating": rating, "notes": notes}])
+
+
+    def add_movies(self, movies):
+        """
+        Add many movies with a single load and a single write.
+        Titles that already exist are skipped.
+
+        Args:
+            movies (dict): Movie titles mapped to dicts with year, rating, poster and imdb_id,
+                           and optionally the details of storage.movie_details (genres, runtime, ...).
+
+        Returns:
+            list: The titles of the movies added, in the given order.
+        """
+        with self._lock.exclusive():
+            stored_movies = self._load_movies()
+            records = []
+
+            for title, info in movies.items():
+                if title in stored_movies:
+                    continue
+
+                stored_movies[title] = {
+                    "year": info["year"],
+                    "rating": info["rating"],
+                    "poster": info["poster"],
+                    "imdb_id": info["imdb_id"],
+                    **pick_details(info),
+                    "notes": ""
+                }
+                records.append({"op": "add", "title": title, "info": stored_movies[title]})
+
+            self._commit(stored_movies, records)
+            return [record["title"] for record in records]
+
+
+    def delete_movies(self, titles):
+        """
+        Delete many movies with a single load and a single write.
+        Titles that don't exist are skipped.
+
+        Args:
+            titles (iterable): The titles of the movies to delete.
+
+        Returns:
+            int: The number of movies deleted.
+        """
+        with self._lock.exclusive():
+            movies = self._load_movies()
+            records = []
+
+            for title in titles:
+                if movies.pop(title, None) is not None:
+                    records.append({"op": "delete", "title": title})
+
+            self._commit(movies, records)
+            return len(records)
+
+
+    def update_movies(self, updates):
+        """
+        Update the rating and notes of many movies with a single load and a single write.
+        Titles that don't exist are skipped.
+
+        Args:
+            updates (dict): Movie titles mapped to dicts with the new rating and notes.
+
+        Returns:
+            int: The number of movies updated.
+        """
+        with self._lock.exclusive():
+            movies = self._load_movies()
+            records = []
+
+            for title, changes in updates.items():
+                if title not in movies:
+                    continue
+
+                movies[title]["rating"] = changes["rating"]
+                movies[title]["notes"] = changes["notes"]
+                records.append({"op": "update", "title": title,
+                                "rating": changes["rating"], "notes": changes["notes"]})
 
-        self._save_to_file(movies)
+            self._commit(movies, records)
+            return len(records)
@@ -0,0 +1,583 @@
+"""
+SQLite-based storage.
+
+Movies live in a single 'movies' table with indexes on title, imdb_id, year
+and rating, so lookups, sorting by rating and year filters are answered by
+SQLite instead of scanning the whole collection in Python.
+
+Genres, directors, actors and languages (see storage.movie_details) are
+normalized: every distinct name is stored once in 'genres', 'people' (directors
+and actors) or 'languages', and 'movie_details' links the movies to them, in
+OMDb's order. Its index on (field, name_id, title) is the inverted index that
+answers movies_by_details() without scanning the movies. Names are matched by
+their casefolded 'key', like FacetIndex does (SQLite's NOCASE only folds ASCII).
+The runtime is an INTEGER column of 'movies'. Databases created before get all
+of these on opening.
+
+An existing .json or .csv collection can be migrated once with:
+    python3 -m storage.storage_sqlite <source.json|source.csv> <target.db>
+
+Example:
+    python3 -m storage.storage_sqlite movies.json movies.db
+"""
+
+from itertools import islice
+from storage.istorage import IStorage
+from storage.movie_details import FILTERS
+from storage.movie_table import MovieTable
+from storage.storage_json import StorageJson
+from storage.storage_csv import StorageCsv
+import argparse
+import os
+import sqlite3
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS movies (
+    title TEXT PRIMARY KEY,
+    year TEXT NOT NULL,
+    rating TEXT NOT NULL,
+    poster TEXT NOT NULL DEFAULT '',
+    imdb_id TEXT NOT NULL DEFAULT '',
+    notes TEXT NOT NULL DEFAULT '',
+    runtime INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_movies_imdb_id ON movies (imdb_id);
+CREATE INDEX IF NOT EXISTS idx_movies_year ON movies (CAST(year AS INTEGER));
+CREATE INDEX IF NOT EXISTS idx_movies_rating ON movies (CAST(rating AS REAL));
+
+-- 'key' is name.casefold(), its unique index is created by StorageSqlite._add_name_keys()
+CREATE TABLE IF NOT EXISTS genres (id INTEGER PRIMARY KEY, name TEXT NOT NULL, key TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS people (id INTEGER PRIMARY KEY, name TEXT NOT NULL, key TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS languages (id INTEGER PRIMARY KEY, name TEXT NOT NULL, key TEXT NOT NULL);
+
+-- Linked by title: rowids of 'movies' may change on VACUUM
+CREATE TABLE IF NOT EXISTS movie_details (
+    title TEXT NOT NULL,
+    field INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    name_id INTEGER NOT NULL,
+    PRIMARY KEY (title, field, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_movie_details_name ON movie_details (field, name_id, title);
+CREATE TRIGGER IF NOT EXISTS movies_delete_details AFTER DELETE ON movies BEGIN
+    DELETE FROM movie_details WHERE title = OLD.title;
+END;
+"""
+
+# Tables of the detail names
+NAME_TABLES = ("genres", "people", "languages")
+# Detail field -> (its code in movie_details, table of its names)
+DETAIL_TABLES = {"genres": (0, "genres"), "directors": (1, "people"), "actors": (2, "people"),
+                 "languages": (3, "languages")}
+# Columns of a movie, in the order _row_to_info() takes them after the title
+COLUMNS = "title, year, rating, poster, imdb_id, notes, runtime"
+# Movies whose details are read with one query per name table
+DETAILS_CHUNK_SIZE = 500
+# Most movies counted per name when picking the rarest name of a query, see movies_by_details()
+COUNT_LIMIT = 1000
+
+
+class StorageSqlite(IStorage):
+    def __init__(self, filename):
+        """
+        Initialize the storage by opening the SQLite database inside the data folder.
+        Creates the database and its tables if they don't exist.
+        """
+        base_dir = os.path.dirname(__file__)
+        data_dir = os.path.abspath(os.path.join(base_dir, "..", "data"))
+        os.makedirs(data_dir, exist_ok=True)
+
+        filename = os.path.basename(filename)
+
+        self._file_path = os.path.join(data_dir, filename)
+        # May be used from another thread than the one that opened it (e.g. the writer of app.server);
+        # callers never use it from two threads at the same time
+        self._connection = sqlite3.connect(self._file_path, check_same_thread=False)
+        self._connection.executescript(SCHEMA)
+
+        columns = [row[1] for row in self._connection.execute("PRAGMA table_info(movies)")]
+        if "runtime" not in columns:
+            with self._connection:
+                self._connection.execute("ALTER TABLE movies ADD COLUMN runtime INTEGER")
+
+        self._add_name_keys()
+
+        # Bumped on every change made through this object, see revision()
+        self._revision = 0
+
+
+    def _add_name_keys(self):
+        """
+        Give the name tables of databases created before a casefolded 'key' column, and index it.
+        Names with the same key (kept apart by the old NOCASE, e.g. "Ærø" and "ærø") are merged
+        into the first one.
+        """
+        with self._connection:
+            for table in NAME_TABLES:
+                columns = [row[1] for row in self._connection.execute(f"PRAGMA table_info({table})")]
+                if "key" not in columns:
+                    self._connection.execute(f"ALTER TABLE {table} ADD COLUMN key TEXT")
+                    codes = ", ".join(str(code) for code, name_table in DETAIL_TABLES.values() if name_table == table)
+
+                    # key -> id of the first name with it
+                    ids = {}
+                    for name_id, name in self._connection.execute(f"SELECT id, name FROM {table} ORDER BY id").fetchall():
+                        key = name.casefold()
+                        if key not in ids:
+                            ids[key] = name_id
+                            self._connection.execute(f"UPDATE {table} SET key = ? WHERE id = ?", (key, name_id))
+                            continue
+
+                        self._connection.execute(f"UPDATE movie_details SET name_id = ? "
+                                                 f"WHERE field IN ({codes}) AND name_id = ?", (ids[key], name_id))
+                        self._connection.execute(f"DELETE FROM {table} WHERE id = ?", (name_id,))
+
+                self._connection.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{table}_key ON {table} (key)")
+
+
+    @staticmethod
+    def _row_to_info(row):
+        """
+        Convert a (year, rating, poster, imdb_id, notes, runtime) row to a movie info dict.
+        The other details are added by _attach_details().
+        """
+        year, rating, poster, imdb_id, notes, runtime = row
+        info = {
+            "year": year,
+            "rating": rating,
+            "poster": poster,
+            "imdb_id": imdb_id,
+            "notes": notes
+        }
+        if runtime is not None:
+            info["runtime"] = runtime
+        return info
+
+
+    def _attach_details(self, movies):
+        """
+        Add the genres, directors, actors and languages to a list of (title, info) tuples.
+
+        Returns:
+            list: The same tuples.
+        """
+        infos = dict(movies)
+        placeholders = ", ".join("?" * len(infos))
+        fields = {code: field for field, (code, _) in DETAIL_TABLES.items()}
+
+        for table in NAME_TABLES:
+            codes = ", ".join(str(code) for code, name_table in DETAIL_TABLES.values() if name_table == table)
+            cursor = self._connection.execute(
+                f"SELECT d.title, d.field, n.name FROM movie_details d JOIN {table} n ON n.id = d.name_id "
+                f"WHERE d.field IN ({codes}) AND d.title IN ({placeholders}) ORDER BY d.title, d.field, d.position",
+                list(infos)
+            )
+            for title, code, name in cursor:
+                infos[title].setdefault(fields[code], []).append(name)
+        return movies
+
+
+    def _iter_rows(self, cursor):
+        """
+        Yield (title, info) for the rows of a cursor over COLUMNS, with their details,
+        reading the details of DETAILS_CHUNK_SIZE movies at a time.
+        """
+        while True:
+            chunk = [(row[0], self._row_to_info(row[1:])) for row in islice(cursor, DETAILS_CHUNK_SIZE)]
+            if not chunk:
+                return
+            yield from self._attach_details(chunk)
+
+
+    def revision(self):
+        """
+        Return a token that changes whenever the collection is changed,
+        through this object or by another connection to the database.
+
+        Returns:
+            tuple: (own changes, SQLite data_version).
+        """
+        # data_version only changes when *other* connections commit
+        data_version = self._connection.execute("PRAGMA data_version").fetchone()[0]
+        return self._revision, data_version
+
+
+    def list_movies(self):
+        """
+        Return all movies stored in the database.
+
+        Returns:
+            dict: A dictionary of movie titles and
+            their associated information (year, rating, poster).
+        """
+        cursor = self._connection.execute(f"SELECT {COLUMNS} FROM movies ORDER BY rowid")
+        return dict(self._iter_rows(cursor))
+
+
+    def iter_movies(self):
+        """
+        Yield all movies one by one, straight from the database cursor.
+
+        Yields:
+            tuple: (title, info)
+        """
+        cursor = self._connection.execute(f"SELECT {COLUMNS} FROM movies ORDER BY rowid")
+        yield from self._iter_rows(cursor)
+
+
+    def get_movie(self, title):
+        """
+        Return the info of one movie, looked up by its primary key.
+
+        Args:
+            title (str): The title of the movie.
+
+        Returns:
+            dict: Its information, or None if there is no such movie.
+        """
+        cursor = self._connection.execute(f"SELECT {COLUMNS} FROM movies WHERE title = ?", (title,))
+        movie = next(self._iter_rows(cursor), None)
+        return None if movie is None else movie[1]
+
+
+    def movie_exist(self, title):
+        """
+        Check if a movie with the given title already exists in storage.
+
+        Args:
+            title (str): The title of the movie to check.
+
+        Returns:
+            bool: True if the movie exists, otherwise False.
+        """
+        cursor = self._connection.execute("SELECT 1 FROM movies WHERE title = ?", (title,))
+        return cursor.fetchone() is not None
+
+
+    def add_movie(self, title, year, rating, poster, imdb_id, details=None):
+        """
+        Add a new movie to the storage if it doesn't already exist.
+
+        Args:
+            title (str): The title of the movie.
+            year (int): The year the movie was released.
+            rating (str): The movie's rating.
+            poster (str): The URL to the movie's poster image.
+            imdb_id (str): imdbID of a movie title.
+            details (dict): Optional details of storage.movie_details (genres, runtime, ...).
+        """
+        # Same insert as a batch, so the details and runtime are written too
+        movie = {**(details or {}), "year": year, "rating": rating, "poster": poster, "imdb_id": imdb_id, "notes": ""}
+        if not self.add_movies({title: movie}):
+            print(f"Movie '{title}' already exists.")
+
+
+    def delete_movie(self, title):
+        """
+        Delete a movie from the storage by its title.
+
+        Args:
+            title (str): The title of the movie to delete.
+        """
+        with self._connection:
+            cursor = self._connection.execute("DELETE FROM movies WHERE title = ?", (title,))
+
+        if cursor.rowcount == 0:
+            print(f"Movie '{title}' not found.")
+        else:
+            self._revision += 1
+            print(f"Movie {title} successfully deleted")
+
+
+    def update_movie(self, title, rating, notes):
+        """
+        Update the rating and notes of an existing movie in the storage.
+
+        Args:
+            title (str): The title of the movie to update.
+            rating (float): The new rating of the movie.
+            notes (str): movie notes.
+        """
+        with self._connection:
+            cursor = self._connection.execute(
+                "UPDATE movies SET rating = ?, notes = ? WHERE title = ?",
+                (str(rating), notes, title)
+            )
+
+        if cursor.rowcount == 0:
+            print(f"Movie '{title}' not found.")
+        else:
+            self._revision += 1
+
+
+    def movie_table(self):
+        """
+        Return the collection as a columnar MovieTable, built straight from the
+        title, year, rating and imdb_id columns without creating a dict per movie.
+
+        Returns:
+            MovieTable: One row per movie (cached until the database changes).
+        """
+        revision = self.revision()
+        cached = getattr(self, "_movie_table_cache", None)
+
+        if cached is not None and cached[0] == revision:
+            return cached[1]
+
+        rows = self._connection.execute("SELECT title, year, rating, imdb_id FROM movies").fetchall()
+        table = MovieTable.from_columns([row[0] for row in rows], [row[1] for row in rows],
+                                        [row[2] for row in rows], [row[3] for row in rows])
+        self._movie_table_cache = (revision, table)
+        return table
+
+
+    def movies_by_rating(self, limit=None):
+        """
+        Return movies sorted by rating, highest first, using the rating index.
+        Movies without a rating ("N/A") come last.
+
+        Args:
+            limit (int): Only return the first <limit> movies (all if None).
+
+        Returns:
+            list: (title, info) tuples.
+        """
+        # CAST turns "N/A" into 0.0, so the rated movies are read first (walking the
+        # rating index) and the unrated ones only if the limit isn't reached yet
+        cursor = self._connection.execute(
+            f"SELECT {COLUMNS} FROM movies WHERE rating GLOB '[0-9]*' "
+            "ORDER BY CAST(rating AS REAL) DESC LIMIT ?",
+            # A negative LIMIT means no limit in SQLite
+            (-1 if limit is None else limit,)
+        )
+        movies = list(self._iter_rows(cursor))
+
+        if limit is None or len(movies) < limit:
+            cursor = self._connection.execute(
+                f"SELECT {COLUMNS} FROM movies WHERE NOT rating GLOB '[0-9]*' LIMIT ?",
+                (-1 if limit is None else limit - len(movies),)
+            )
+            movies.extend(self._iter_rows(cursor))
+        return movies
+
+
+    def movies_by_year(self, start, end):
+        """
+        Return movies released between <start> and <end> (both inclusive), using the year index.
+
+        Args:
+            start (int): First year of the range.
+            end (int): Last year of the range.
+
+        Returns:
+            dict: A dictionary of movie titles and their associated information.
+        """
+        cursor = self._connection.execute(
+            f"SELECT {COLUMNS} FROM movies "
+            "WHERE CAST(year AS INTEGER) BETWEEN ? AND ? ORDER BY CAST(year AS INTEGER)",
+            (start, end)
+        )
+        return dict(self._iter_rows(cursor))
+
+
+    def add_movies(self, movies):
+        """
+        Add many movies in a single transaction.
+        Titles that already exist are skipped.
+
+        Args:
+            movies (dict): Movie titles mapped to dicts with year, rating, poster and imdb_id,
+                           and optionally the details of storage.movie_details (genres, runtime, ...).
+                           Notes are kept if present, e.g. when migrating a collection.
+
+        Returns:
+            list: The titles of the movies added, in the given order.
+        """
+        added = []
+        # (name table, name) -> id, so a name shared by many movies is looked up once per batch
+        name_ids = {}
+
+        with self._connection:
+            for title, info in movies.items():
+                cursor = self._connection.execute(
+                    "INSERT OR IGNORE INTO movies (title, year, rating, poster, imdb_id, notes, runtime) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (title, str(info["year"]), str(info["rating"]), info.get("poster", ""),
+                     info.get("imdb_id", ""), info.get("notes", ""), info.get("runtime"))
+                )
+                if cursor.rowcount == 0:
+                    continue
+
+                added.append(title)
+                self._connection.executemany(
+                    "INSERT INTO movie_details (title, field, position, name_id) VALUES (?, ?, ?, ?)",
+                    ((title, code, position, self._name_id(name_ids, table, name))
+                     for field, (code, table) in DETAIL_TABLES.items()
+                     for position, name in enumerate(info.get(field) or ()))
+                )
+
+        if added:
+            self._revision += 1
+        return added
+
+
+    def _name_id(self, name_ids, table, name):
+        """
+        Return the id of <name> in a name table, adding it if it's new.
+        Names with the same casefolded key share an id, the first spelling is kept.
+
+        Args:
+            name_ids (dict): Cache of the ids looked up so far, (table, key) -> id.
+        """
+        key = name.casefold()
+        if (table, key) not in name_ids:
+            row = self._connection.execute(f"SELECT id FROM {table} WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                row = (self._connection.execute(f"INSERT INTO {table} (name, key) VALUES (?, ?)",
+                                                (name, key)).lastrowid,)
+            name_ids[table, key] = row[0]
+        return name_ids[table, key]
+
+
+    def movies_by_details(self, genre=None, director=None, actor=None, language=None, min_rating=None,
+                          max_runtime=None, limit=None):
+        """
+        Return the movies matching all given filters, best rated first, see IStorage.movies_by_details().
+
+        The movies of the name with the fewest of them are read through the index on
+        movie_details; the other names are only checked for those, by primary key.
+        SQLite itself would start from the first name given, e.g. all dramas.
+
+        Returns:
+            list: (title, info) tuples.
+        """
+        conditions = []
+        parameters = []
+
+        names = []
+        for parameter, name in {"genre": genre, "director": director, "actor": actor, "language": language}.items():
+            if name is None:
+                continue
+            code, table = DETAIL_TABLES[FILTERS[parameter]]
+            # Counting stops at COUNT_LIMIT: only which name is the rarest matters
+            count = self._connection.execute(
+                f"SELECT count(*) FROM (SELECT 1 FROM movie_details d JOIN {table} n ON n.id = d.name_id "
+                "WHERE d.field = ? AND n.key = ? LIMIT ?)", (code, name.casefold(), COUNT_LIMIT)
+            ).fetchone()[0]
+            names.append((count, code, table, name.casefold()))
+
+        names.sort()
+        for position, (_, code, table, key) in enumerate(names):
+            if position == 0:
+                conditions.append(f"title IN (SELECT d.title FROM movie_details d JOIN {table} n "
+                                  "ON n.id = d.name_id WHERE d.field = ? AND n.key = ?)")
+            else:
+                conditions.append(f"EXISTS (SELECT 1 FROM movie_details d JOIN {table} n ON n.id = d.name_id "
+                                  "WHERE d.title = movies.title AND d.field = ? AND n.key = ?)")
+            parameters += [code, key]
+
+        if min_rating is not None:
+            # Leaves out "N/A", which CAST would turn into 0.0
+            conditions.append("rating GLOB '[0-9]*' AND CAST(rating AS REAL) >= ?")
+            parameters.append(min_rating)
+
+        if max_runtime is not None:
+            conditions.append("runtime <= ?")
+            parameters.append(max_runtime)
+
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+        cursor = self._connection.execute(
+            f"SELECT {COLUMNS} FROM movies {where}"
+            "ORDER BY rating GLOB '[0-9]*' DESC, CAST(rating AS REAL) DESC, title LIMIT ?",
+            parameters + [-1 if limit is None else limit]
+        )
+        return list(self._iter_rows(cursor))
+
+
+    def delete_movies(self, titles):
+        """
+        Delete many movies in a single transaction.
+        Titles that don't exist are skipped.
+
+        Args:
+            titles (iterable): The titles of the movies to delete.
+
+        Returns:
+            int: The number of movies deleted.
+        """
+        with self._connection:
+            before = self._connection.total_changes
+            self._connection.executemany("DELETE FROM movies WHERE title = ?", ((title,) for title in titles))
+            changed = self._connection.total_changes - before
+
+        if changed:
+            self._revision += 1
+        return changed
+
+
+    def update_movies(self, updates):
+        """
+        Update the rating and notes of many movies in a single transaction.
+        Titles that don't exist are skipped.
+
+        Args:
+            updates (dict): Movie titles mapped to dicts with the new rating and notes.
+
+        Returns:
+            int: The number of movies updated.
+        """
+        rows = ((str(changes["rating"]), changes["notes"], title) for title, changes in updates.items())
+
+        with self._connection:
+            before = self._connection.total_changes
+            self._connection.executemany("UPDATE movies SET rating = ?, notes = ? WHERE title = ?", rows)
+            changed = self._connection.total_changes - before
+
+        if changed:
+            self._revision += 1
+        return changed
+
+
+    def close(self):
+        """
+        Close the database connection.
+        """
+        self._connection.close()
+
+
+def migrate(source_filename, target_filename):
+    """
+    Copy all movies from a .json or .csv file into a SQLite database.
+
+    Args:
+        source_filename (str): The .json or .csv file in the data folder.
+        target_filename (str): The .db or .sqlite file to create or fill.
+
+    Returns:
+        int: The number of movies migrated.
+    """
+    ext = os.path.splitext(source_filename)[1].lower()
+
+    if ext == ".json":
+        source = StorageJson(source_filename)
+    elif ext == ".csv":
+        source = StorageCsv(source_filename)
+    else:
+        raise ValueError("Unsupported source file type. Please use a .json or .csv file.")
+
+    target = StorageSqlite(target_filename)
+    try:
+        return len(target.add_movies(source.list_movies()))
+    finally:
+        target.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate a .json or .csv movie file into a SQLite database.")
+    parser.add_argument("source", help="The .json or .csv file to read movies from.")
+    parser.add_argument("target", help="The .db or .sqlite file to write movies to.")
+    args = parser.parse_args()
+
+    count = migrate(args.source, args.target)
+    print(f"Migrated {count} movies from {args.source} to {args.target}.")